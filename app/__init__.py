@@ -1,4 +1,4 @@
-from flask import Flask, session
+from flask import Flask
 from dotenv import load_dotenv
 import os
 
@@ -17,29 +17,108 @@ def create_app():
     app.config['DB_PASSWORD'] = os.getenv('DB_PASSWORD')
     app.config['DB_NAME'] = os.getenv('DB_NAME')
 
-    # Session configuration
-    app.config['SESSION_TYPE'] = 'filesystem'
+    # Connection pool configuration
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 5))
+    app.config['DB_POOL_MAX_OVERFLOW'] = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))
+    app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_PING_INTERVAL'] = float(os.getenv('DB_POOL_PING_INTERVAL', 30))
+
+    # Seconds before the in-memory space-status index is rebuilt from MySQL
+    app.config['SPACE_INDEX_MAX_AGE'] = float(os.getenv('SPACE_INDEX_MAX_AGE', 30))
+
+    # Per-customer history page cache (entries; seconds before a page is re-read)
+    app.config['HISTORY_CACHE_SIZE'] = int(os.getenv('HISTORY_CACHE_SIZE', 2048))
+    app.config['HISTORY_CACHE_TTL'] = float(os.getenv('HISTORY_CACHE_TTL', 300))
+
+    # Login credential/role cache (entries; seconds before a user row is re-read)
+    app.config['AUTH_CACHE_SIZE'] = int(os.getenv('AUTH_CACHE_SIZE', 1024))
+    app.config['AUTH_CACHE_TTL'] = float(os.getenv('AUTH_CACHE_TTL', 60))
+
+    # Reference data cache: services, lots and the employee hierarchy (entries; seconds)
+    app.config['REFERENCE_CACHE_SIZE'] = int(os.getenv('REFERENCE_CACHE_SIZE', 256))
+    app.config['REFERENCE_CACHE_TTL'] = float(os.getenv('REFERENCE_CACHE_TTL', 600))
+    # Shorter TTL for hierarchy entries, which reparenting changes from any worker
+    app.config['HIERARCHY_CACHE_TTL'] = float(os.getenv('HIERARCHY_CACHE_TTL', 60))
+
+    # Seconds before compiled tariffs are reloaded from the Tariff table
+    app.config['TARIFF_REFRESH_SECONDS'] = float(os.getenv('TARIFF_REFRESH_SECONDS', 300))
+
+    # Occupancy history: sampling/downsampling intervals (0 disables) and retention
+    app.config['OCCUPANCY_SAMPLE_SECONDS'] = int(os.getenv('OCCUPANCY_SAMPLE_SECONDS', 60))
+    app.config['OCCUPANCY_DOWNSAMPLE_SECONDS'] = int(os.getenv('OCCUPANCY_DOWNSAMPLE_SECONDS', 900))
+    app.config['OCCUPANCY_MINUTE_RETENTION_HOURS'] = int(os.getenv('OCCUPANCY_MINUTE_RETENTION_HOURS', 24))
+    app.config['OCCUPANCY_QUARTER_RETENTION_DAYS'] = int(os.getenv('OCCUPANCY_QUARTER_RETENTION_DAYS', 30))
+    app.config['OCCUPANCY_HOURLY_RETENTION_DAYS'] = int(os.getenv('OCCUPANCY_HOURLY_RETENTION_DAYS', 730))
+
+    # Reservation expiry: hold window, sweep interval (0 disables), batch size and time budget per run
+    app.config['RESERVATION_HOLD_MINUTES'] = int(os.getenv('RESERVATION_HOLD_MINUTES', 30))
+    app.config['RESERVATION_SWEEP_SECONDS'] = int(os.getenv('RESERVATION_SWEEP_SECONDS', 60))
+    app.config['RESERVATION_SWEEP_BATCH'] = int(os.getenv('RESERVATION_SWEEP_BATCH', 200))
+    app.config['RESERVATION_SWEEP_BUDGET_SECONDS'] = float(os.getenv('RESERVATION_SWEEP_BUDGET_SECONDS', 5))
+
+    # Session configuration: 'sqlite' (default; server-side, shared by the worker
+    # processes on one host), 'memory' (server-side in this process only;
+    # single-process deployments) or 'cookie' (Flask's signed-cookie sessions)
+    app.config['SESSION_TYPE'] = os.getenv('SESSION_TYPE', 'sqlite')
     app.config['SESSION_PERMANENT'] = False
+    app.config['SESSION_IDLE_TIMEOUT'] = int(os.getenv('SESSION_IDLE_TIMEOUT', 1800))
+    app.config['SESSION_MEMORY_BUDGET'] = int(os.getenv('SESSION_MEMORY_BUDGET', 8 * 1024 * 1024))
+    app.config['SESSION_SQLITE_PATH'] = os.getenv('SESSION_SQLITE_PATH',
+                                                  os.path.join(app.instance_path, 'sessions.sqlite3'))
+    app.config['SESSION_SWEEP_SECONDS'] = int(os.getenv('SESSION_SWEEP_SECONDS', 300))
+
+    # Bearer token required by /metrics (unset: the endpoint is disabled)
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+    # Async gate API (app/gate_asgi.py): bearer token (unset: disabled), MySQL
+    # connections, callers allowed to wait for one and for how long before a
+    # 503, and the employee its writes are attributed to
+    app.config['GATE_API_TOKEN'] = os.getenv('GATE_API_TOKEN')
+    app.config['GATE_DB_POOL_SIZE'] = int(os.getenv('GATE_DB_POOL_SIZE', 10))
+    app.config['GATE_MAX_PENDING'] = int(os.getenv('GATE_MAX_PENDING', 100))
+    app.config['GATE_DB_TIMEOUT'] = float(os.getenv('GATE_DB_TIMEOUT', 5))
+    app.config['GATE_EMPLOYEE_ID'] = int(os.getenv('GATE_EMPLOYEE_ID')) if os.getenv('GATE_EMPLOYEE_ID') else None
+
+    # Statement diagnostics: 'dev' prints repeated statements per request and
+    # EXPLAINs slow ones; 'prod' only counts repeats and logs slow statements
+    app.config['DB_DIAGNOSTICS'] = os.getenv('DB_DIAGNOSTICS', 'prod')
+    dev_diagnostics = app.config['DB_DIAGNOSTICS'] == 'dev'
+    app.config['DB_SLOW_QUERY_MS'] = float(os.getenv('DB_SLOW_QUERY_MS', 50 if dev_diagnostics else 500))
+    app.config['DB_SLOW_QUERY_EXPLAIN'] = os.getenv('DB_SLOW_QUERY_EXPLAIN', '1' if dev_diagnostics else '0') == '1'
+    app.config['DB_REPEAT_THRESHOLD'] = int(os.getenv('DB_REPEAT_THRESHOLD', 2))
 
     # Initialize database connector
     from . import db_connector
     db_connector.init_app(app)
 
+    # Per-request DB instrumentation (Server-Timing header, /metrics, slow-query log)
+    from . import db_metrics
+    db_metrics.init_app(app, explain=db_connector.explain_statement)
+
+    # Server-side sessions
+    from . import session_store
+    session_store.init_app(app)
+
+    # Register CLI commands
+    from . import commands
+    commands.init_app(app)
+
+    # Background workers (started with the first request)
+    from . import background
+    background.init_app(app)
+    background.register(app, 'occupancy-sampler', app.config['OCCUPANCY_SAMPLE_SECONDS'],
+                        db_connector.record_occupancy_sample)
+    background.register(app, 'occupancy-downsampler', app.config['OCCUPANCY_DOWNSAMPLE_SECONDS'],
+                        db_connector.downsample_occupancy_history)
+    background.register(app, 'reservation-sweeper', app.config['RESERVATION_SWEEP_SECONDS'],
+                        db_connector.expire_reservations)
+    background.register(app, 'session-sweeper', app.config['SESSION_SWEEP_SECONDS'],
+                        session_store.sweep_sessions)
+
     # Register Blueprints
     from .routes import bp
     app.register_blueprint(bp)
 
-    @app.before_request
-    def restore_mysql_employee_session():
-        """Restore MySQL employee session before each request."""
-        employee_id = session.get('employee_id')
-        if employee_id:
-            try:
-                db, cursor = db_connector.get_db()
-                cursor.execute("SET @current_user_employee_id = %s", (employee_id,))
-            except Exception as e:
-                print(f"MySQL session restore failed: {e}")
-
     return app
 
 
@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class PeriodicWorker:
+    """Runs ``func()`` every ``interval`` seconds on a daemon thread inside an app context.
+
+    The app context is pushed per run, so anything the function borrows
+    through get_db() goes back to the pool when the run finishes. Exceptions
+    and ``{'status': 'error'}`` results are printed and the worker keeps its
+    schedule.
+    """
+
+    def __init__(self, app, name, interval, func):
+        self.app = app
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        started = time.monotonic()
+        try:
+            with self.app.app_context():
+                result = self.func()
+            if isinstance(result, dict) and result.get('status') == 'error':
+                self.failures += 1
+                print(f"Background task {self.name} failed: {result.get('message')}")
+        except Exception as e:
+            self.failures += 1
+            print(f"Background task {self.name} failed: {e}")
+        finally:
+            self.runs += 1
+            self.last_duration = time.monotonic() - started
+
+    def _loop(self):
+        # Align runs to the interval so samples land once per bucket
+        while not self._stop.wait(self.interval - time.time() % self.interval):
+            self.run_once()
+
+
+def init_app(app):
+    """Start registered workers with the first request served by this process.
+
+    Deferring to the first request keeps workers out of `flask` CLI commands
+    and out of the Werkzeug reloader's parent process, which never serves.
+    """
+    app.extensions['background_workers'] = []
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_background_workers():
+        workers = app.extensions['background_workers']
+        if app.extensions.get('background_started') or not workers:
+            return
+        with lock:
+            if app.extensions.get('background_started'):
+                return
+            app.extensions['background_started'] = True
+            for worker in workers:
+                worker.start()
+
+
+def register(app, name, interval, func):
+    """Schedule ``func`` to run every ``interval`` seconds (0 disables it)."""
+    worker = PeriodicWorker(app, name, interval, func)
+    app.extensions['background_workers'].append(worker)
+    return worker
@@ -0,0 +1,64 @@
+import click
+from flask.cli import with_appcontext
+
+from . import db_connector
+
+
+def init_app(app):
+    """Register the maintenance CLI commands (run with `flask --app run <command>`)."""
+    app.cli.add_command(rollup_backfill_command)
+    app.cli.add_command(rollup_check_command)
+    app.cli.add_command(hierarchy_rebuild_command)
+    app.cli.add_command(maintenance_summary_rebuild_command)
+
+
+@click.command('rollup-backfill')
+@click.option('--start', 'start_date', help='First day to rebuild (YYYY-MM-DD); default: all days.')
+@click.option('--end', 'end_date', help='Last day to rebuild (YYYY-MM-DD); default: all days.')
+@with_appcontext
+def rollup_backfill_command(start_date, end_date):
+    """Rebuild Revenue_Rollup from the Payment table."""
+    result = db_connector.backfill_revenue_rollup(start_date, end_date)
+    if result['status'] != 'success':
+        raise click.ClickException(result['message'])
+    click.echo(result['message'])
+
+
+@click.command('rollup-check')
+@click.option('--start', 'start_date', help='First day to check (YYYY-MM-DD).')
+@click.option('--end', 'end_date', help='Last day to check (YYYY-MM-DD).')
+@with_appcontext
+def rollup_check_command(start_date, end_date):
+    """Compare Revenue_Rollup with raw payments; exits non-zero on drift."""
+    result = db_connector.check_revenue_rollup(start_date, end_date)
+    if result['status'] != 'success':
+        raise click.ClickException(result['message'])
+
+    mismatches = result['data']
+    for row in mismatches:
+        click.echo(f"{row['Day']} lot {row['Lot_ID']} {row['Method']}: "
+                   f"payments {row['ExpectedTransactions']} / {row['ExpectedRevenue']}, "
+                   f"rollup {row['RollupTransactions']} / {row['RollupRevenue']}")
+    if mismatches:
+        raise click.ClickException(f"{len(mismatches)} rollup rows out of sync; run `flask rollup-backfill`.")
+    click.echo(f"Revenue rollup consistent ({result['checked']} day/lot/method groups).")
+
+
+@click.command('hierarchy-rebuild')
+@with_appcontext
+def hierarchy_rebuild_command():
+    """Rebuild Employee_Closure from Employee.ManagerID."""
+    result = db_connector.rebuild_employee_closure()
+    if result['status'] != 'success':
+        raise click.ClickException(result['message'])
+    click.echo(result['message'])
+
+
+@click.command('maintenance-summary-rebuild')
+@with_appcontext
+def maintenance_summary_rebuild_command():
+    """Rebuild Space_Maintenance_Summary (and each log's Lot_ID) from Maintenance_Log."""
+    result = db_connector.rebuild_maintenance_summary()
+    if result['status'] != 'success':
+        raise click.ClickException(result['message'])
+    click.echo(result['message'])
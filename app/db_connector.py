@@ -1,62 +1,199 @@
+import base64
+import copy
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+
 import mysql.connector
 from mysql.connector import Error
-from flask import current_app, g
+from flask import current_app, g, session, has_request_context
+
+from .cache import TTLCache
+from .db_metrics import instrument_cursor
+from .db_pool import ConnectionPool
+from .space_index import SpaceStatusIndex
+from .tariffs import TariffEngine
 
 def init_app(app):
     """Initializes app for database use (Flask context)."""
+    app.extensions['db_pool'] = ConnectionPool(
+        connect_args={
+            'host': app.config['DB_HOST'],
+            'user': app.config['DB_USER'],
+            'password': app.config['DB_PASSWORD'],
+            'database': app.config['DB_NAME'],
+        },
+        size=app.config['DB_POOL_SIZE'],
+        max_overflow=app.config['DB_POOL_MAX_OVERFLOW'],
+        timeout=app.config['DB_POOL_TIMEOUT'],
+        ping_interval=app.config['DB_POOL_PING_INTERVAL'],
+    )
+    app.extensions['space_index'] = SpaceStatusIndex(max_age=app.config['SPACE_INDEX_MAX_AGE'])
+    app.extensions['tariff_engine'] = TariffEngine(max_age=app.config['TARIFF_REFRESH_SECONDS'])
+    app.extensions['history_cache'] = TTLCache(maxsize=app.config['HISTORY_CACHE_SIZE'],
+                                               ttl=app.config['HISTORY_CACHE_TTL'])
+    app.extensions['auth_cache'] = TTLCache(maxsize=app.config['AUTH_CACHE_SIZE'],
+                                            ttl=app.config['AUTH_CACHE_TTL'])
+    app.extensions['reference_cache'] = TTLCache(maxsize=app.config['REFERENCE_CACHE_SIZE'],
+                                                 ttl=app.config['REFERENCE_CACHE_TTL'])
     app.teardown_appcontext(close_db)
 
-def get_db():
-    """Establish or reuse a MySQL connection."""
+def get_db(bind_employee=False):
+    """Borrow a pooled MySQL connection for the current request.
+
+    Pass ``bind_employee=True`` from writes and procedures that rely on
+    @current_user_employee_id; read-only callers never pay for it.
+    """
     if 'db' not in g:
         try:
-            g.db = mysql.connector.connect(
-                host=current_app.config['DB_HOST'],
-                user=current_app.config['DB_USER'],
-                password=current_app.config['DB_PASSWORD'],
-                database=current_app.config['DB_NAME']
-            )
-            g.cursor = g.db.cursor(dictionary=True)
+            g.db = current_app.extensions['db_pool'].checkout()
+            g.cursor = instrument_cursor(g.db.cursor(dictionary=True), __name__)
         except Error as e:
+            g.pop('db', None)
             print(f"Database connection failed: {e}")
             return None, None
+    if bind_employee:
+        try:
+            bind_employee_session(g.db, g.cursor)
+        except Error as e:
+            print(f"MySQL session restore failed: {e}")
+            return None, None
     return g.db, g.cursor
 
+def bind_employee_session(db, cursor):
+    """Set @current_user_employee_id for the logged-in employee, if not already set.
+
+    The pool remembers the value each connection carries, so the SET is only
+    sent when the connection was last bound for a different employee.
+    """
+    employee_id = session.get('employee_id') if has_request_context() else None
+    pool = current_app.extensions['db_pool']
+    if pool.get_session_var(db, 'current_user_employee_id') == employee_id:
+        return
+    cursor.execute("SET @current_user_employee_id = %s", (employee_id,))
+    pool.set_session_var(db, 'current_user_employee_id', employee_id)
+
 def close_db(e=None):
-    """Close the database connection at the end of request."""
+    """Return the request's connection to the pool at the end of request."""
     db = g.pop('db', None)
     cursor = g.pop('cursor', None)
     if cursor:
-        cursor.close()
+        try:
+            cursor.close()
+        except Error:
+            pass
     if db:
-        db.close()
+        current_app.extensions['db_pool'].checkin(db)
 
-# ---------------------------------------------------------------------
-# Authentication & Procedures
-# ---------------------------------------------------------------------
+def get_pool_stats():
+    """Report connection pool counters (checkouts, waits, wait time, occupancy)."""
+    return current_app.extensions['db_pool'].stats()
 
-def authenticate_user(username, password):
-    """Authenticate employee using stored procedure."""
-    db, cursor = get_db()
-    if not db:
-        return {"status": "error", "message": "Database connection failed."}
+def get_db_function_stats():
+    """Report lifetime statement counts, rows, DB time and slowest statement per function."""
+    return current_app.extensions['db_metrics'].function_stats()
 
-    try:
-        cursor.callproc('AuthenticateUser', (username, password))
-        cursor.execute("SELECT @current_user_employee_id;")
-        result = cursor.fetchone()
-        employee_id = result.get('@current_user_employee_id')
+def get_db_diagnostics():
+    """Report the recent slow-query log and the statements most often repeated per request."""
+    return current_app.extensions['db_metrics'].diagnostics_report()
 
-        if employee_id:
-            # Fetch the user's role
-            cursor.execute("SELECT Role FROM Employee WHERE EmployeeID = %s", (employee_id,))
-            employee_role = cursor.fetchone()
-            role = employee_role.get('Role') if employee_role else 'Attendant' # Default fallback
+def explain_statement(sql, params=None):
+    """EXPLAIN a statement for the slow-query log on the context's own connection.
 
-            return {"status": "success", "employee_id": employee_id, "role": role}
-        return {"status": "error", "message": "Invalid credentials or unauthorized user."}
+    The metrics teardown runs before close_db, so the connection that ran the
+    slow statement is still in ``g``; no second connection is checked out.
+    """
+    db = g.get('db')
+    if db is None:
+        return ["EXPLAIN skipped: no connection held"]
+    try:
+        cursor = db.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
     except Error as e:
-        return {"status": "error", "message": str(e)}
+        return [f"EXPLAIN failed: {e}"]
+
+def get_cache_stats():
+    """Report hit/miss counters for the in-process query caches."""
+    return {
+        'customer_history': current_app.extensions['history_cache'].stats(),
+        'auth': current_app.extensions['auth_cache'].stats(),
+        'reference': current_app.extensions['reference_cache'].stats(),
+    }
+
+def _cached_reference(key):
+    """Return a private copy of a cached reference-data result (services, lots, hierarchy), or None."""
+    cached = current_app.extensions['reference_cache'].get(key)
+    return copy.deepcopy(cached) if cached is not None else None
+
+def _cache_reference(key, result, tag):
+    """Cache a copy of a successful reference-data result until ``tag`` is invalidated or the TTL passes.
+
+    Invalidation only reaches this process's cache, so another worker can
+    serve its copy for up to REFERENCE_CACHE_TTL (HIERARCHY_CACHE_TTL for
+    the employee hierarchy, which changes more often) after a write.
+    """
+    if result['status'] == 'success':
+        ttl = current_app.config['HIERARCHY_CACHE_TTL'] if tag == 'employees' else None
+        current_app.extensions['reference_cache'].set(key, copy.deepcopy(result), tag=tag, ttl=ttl)
+    return result
+
+def invalidate_reference(tag):
+    """Drop cached reference data for 'services', 'lots' or 'employees' after a write."""
+    current_app.extensions['reference_cache'].invalidate(tag)
+
+def render_metrics():
+    """Render DB/request histograms, pool and cache counters in Prometheus text format."""
+    return current_app.extensions['db_metrics'].render(get_pool_stats(), get_cache_stats())
+
+# ---------------------------------------------------------------------
+# Authentication & Procedures
+# ---------------------------------------------------------------------
+
+def authenticate_user(username, password):
+    """Authenticate an employee against Users in a single round trip.
+
+    Mirrors the AuthenticateUser procedure (the hash_password_on_insert
+    trigger stores SHA2(password, 256) as hex) but compares the hash here,
+    so a login is one indexed lookup, or none while the user's row is in the
+    auth cache. @current_user_employee_id is no longer set at login;
+    get_db(bind_employee=True) sets it when a write needs it.
+    """
+    cache = current_app.extensions['auth_cache']
+    key = _credentials_key(username)
+    credentials = cache.get(key)
+    if credentials is None:
+        db, cursor = get_db()
+        if not db:
+            return {"status": "error", "message": "Database connection failed."}
+        try:
+            cursor.execute(
+                """
+                    SELECT U.hashed_password, U.EmployeeID, E.Role
+                    FROM Users U
+                    LEFT JOIN Employee E ON E.EmployeeID = U.EmployeeID
+                    WHERE U.username = %s;
+                """,
+                (username,),
+            )
+            credentials = cursor.fetchone()
+        except Error as e:
+            return {"status": "error", "message": str(e)}
+        if credentials:
+            cache.set(key, credentials)
+
+    if credentials and credentials['EmployeeID']:
+        supplied = hashlib.sha256((password or '').encode()).hexdigest()
+        if hmac.compare_digest(supplied, credentials['hashed_password'].lower()):
+            role = credentials['Role'] or 'Attendant' # Default fallback
+            return {"status": "success", "employee_id": credentials['EmployeeID'], "role": role}
+    return {"status": "error", "message": "Invalid credentials or unauthorized user."}
     
 def register_user(name, username, password):
     """Register a new employee and user."""
@@ -74,6 +211,8 @@ def register_user(name, username, password):
             reg_result = result.fetchone()
 
         if reg_result:
+            invalidate_credentials(username)
+            invalidate_reference('employees')
             return {"status": "success", "message": "Registration successful!", "employee_id": reg_result['NewEmployeeID']}
         else:
             return {"status": "error", "message": "Registration failed."}
@@ -85,56 +224,190 @@ def register_user(name, username, password):
             return {"status": "error", "message": "Username already exists. Please choose another."}
         return {"status": "error", "message": str(e)}
 
+def invalidate_credentials(username):
+    """Drop a username's cached credentials so the next login re-reads Users."""
+    current_app.extensions['auth_cache'].delete(_credentials_key(username))
+
+def _credentials_key(username):
+    # Users.username compares case-insensitively, so 'Alice.J' and 'alice.j'
+    # are one user and must share one cache entry
+    return (username or '').casefold()
+
 # ---------------------------------------------------------------------
 # Reports
 # ---------------------------------------------------------------------
 
-def get_real_time_occupancy_report():
-    """Fetch real-time parking space occupancy summary."""
-    db, cursor = get_db()
-    if not db:
-        return {'status': 'error', 'message': 'Database connection failed.'}
+SPACE_INDEX_SELECT = "SELECT SpaceID, Lot_ID, SpaceNumber, SpaceType, Status FROM Parking_Space;"
+
+def get_space_index():
+    """Return the in-memory space-status index, rebuilding it from MySQL when stale."""
+    index = current_app.extensions['space_index']
+    if index.needs_rebuild():
+        db, cursor = get_db()
+        if not db:
+            return None
+        cursor.execute(SPACE_INDEX_SELECT)
+        index.load(cursor.fetchall())
+    return index
+
+def _record_space_status(space_id, status):
+    """Mirror a committed Parking_Space status change into the index."""
+    current_app.extensions['space_index'].set_status(space_id, status)
+
+def get_space_status_changes(epoch=None, since=None):
+    """Fetch the space-status version plus the spaces changed since ``since``.
+
+    Returns a full snapshot when the client's epoch/version cannot be served
+    incrementally (first load, another worker's index, or a trimmed log).
+    """
+    try:
+        index = get_space_index()
+        if not index:
+            return {'status': 'error', 'message': 'Database connection failed.'}
+        return {'status': 'success', 'data': index.changes_since(epoch, since)}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
 
+def get_real_time_occupancy_report(lot_id=None, space_type=None):
+    """Fetch real-time parking space occupancy summary (served from the space index)."""
     try:
-        query = """
-            SELECT
-                COUNT(SpaceID) AS TotalSpaces,
-                SUM(CASE WHEN Status = 'Occupied' THEN 1 ELSE 0 END) AS OccupiedCount,
-                SUM(CASE WHEN Status = 'Reserved' THEN 1 ELSE 0 END) AS ReservedCount,
-                SUM(CASE WHEN Status = 'Vacant' THEN 1 ELSE 0 END) AS VacantCount
-            FROM Parking_Space;
-        """
-        cursor.execute(query)
-        data = cursor.fetchone()
-        return {'status': 'success', 'data': data}
+        index = get_space_index()
+        if not index:
+            return {'status': 'error', 'message': 'Database connection failed.'}
+        return {'status': 'success', 'data': index.counts(lot_id, space_type)}
     except Error as e:
         return {'status': 'error', 'message': str(e)}
 
-def get_financial_report():
-    """Generate financial summary grouped by payment method."""
+def get_financial_report(start_date=None, end_date=None, lot_id=None):
+    """Generate financial summary grouped by payment method (from Revenue_Rollup)."""
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
 
+    where, params = _rollup_filters(start_date, end_date, lot_id)
     try:
-        query = """
+        query = f"""
             SELECT
                 Method,
-                COUNT(PaymentID) AS TotalTransactions,
-                SUM(Amount) AS TotalRevenue
-            FROM Payment
-            WHERE Method IS NOT NULL
+                SUM(TotalTransactions) AS TotalTransactions,
+                SUM(TotalRevenue) AS TotalRevenue
+            FROM Revenue_Rollup
+            {where}
             GROUP BY Method
             ORDER BY TotalRevenue DESC;
         """
-        cursor.execute(query)
+        cursor.execute(query, params)
         data = cursor.fetchall()
         return {'status': 'success', 'data': data}
     except Error as e:
         return {'status': 'error', 'message': str(e)}
 
+def get_daily_revenue(start_date=None, end_date=None, lot_id=None):
+    """Revenue per day and payment method (from Revenue_Rollup)."""
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+
+    where, params = _rollup_filters(start_date, end_date, lot_id)
+    try:
+        cursor.execute(f"""
+            SELECT Day, Method,
+                   SUM(TotalTransactions) AS TotalTransactions,
+                   SUM(TotalRevenue) AS TotalRevenue
+            FROM Revenue_Rollup
+            {where}
+            GROUP BY Day, Method
+            ORDER BY Day, Method;
+        """, params)
+        return {'status': 'success', 'data': cursor.fetchall()}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+
+def _rollup_filters(start_date, end_date, lot_id, day_column='Day', lot_column='Lot_ID'):
+    clauses, params = [], []
+    if start_date:
+        clauses.append(f"{day_column} >= %s")
+        params.append(start_date)
+    if end_date:
+        clauses.append(f"{day_column} <= %s")
+        params.append(end_date)
+    if lot_id is not None:
+        clauses.append(f"{lot_column} = %s")
+        params.append(lot_id)
+    return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+# Raw payments grouped exactly like Revenue_Rollup's key
+_PAYMENT_ROLLUP_SELECT = """
+    SELECT DATE(p.Timestamp) AS Day, IFNULL(ps.Lot_ID, 0) AS Lot_ID, p.Method,
+           COUNT(*) AS TotalTransactions, SUM(p.Amount) AS TotalRevenue
+    FROM Payment p
+    LEFT JOIN Parking_Record pr ON pr.RecordID = p.RecordID
+    LEFT JOIN Parking_Space ps ON ps.SpaceID = pr.SpaceID
+    {where}
+    GROUP BY DATE(p.Timestamp), IFNULL(ps.Lot_ID, 0), p.Method
+"""
+
+def backfill_revenue_rollup(start_date=None, end_date=None):
+    """Rebuild Revenue_Rollup from Payment, for all days or a date range."""
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+
+    rollup_where, rollup_params = _rollup_filters(start_date, end_date, None)
+    payment_where, payment_params = _rollup_filters(start_date, end_date, None, day_column='DATE(p.Timestamp)')
+    try:
+        # INSERT ... SELECT share-locks the payments it reads, so exits that
+        # land mid-rebuild wait for the commit instead of being counted twice.
+        cursor.execute(f"DELETE FROM Revenue_Rollup {rollup_where};", rollup_params)
+        cursor.execute(f"""
+            INSERT INTO Revenue_Rollup (Day, Lot_ID, Method, TotalTransactions, TotalRevenue)
+            {_PAYMENT_ROLLUP_SELECT.format(where=payment_where)};
+        """, payment_params)
+        rows = cursor.rowcount
+        db.commit()
+        return {'status': 'success', 'message': f'Revenue rollup rebuilt ({rows} rows).', 'rows': rows}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
+
+def check_revenue_rollup(start_date=None, end_date=None):
+    """Compare Revenue_Rollup with raw Payment totals and list any mismatched keys."""
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+
+    rollup_where, rollup_params = _rollup_filters(start_date, end_date, None)
+    payment_where, payment_params = _rollup_filters(start_date, end_date, None, day_column='DATE(p.Timestamp)')
+    try:
+        cursor.execute(_PAYMENT_ROLLUP_SELECT.format(where=payment_where), payment_params)
+        expected = {(r['Day'], r['Lot_ID'], r['Method']): r for r in cursor.fetchall()}
+        cursor.execute(f"""
+            SELECT Day, Lot_ID, Method, TotalTransactions, TotalRevenue
+            FROM Revenue_Rollup {rollup_where};
+        """, rollup_params)
+        actual = {(r['Day'], r['Lot_ID'], r['Method']): r for r in cursor.fetchall()}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys(), key=lambda k: (k[0], k[1], k[2])):
+        want, got = expected.get(key), actual.get(key)
+        want_totals = (want['TotalTransactions'], want['TotalRevenue']) if want else (0, 0)
+        got_totals = (got['TotalTransactions'], got['TotalRevenue']) if got else (0, 0)
+        if want_totals != got_totals:
+            mismatches.append({
+                'Day': key[0], 'Lot_ID': key[1], 'Method': key[2],
+                'ExpectedTransactions': want_totals[0], 'ExpectedRevenue': want_totals[1],
+                'RollupTransactions': got_totals[0], 'RollupRevenue': got_totals[1],
+            })
+    return {'status': 'success', 'data': mismatches, 'checked': len(expected)}
+
 def get_employee_hierarchy_report():
-    """Fetch employee-manager relationship report."""
+    """Fetch employee-manager report with each employee's depth and team size (cached)."""
+    cached = _cached_reference('hierarchy')
+    if cached is not None:
+        return cached
+
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
@@ -145,139 +418,364 @@ def get_employee_hierarchy_report():
                 e.EmployeeID,
                 e.Name AS EmployeeName,
                 e.Role,
-                m.Name AS ManagerName
+                e.ManagerID,
+                m.Name AS ManagerName,
+                lvl.Depth,
+                team.TeamSize
             FROM Employee e
             LEFT JOIN Employee m ON e.ManagerID = m.EmployeeID
+            LEFT JOIN (
+                SELECT DescendantID, MAX(Depth) AS Depth FROM Employee_Closure GROUP BY DescendantID
+            ) lvl ON lvl.DescendantID = e.EmployeeID
+            LEFT JOIN (
+                SELECT AncestorID, COUNT(*) - 1 AS TeamSize FROM Employee_Closure GROUP BY AncestorID
+            ) team ON team.AncestorID = e.EmployeeID
             ORDER BY e.Role, e.Name;
         """
         cursor.execute(query)
         data = cursor.fetchall()
-        return {'status': 'success', 'data': data}
+        return _cache_reference('hierarchy', {'status': 'success', 'data': data}, 'employees')
     except Error as e:
         return {'status': 'error', 'message': str(e)}
 
 
-# --- REPLACE your old get_maintenance_audit_report function ---
-def get_maintenance_audit_report():
-    """Retrieve all logs AND all spaces currently under maintenance."""
+def get_employee_subtree(manager_id, max_depth=None):
+    """Fetch everyone under a manager (and the manager, at Depth 0) from Employee_Closure.
+
+    One range read on the closure primary key, however deep the tree is;
+    ``max_depth=1`` gives direct reports only.
+    """
+    key = ('subtree', int(manager_id), max_depth)
+    cached = _cached_reference(key)
+    if cached is not None:
+        return cached
+
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
-
+    depth_filter = "AND c.Depth <= %s" if max_depth is not None else ""
+    params = (manager_id, max_depth) if max_depth is not None else (manager_id,)
     try:
-        # This new query gets all spaces with logs AND spaces marked 'Maintenance'
-        query = """
-            SELECT 
-                ps.SpaceID, 
-                ps.SpaceNumber,
-                ps.Status,
-                ml.LogID, 
-                ml.Description, 
-                COALESCE(ml.Cost, 0) AS Cost, 
-                ml.Maintenance_data
-            FROM Parking_Space ps
-            LEFT JOIN Maintenance_Log ml ON ps.SpaceID = ml.SpaceID
-            WHERE ps.Status = 'Maintenance' OR ml.LogID IS NOT NULL
-            ORDER BY ps.Status DESC, ml.Maintenance_data DESC, ps.SpaceNumber;
-        """
-        cursor.execute(query)
-        data = cursor.fetchall() or []
-        return {'status': 'success', 'data': data}
-
+        cursor.execute(f"""
+            SELECT
+                e.EmployeeID,
+                e.Name AS EmployeeName,
+                e.Role,
+                e.ManagerID,
+                m.Name AS ManagerName,
+                c.Depth
+            FROM Employee_Closure c
+            JOIN Employee e ON e.EmployeeID = c.DescendantID
+            LEFT JOIN Employee m ON m.EmployeeID = e.ManagerID
+            WHERE c.AncestorID = %s {depth_filter}
+            ORDER BY c.Depth, e.Name;
+        """, params)
+        data = cursor.fetchall()
     except Error as e:
         return {'status': 'error', 'message': str(e)}
+    if not data:
+        return {'status': 'error', 'message': 'Employee not found.'}
+    return _cache_reference(key, {'status': 'success', 'data': data}, 'employees')
+
+def get_employee_ancestors(employee_id):
+    """Fetch an employee's management chain, top of the tree first."""
+    key = ('ancestors', int(employee_id))
+    cached = _cached_reference(key)
+    if cached is not None:
+        return cached
 
-# --- ADD these two new functions at the end of the file ---
-def create_maintenance_log(space_id, description, cost):
-    """Call stored procedure to create a new maintenance log."""
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
-        cursor.callproc('CreateMaintenanceLog', (space_id, description, cost))
+        cursor.execute("""
+            SELECT e.EmployeeID, e.Name AS EmployeeName, e.Role, c.Depth
+            FROM Employee_Closure c
+            JOIN Employee e ON e.EmployeeID = c.AncestorID
+            WHERE c.DescendantID = %s AND c.Depth > 0
+            ORDER BY c.Depth DESC;
+        """, (employee_id,))
+        data = cursor.fetchall()
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+    return _cache_reference(key, {'status': 'success', 'data': data}, 'employees')
+
+def set_employee_manager(employee_id, manager_id):
+    """Re-parent an employee (and their whole team); triggers update Employee_Closure."""
+    db, cursor = get_db(bind_employee=True)
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute("UPDATE Employee SET ManagerID = %s WHERE EmployeeID = %s;", (manager_id, employee_id))
+        if cursor.rowcount == 0:
+            db.rollback()
+            return {'status': 'error', 'message': 'Employee not found or manager unchanged.'}
         db.commit()
-        return {'status': 'success', 'message': 'Maintenance log created.'}
+        invalidate_reference('employees')
+        return {'status': 'success', 'message': 'Reporting line updated successfully.'}
     except Error as e:
         db.rollback()
         return {'status': 'error', 'message': str(e)}
 
-def complete_maintenance(space_id):
-    """Call stored procedure to set space to vacant."""
+def rebuild_employee_closure():
+    """Rebuild Employee_Closure from Employee.ManagerID with a recursive CTE."""
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
-        cursor.callproc('CompleteMaintenance', (space_id,))
+        cursor.execute("DELETE FROM Employee_Closure;")
+        cursor.execute("""
+            INSERT INTO Employee_Closure (AncestorID, DescendantID, Depth)
+            WITH RECURSIVE tree (AncestorID, DescendantID, Depth) AS (
+                SELECT EmployeeID, EmployeeID, 0 FROM Employee
+                UNION ALL
+                SELECT t.AncestorID, e.EmployeeID, t.Depth + 1
+                FROM tree t
+                JOIN Employee e ON e.ManagerID = t.DescendantID
+            )
+            SELECT AncestorID, DescendantID, Depth FROM tree;
+        """)
+        rows = cursor.rowcount
         db.commit()
-        return {'status': 'success', 'message': 'Space set to Vacant.'}
+        invalidate_reference('employees')
+        return {'status': 'success', 'message': f'Employee closure rebuilt ({rows} rows).', 'rows': rows}
     except Error as e:
         db.rollback()
         return {'status': 'error', 'message': str(e)}
 
-def get_customer_history(customer_id):
-    """Fetch full parking history for a given customer (based on Step 9 demo query)."""
+
+# Maintenance audit pages, newest log first; (SpaceID, LogID) is the log's key.
+MAINTENANCE_PAGE_SIZE = 50
+MAINTENANCE_SORT = {
+    'recent': [('ml.Maintenance_data', 'Maintenance_data'), ('ml.SpaceID', 'SpaceID'), ('ml.LogID', 'LogID')],
+}
+
+def get_maintenance_audit_report(after=None, limit=MAINTENANCE_PAGE_SIZE, start_date=None, end_date=None, lot_id=None, status=None):
+    """Fetch one page of maintenance logs, newest first, with date, lot and space-status filters.
+
+    Pages are keyset-paginated along idx_maintenance_date, or along
+    idx_maintenance_lot_date (on the lot copied onto each log) when a lot is
+    given, so a page costs the same however many years of logs exist. The
+    status filter joins the space's current status, which idx_space_status
+    can drive when few spaces have it. Each row carries its space's all-time
+    totals from Space_Maintenance_Summary. Spaces under maintenance with no
+    log yet are listed by get_unlogged_maintenance_spaces.
+    """
+    where, params = [], []
+    if start_date:
+        where.append("ml.Maintenance_data >= %s")
+        params.append(start_date)
+    if end_date:
+        where.append("ml.Maintenance_data <= %s")
+        params.append(end_date)
+    if lot_id:
+        where.append("ml.Lot_ID = %s")
+        params.append(lot_id)
+    if status:
+        where.append("ps.Status = %s")
+        params.append(status)
+    return _keyset_page(
+        """
+            SELECT
+                ml.SpaceID,
+                ml.LogID,
+                ps.SpaceNumber,
+                ps.Lot_ID,
+                ps.Status,
+                ml.Description,
+                ml.Cost,
+                ml.Maintenance_data,
+                sms.LogCount AS SpaceLogCount,
+                sms.TotalCost AS SpaceTotalCost,
+                sms.LastMaintenance
+            FROM Maintenance_Log ml
+            JOIN Parking_Space ps ON ps.SpaceID = ml.SpaceID
+            LEFT JOIN Space_Maintenance_Summary sms ON sms.SpaceID = ml.SpaceID
+        """,
+        MAINTENANCE_SORT, 'recent', after, limit, descending=True,
+        where=' AND '.join(where) or None, where_params=params,
+    )
+
+def get_unlogged_maintenance_spaces(lot_id=None):
+    """Spaces under maintenance that have no log yet (the paged audit only walks logs)."""
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute(f"""
+            SELECT ps.SpaceID, ps.SpaceNumber, ps.Lot_ID, ps.Status
+            FROM Parking_Space ps
+            WHERE ps.Status = 'Maintenance' {"AND ps.Lot_ID = %s" if lot_id else ""}
+              AND NOT EXISTS (SELECT 1 FROM Space_Maintenance_Summary sms WHERE sms.SpaceID = ps.SpaceID)
+            ORDER BY ps.SpaceNumber;
+        """, (lot_id,) if lot_id else ())
+        return {'status': 'success', 'data': cursor.fetchall()}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+
+def get_maintenance_summary(lot_id=None):
+    """Totals for the maintenance page header, read from Space_Maintenance_Summary.
 
+    Cost and log counts are all-time (one summary row per space, not per
+    log); spaces under maintenance come from idx_space_status.
+    """
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    lot_filter = "WHERE ps.Lot_ID = %s" if lot_id else ""
+    params = (lot_id,) if lot_id else ()
     try:
-        query = """
+        cursor.execute(f"""
             SELECT
-                C.Name AS CustomerName,
-                V.LicensePlate,
-                PR.EntryTime,
-                PR.ExitTime,
-                PR.Duration AS DurationMinutes,
-                P.Amount AS FeePaid,
-                P.Method
-            FROM Customer C
-            JOIN Vehicle V ON C.CustomerID = V.CustomerID
-            JOIN Parking_Record PR ON V.LicensePlate = PR.LicensePlate
-            LEFT JOIN Payment P ON PR.PaymentID = P.PaymentID
-            WHERE C.CustomerID = %s
-            ORDER BY PR.EntryTime DESC;
-        """
-        cursor.execute(query, (customer_id,))
-        results = cursor.fetchall()
-        return {'status': 'success', 'data': results}
+                COALESCE(SUM(sms.LogCount), 0) AS TotalLogs,
+                COALESCE(SUM(sms.TotalCost), 0) AS TotalCost,
+                COUNT(*) AS SpacesWithLogs
+            FROM Space_Maintenance_Summary sms
+            JOIN Parking_Space ps ON ps.SpaceID = sms.SpaceID
+            {lot_filter};
+        """, params)
+        totals = cursor.fetchone()
+        cursor.execute(f"""
+            SELECT COUNT(*) AS UnderMaintenance
+            FROM Parking_Space ps
+            WHERE ps.Status = 'Maintenance' {"AND ps.Lot_ID = %s" if lot_id else ""};
+        """, params)
+        totals.update(cursor.fetchone())
+        return {'status': 'success', 'data': totals}
     except Error as e:
         return {'status': 'error', 'message': str(e)}
-    
-def get_vacant_space_list():
-    """Fetch a list of all vacant parking spaces."""
+
+def rebuild_maintenance_summary():
+    """Rebuild Space_Maintenance_Summary from Maintenance_Log (and re-copy each log's Lot_ID)."""
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute("""
+            UPDATE Maintenance_Log ml
+            JOIN Parking_Space ps ON ps.SpaceID = ml.SpaceID
+            SET ml.Lot_ID = ps.Lot_ID
+            WHERE NOT (ml.Lot_ID <=> ps.Lot_ID);
+        """)
+        cursor.execute("DELETE FROM Space_Maintenance_Summary;")
+        cursor.execute("""
+            INSERT INTO Space_Maintenance_Summary (SpaceID, LogCount, TotalCost, LastMaintenance)
+            SELECT SpaceID, COUNT(*), SUM(Cost), MAX(Maintenance_data)
+            FROM Maintenance_Log
+            GROUP BY SpaceID;
+        """)
+        rows = cursor.rowcount
+        db.commit()
+        return {'status': 'success', 'message': f'Maintenance summary rebuilt ({rows} spaces).', 'rows': rows}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
 
+# --- ADD these two new functions at the end of the file ---
+def create_maintenance_log(space_id, description, cost):
+    """Call stored procedure to create a new maintenance log."""
+    db, cursor = get_db(bind_employee=True)
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
     try:
-        query = """
-            SELECT SpaceID, SpaceNumber
-            FROM Parking_Space
-            WHERE Status = 'Vacant'
-            ORDER BY SpaceNumber;
-        """
-        cursor.execute(query)
-        data = cursor.fetchall()
-        return {'status': 'success', 'data': data}
+        cursor.callproc('CreateMaintenanceLog', (space_id, description, cost))
+        db.commit()
+        _record_space_status(space_id, 'Maintenance')
+        return {'status': 'success', 'message': 'Maintenance log created.'}
     except Error as e:
+        db.rollback()
         return {'status': 'error', 'message': str(e)}
-    
 
-def get_all_parking_spaces():
-    """Fetch all parking spaces with their details."""
-    db, cursor = get_db()
+def complete_maintenance(space_id):
+    """Call stored procedure to set space to vacant."""
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.callproc('CompleteMaintenance', (space_id,))
+        db.commit()
+        _record_space_status(space_id, 'Vacant')
+        return {'status': 'success', 'message': 'Space set to Vacant.'}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
 
+# Customer history pages, newest visit first; RecordID breaks EntryTime ties.
+HISTORY_PAGE_SIZE = 25
+HISTORY_SORT = {'recent': [('PR.EntryTime', 'EntryTime'), ('PR.RecordID', 'RecordID')]}
+HISTORY_SELECT = """
+    SELECT
+        C.Name AS CustomerName,
+        PR.LicensePlate,
+        PR.RecordID,
+        PR.EntryTime,
+        PR.ExitTime,
+        PR.Duration AS DurationMinutes,
+        P.Amount AS FeePaid,
+        P.Method
+    FROM Parking_Record PR
+    JOIN Customer C ON C.CustomerID = PR.CustomerID
+    LEFT JOIN Payment P ON PR.PaymentID = P.PaymentID
+"""
+
+def history_filters(customer_id, start_date=None, end_date=None):
+    """WHERE clause and params selecting one customer's records, optionally by entry date."""
+    where = ["PR.CustomerID = %s"]
+    params = [customer_id]
+    if start_date:
+        where.append("PR.EntryTime >= %s")
+        params.append(start_date)
+    if end_date:
+        where.append("PR.EntryTime < %s + INTERVAL 1 DAY")
+        params.append(end_date)
+    return ' AND '.join(where), params
+
+def get_customer_history(customer_id, after=None, limit=HISTORY_PAGE_SIZE, start_date=None, end_date=None):
+    """Fetch one page of a customer's parking history, newest first, with optional date range.
+
+    Pages are keyset-paginated on (EntryTime, RecordID) over the owner copied
+    onto each record, so a page is one range of idx_record_customer_history
+    with no sort. They are cached per customer until one of the customer's
+    vehicles enters or exits (or HISTORY_CACHE_TTL passes).
+    """
+    cache = current_app.extensions['history_cache']
+    key = (customer_id, after, limit, start_date, end_date)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    where, params = history_filters(customer_id, start_date, end_date)
+    result = _keyset_page(HISTORY_SELECT, HISTORY_SORT, 'recent', after, limit, descending=True,
+                          where=where, where_params=params)
+    if result['status'] == 'success':
+        cache.set(key, result, tag=int(customer_id))
+    return result
+
+def invalidate_customer_history(*customer_ids):
+    """Drop cached history pages for customers whose vehicles just entered or exited."""
+    cache = current_app.extensions['history_cache']
+    for customer_id in customer_ids:
+        if customer_id is not None:
+            cache.invalidate(int(customer_id))
+
+def get_vacant_space_list(lot_id=None, space_type=None):
+    """Fetch a list of all vacant parking spaces (served from the space index)."""
     try:
-        query = """
-            SELECT SpaceID, SpaceNumber, SpaceType, Status
-            FROM Parking_Space
-            ORDER BY SpaceNumber;
-        """
-        cursor.execute(query)
-        data = cursor.fetchall()
-        return {'status': 'success', 'data': data}
+        index = get_space_index()
+        if not index:
+            return {'status': 'error', 'message': 'Database connection failed.'}
+        return {'status': 'success', 'data': index.vacant_spaces(lot_id, space_type)}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+    
+
+def get_all_parking_spaces():
+    """Fetch all parking spaces with their details (served from the space index)."""
+    try:
+        index = get_space_index()
+        if not index:
+            return {'status': 'error', 'message': 'Database connection failed.'}
+        return {'status': 'success', 'data': index.all_spaces()}
     except Error as e:
         return {'status': 'error', 'message': str(e)}
     
@@ -317,205 +815,983 @@ def get_all_vehicles_report():
 
 
 
+# Keyset (seek) pagination for the manager reports. Each sort option is an
+# ordered list of (SQL expression, result column); the last column must be
+# unique so every row has a distinct position.
+REPORT_PAGE_SIZE = 50
+REPORT_MAX_PAGE_SIZE = 500
+
+CUSTOMER_SORTS = {
+    'name': [('Name', 'Name'), ('CustomerID', 'CustomerID')],
+    'id': [('CustomerID', 'CustomerID')],
+}
+
+VEHICLE_SORTS = {
+    'owner': [('c.Name', 'CustomerName'), ('v.LicensePlate', 'LicensePlate')],
+    'plate': [('v.LicensePlate', 'LicensePlate')],
+}
+
+def get_customers_page(after=None, limit=REPORT_PAGE_SIZE, sort='name', descending=False):
+    """Fetch one page of customers after the given cursor."""
+    return _keyset_page(
+        "SELECT CustomerID, Name, Phone, Email, PaymentCount FROM Customer",
+        CUSTOMER_SORTS, sort, after, limit, descending,
+    )
+
+def get_vehicles_page(after=None, limit=REPORT_PAGE_SIZE, sort='owner', descending=False):
+    """Fetch one page of vehicles (with owner names) after the given cursor."""
+    return _keyset_page(
+        """
+            SELECT v.LicensePlate, v.Make, v.Model, v.Color, v.CustomerID, c.Name AS CustomerName
+            FROM Vehicle v
+            JOIN Customer c ON v.CustomerID = c.CustomerID
+        """,
+        VEHICLE_SORTS, sort, after, limit, descending,
+    )
+
+def encode_page_cursor(values):
+    """Encode the sort-key values of a row into an opaque cursor string."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+def decode_page_cursor(cursor_token, expected_length):
+    """Decode a cursor string; returns None if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor_token.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != expected_length:
+        return None
+    return values
+
+def _keyset_where(columns, values, descending):
+    """Build `(a > x) OR (a = x AND b > y) ...` for a multi-column seek."""
+    op = '<' if descending else '>'
+    clauses, params = [], []
+    for i, (expr, _) in enumerate(columns):
+        parts = [f"{prev} = %s" for prev, _ in columns[:i]] + [f"{expr} {op} %s"]
+        clauses.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:i + 1])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+def keyset_query(select_sql, sorts, sort, after, limit, descending, where=None, where_params=()):
+    """Build a keyset-paginated SELECT; returns a page plan or an error result.
+
+    The plan is ``{'query', 'params', 'columns', 'limit'}``; run the query and
+    hand its rows to keyset_result(). The query fetches one row past the
+    page to tell whether there is a next page.
+    """
+    if sort not in sorts:
+        return {'status': 'error', 'message': f"Unknown sort option '{sort}'."}
+    columns = sorts[sort]
+    limit = max(1, min(int(limit), REPORT_MAX_PAGE_SIZE))
+
+    conditions = [where] if where else []
+    params = list(where_params)
+    if after:
+        values = decode_page_cursor(after, len(columns))
+        if values is None:
+            return {'status': 'error', 'message': 'Invalid page cursor.'}
+        seek, seek_params = _keyset_where(columns, values, descending)
+        conditions.append(seek)
+        params.extend(seek_params)
+
+    direction = 'DESC' if descending else 'ASC'
+    query = select_sql
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY " + ", ".join(f"{expr} {direction}" for expr, _ in columns)
+    query += " LIMIT %s"
+    params.append(limit + 1)
+    return {'query': query, 'params': tuple(params), 'columns': columns, 'limit': limit}
+
+def keyset_result(plan, rows):
+    """Trim a page plan's rows to the page and attach the next cursor."""
+    limit, next_cursor = plan['limit'], None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_page_cursor([rows[-1][key] for _, key in plan['columns']])
+    return {'status': 'success', 'data': rows, 'next_cursor': next_cursor}
+
+def _keyset_page(select_sql, sorts, sort, after, limit, descending, where=None, where_params=()):
+    """Run a keyset-paginated SELECT and return rows plus the next cursor."""
+    plan = keyset_query(select_sql, sorts, sort, after, limit, descending, where, where_params)
+    if 'query' not in plan:
+        return plan
+
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute(plan['query'], plan['params'])
+        rows = cursor.fetchall()
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+    return keyset_result(plan, rows)
+
+def stream_customers_report(chunk_size=1000):
+    """Stream the customer list in fixed-size chunks for CSV export."""
+    return _stream_query(
+        "SELECT CustomerID, Name, Phone, Email, PaymentCount FROM Customer ORDER BY Name;",
+        chunk_size,
+    )
+
+def stream_vehicles_report(chunk_size=1000):
+    """Stream the vehicle list (with owner names) in fixed-size chunks for CSV export."""
+    return _stream_query(
+        """
+            SELECT v.LicensePlate, v.Make, v.Model, v.Color, v.CustomerID, c.Name AS CustomerName
+            FROM Vehicle v
+            JOIN Customer c ON v.CustomerID = c.CustomerID
+            ORDER BY c.Name, v.LicensePlate;
+        """,
+        chunk_size,
+    )
+
+def _stream_query(query, chunk_size):
+    """Run a query on an unbuffered cursor and hand back a generator of row chunks.
+
+    Rows stay on the server until fetched, so memory is bounded by
+    ``chunk_size`` rather than the table size. The connection is busy until
+    the generator is exhausted or closed.
+    """
+    db, _ = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor = instrument_cursor(db.cursor(buffered=False), __name__)
+        cursor.execute(query)
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+
+    def chunks():
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            try:
+                cursor.close()
+            except Error:
+                pass  # unread rows left behind; the pool discards the connection
+
+    return {'status': 'success', 'columns': list(cursor.column_names), 'chunks': chunks()}
+
+
+
 # ---------------------------------------------------------------------
-# Parking Operations (Entry / Exit / Reservation)
+# Occupancy History
 # ---------------------------------------------------------------------
 
-def process_vehicle_entry(license_plate, space_id):
-    """Record a new vehicle entry (auto-link to a valid customer or reservation)."""
+# Bucket widths in seconds, finest first
+OCCUPANCY_RESOLUTIONS = (60, 900, 3600)
+OCCUPANCY_MAX_POINTS = 1500
+
+_OCCUPANCY_MERGE = """
+    ON DUPLICATE KEY UPDATE
+        Occupied = ROUND((Occupied * Samples + VALUES(Occupied) * VALUES(Samples)) / (Samples + VALUES(Samples))),
+        Reserved = ROUND((Reserved * Samples + VALUES(Reserved) * VALUES(Samples)) / (Samples + VALUES(Samples))),
+        Vacant = ROUND((Vacant * Samples + VALUES(Vacant) * VALUES(Samples)) / (Samples + VALUES(Samples))),
+        Maintenance = ROUND((Maintenance * Samples + VALUES(Maintenance) * VALUES(Samples)) / (Samples + VALUES(Samples))),
+        Samples = Samples + VALUES(Samples)
+"""
+
+def record_occupancy_sample():
+    """Write the space index's per-(lot, type) counts into the current 1-minute bucket."""
+    index = get_space_index()
     db, cursor = get_db()
-    if not db:
+    if not index or not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
 
+    rows = [(lot_id, space_type, counts['Occupied'], counts['Reserved'], counts['Vacant'], counts['Maintenance'])
+            for (lot_id, space_type), counts in index.group_counts().items()]
+    if not rows:
+        return {'status': 'success', 'rows': 0}
     try:
-        # ✅ Ensure the walk-in customer (ID=9999) exists and use it by default
-        cursor.execute("SELECT CustomerID FROM Customer WHERE CustomerID = 9999;")
-        walkin = cursor.fetchone()
+        cursor.executemany(f"""
+            INSERT INTO Occupancy_History
+                (Resolution, BucketStart, Lot_ID, SpaceType, Occupied, Reserved, Vacant, Maintenance, Samples)
+            VALUES ({OCCUPANCY_RESOLUTIONS[0]}, FROM_UNIXTIME(UNIX_TIMESTAMP() DIV {OCCUPANCY_RESOLUTIONS[0]} * {OCCUPANCY_RESOLUTIONS[0]}),
+                    %s, %s, %s, %s, %s, %s, 1)
+            {_OCCUPANCY_MERGE};
+        """, rows)
+        db.commit()
+        return {'status': 'success', 'rows': len(rows)}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
+
+def downsample_occupancy_history():
+    """Fold expired 1-minute buckets into 15-minute ones, and those into hourly ones."""
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
 
-        if not walkin:
+    config = current_app.config
+    steps = (
+        (OCCUPANCY_RESOLUTIONS[0], OCCUPANCY_RESOLUTIONS[1], config['OCCUPANCY_MINUTE_RETENTION_HOURS'] * 3600),
+        (OCCUPANCY_RESOLUTIONS[1], OCCUPANCY_RESOLUTIONS[2], config['OCCUPANCY_QUARTER_RETENTION_DAYS'] * 86400),
+    )
+    folded = 0
+    try:
+        for fine, coarse, retention in steps:
+            # Only whole coarse buckets are folded, so no bucket is ever split across resolutions
+            cursor.execute("SELECT FROM_UNIXTIME((UNIX_TIMESTAMP() - %s) DIV %s * %s) AS Cutoff;",
+                           (retention, coarse, coarse))
+            cutoff = cursor.fetchone()['Cutoff']
+            cursor.execute(f"""
+                INSERT INTO Occupancy_History
+                    (Resolution, BucketStart, Lot_ID, SpaceType, Occupied, Reserved, Vacant, Maintenance, Samples)
+                SELECT %s, FROM_UNIXTIME(UNIX_TIMESTAMP(BucketStart) DIV %s * %s) AS Bucket, Lot_ID, SpaceType,
+                       ROUND(SUM(Occupied * Samples) / SUM(Samples)),
+                       ROUND(SUM(Reserved * Samples) / SUM(Samples)),
+                       ROUND(SUM(Vacant * Samples) / SUM(Samples)),
+                       ROUND(SUM(Maintenance * Samples) / SUM(Samples)),
+                       SUM(Samples)
+                FROM Occupancy_History
+                WHERE Resolution = %s AND BucketStart < %s
+                GROUP BY Bucket, Lot_ID, SpaceType
+                {_OCCUPANCY_MERGE};
+            """, (coarse, coarse, coarse, fine, cutoff))
+            cursor.execute("DELETE FROM Occupancy_History WHERE Resolution = %s AND BucketStart < %s;",
+                           (fine, cutoff))
+            folded += cursor.rowcount
+            db.commit()
+
+        hourly_retention = config['OCCUPANCY_HOURLY_RETENTION_DAYS']
+        if hourly_retention > 0:
             cursor.execute("""
-                INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
-                VALUES (9999, 'Walk-in Customer', 'N/A', 'walkin@demo.com', 'N/A', 'N/A', 'N/A', '000000');
-            """)
-            customer_id = 9999
-        else:
-            customer_id = 9999
+                DELETE FROM Occupancy_History
+                WHERE Resolution = %s AND BucketStart < NOW() - INTERVAL %s DAY;
+            """, (OCCUPANCY_RESOLUTIONS[2], hourly_retention))
+            db.commit()
+        return {'status': 'success', 'folded': folded}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
 
+def get_occupancy_history(start, end, lot_id=None, space_type=None, resolution=None):
+    """Occupancy time series for [start, end) from Occupancy_History only.
 
-        # ✅ Ensure the vehicle exists
-        cursor.execute("SELECT LicensePlate, CustomerID FROM Vehicle WHERE LicensePlate = %s", (license_plate,))
-        vehicle = cursor.fetchone()
-        if not vehicle:
-            cursor.execute("""
-                INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
-                VALUES (%s, %s, 'Walk-In', 'Unspecified', 'Unknown');
-            """, (license_plate, customer_id))
-        else:
-            customer_id = vehicle['CustomerID']
+    ``resolution`` (seconds) defaults to the finest bucket width that keeps
+    the series under OCCUPANCY_MAX_POINTS. Older ranges that were already
+    downsampled come back at their stored, coarser width.
+    """
+    if resolution is None:
+        span = (end - start).total_seconds()
+        resolution = next((r for r in OCCUPANCY_RESOLUTIONS if span / r <= OCCUPANCY_MAX_POINTS),
+                          OCCUPANCY_RESOLUTIONS[-1])
+
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
 
-        # ✅ Check space status
-        cursor.execute("SELECT Status FROM Parking_Space WHERE SpaceID = %s", (space_id,))
-        space = cursor.fetchone()
-        if not space:
-            return {'status': 'error', 'message': f"Invalid space ID {space_id}."}
+    clauses, params = ["BucketStart >= %s", "BucketStart < %s"], [start, end]
+    if lot_id is not None:
+        clauses.append("Lot_ID = %s")
+        params.append(lot_id)
+    if space_type:
+        clauses.append("SpaceType = %s")
+        params.append(space_type)
+    try:
+        # Average each (lot, type) within the output bucket, then add the groups up
+        cursor.execute(f"""
+            SELECT Bucket AS BucketStart, MAX(Width) AS Resolution,
+                   ROUND(SUM(Occupied)) AS OccupiedCount, ROUND(SUM(Reserved)) AS ReservedCount,
+                   ROUND(SUM(Vacant)) AS VacantCount, ROUND(SUM(Maintenance)) AS MaintenanceCount
+            FROM (
+                SELECT FROM_UNIXTIME(UNIX_TIMESTAMP(BucketStart) DIV GREATEST(%s, Resolution)
+                                     * GREATEST(%s, Resolution)) AS Bucket,
+                       GREATEST(%s, Resolution) AS Width, Lot_ID, SpaceType,
+                       SUM(Occupied * Samples) / SUM(Samples) AS Occupied,
+                       SUM(Reserved * Samples) / SUM(Samples) AS Reserved,
+                       SUM(Vacant * Samples) / SUM(Samples) AS Vacant,
+                       SUM(Maintenance * Samples) / SUM(Samples) AS Maintenance
+                FROM Occupancy_History
+                WHERE {' AND '.join(clauses)}
+                GROUP BY Bucket, Width, Lot_ID, SpaceType
+            ) per_group
+            GROUP BY Bucket
+            ORDER BY Bucket;
+        """, [resolution, resolution, resolution] + params)
+        return {'status': 'success', 'resolution': resolution, 'data': cursor.fetchall()}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
 
-        space_status = space['Status']
 
-        # ✅ Handle space status
-        if space_status == 'Vacant':
-            pass  # normal entry allowed
+# ---------------------------------------------------------------------
+# Parking Operations (Entry / Exit / Reservation)
+# ---------------------------------------------------------------------
 
-        elif space_status == 'Reserved':
-            # check if reservation belongs to this license plate
-            cursor.execute("""
-                SELECT * FROM Books 
-                WHERE SpaceID = %s AND CustomerID = (
-                    SELECT CustomerID FROM Vehicle WHERE LicensePlate = %s
-                )
-            """, (space_id, license_plate))
-            reservation = cursor.fetchone()
-            if not reservation:
-                return {'status': 'error', 'message': f"Space {space_id} is reserved for another customer."}
+# Deadlock (1213) and lock wait timeout (1205) are safe to retry from the top
+LOCK_RETRY_ERRNOS = (1213, 1205)
+LOCK_RETRY_ATTEMPTS = 3
+LOCK_RETRY_BASE_DELAY = 0.02
 
-        else:
-            return {'status': 'error', 'message': f"Space {space_id} is not available (currently {space_status})."}
+_lock_stats_lock = threading.Lock()
+_lock_stats = {'cas_conflicts': 0, 'lock_conflicts': 0, 'retries': 0, 'exhausted': 0, 'allocation_contention': 0}
 
-        # ✅ Insert parking record
-        cursor.execute("""
-            INSERT INTO Parking_Record (LicensePlate, EntryTime, SpaceID)
-            VALUES (%s, NOW(), %s);
-        """, (license_plate, space_id))
+def _count_lock_event(name):
+    with _lock_stats_lock:
+        _lock_stats[name] += 1
 
-        # ✅ Update space status
-        cursor.execute("UPDATE Parking_Space SET Status = 'Occupied' WHERE SpaceID = %s", (space_id,))
+def get_lock_retry_stats():
+    """Report write-path contention counters for this process."""
+    with _lock_stats_lock:
+        return dict(_lock_stats)
 
-        # ✅ Optional: delete reservation after vehicle enters
-        cursor.execute("""
-            DELETE FROM Books 
-            WHERE SpaceID = %s 
-            AND CustomerID = (SELECT CustomerID FROM Vehicle WHERE LicensePlate = %s)
-        """, (space_id, license_plate))
+def _with_lock_retry(db, work):
+    """Run ``work()``, retrying deadlocks and lock wait timeouts with jittered backoff.
+
+    ``work`` must be a whole transaction (it commits itself). Other errors,
+    and the last failed attempt, are re-raised for the caller to report.
+    """
+    attempt = 1
+    while True:
+        try:
+            return work()
+        except Error as e:
+            if e.errno not in LOCK_RETRY_ERRNOS:
+                raise
+            _count_lock_event('lock_conflicts')
+            db.rollback()
+            if attempt >= LOCK_RETRY_ATTEMPTS:
+                _count_lock_event('exhausted')
+                raise
+            _count_lock_event('retries')
+            time.sleep(LOCK_RETRY_BASE_DELAY * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+def process_vehicle_entry(license_plate, space_id):
+    """Record a new vehicle entry (auto-link to a valid customer or reservation).
+
+    All validation and writes happen server-side in ProcessVehicleEntry, so a
+    gate entry costs one round trip and locks the space row once.
+    """
+    try:
+        space_id = int(space_id)
+    except (ValueError, TypeError):
+        return {'status': 'error', 'message': f"Invalid space ID {space_id}."}
+
+    db, cursor = get_db(bind_employee=True)
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
 
+    def claim():
+        cursor.callproc('ProcessVehicleEntry', (license_plate, space_id))
+        entry = None
+        for result in cursor.stored_results():
+            entry = result.fetchone()
         db.commit()
-        return {'status': 'success', 'message': f'Entry recorded successfully for {license_plate} at space {space_id}.'}
+        return entry
 
+    try:
+        entry = _with_lock_retry(db, claim)
     except Error as e:
         db.rollback()
         return {'status': 'error', 'message': str(e)}
 
+    if not entry:
+        return {'status': 'error', 'message': 'Entry failed.'}
+
+    if entry['SpaceStatus']:
+        _record_space_status(space_id, entry['SpaceStatus'])
+
+    if entry['Status'] != 'success':
+        if entry['Code'] in ('reserved', 'unavailable'):
+            _count_lock_event('cas_conflicts')
+        return {'status': 'error', 'code': entry['Code'], 'message': entry['Message']}
+    invalidate_customer_history(entry['CustomerID'])
+    return {
+        'status': 'success',
+        'message': entry['Message'],
+        'record_id': entry['RecordID'],
+        'customer_id': entry['CustomerID'],
+    }
+
 
 
 
-# --- REPLACE your old 'process_vehicle_exit' function with this: ---
+# Entry outcomes that mean "someone else got this space first": try the next one
+ALLOCATION_RETRY_CODES = ('reserved', 'unavailable', 'invalid_space')
+ALLOCATION_MAX_ATTEMPTS = 5
+
+def allocate_vehicle_entry(license_plate, lot_id=None, space_type=None):
+    """Park a vehicle in the nearest vacant space of a lot and/or space type.
+
+    Candidates come from the space index's per-(lot, type) free lists in
+    SpaceNumber order; each is claimed through ProcessVehicleEntry's
+    conditional UPDATE, so two gates can never take the same space. A lost
+    race just moves on to the next candidate. Losing ALLOCATION_MAX_ATTEMPTS
+    races in a row returns code 'contention' (retry the entry); 'no_space'
+    means the free lists really had nothing left.
+    """
+    index = get_space_index()
+    if not index:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+
+    kind = f'{space_type} ' if space_type else ''
+    lot = f' in lot {lot_id}' if lot_id is not None else ''
+    tried = set()
+    for _ in range(ALLOCATION_MAX_ATTEMPTS):
+        space_id = index.take_vacant(lot_id, space_type, exclude=tried)
+        if space_id is None:
+            return {'status': 'error', 'code': 'no_space', 'message': f'No vacant {kind}space available{lot}.'}
+        tried.add(space_id)
+
+        result = process_vehicle_entry(license_plate, space_id)
+        if result['status'] == 'success':
+            result['space_id'] = space_id
+            result['message'] = f"{result['message']} (allocated automatically)"
+            return result
+        if result.get('code') == 'invalid_space':
+            index.mark_stale()
+        elif result.get('code') not in ALLOCATION_RETRY_CODES:
+            # The space was never claimed: put it back, or resync if unsure
+            if result.get('code'):
+                index.set_status(space_id, 'Vacant')
+            else:
+                index.mark_stale()
+            return result
+
+    _count_lock_event('allocation_contention')
+    return {'status': 'error', 'code': 'contention',
+            'message': f'Other gates took the {ALLOCATION_MAX_ATTEMPTS} nearest vacant {kind}spaces{lot} '
+                       f'first. Please retry the entry.'}
+
+
+# Exit statements, shared with the async gate API (app/gate_asgi.py)
+EXIT_LOCK_RECORD = """
+    SELECT pr.RecordID, pr.SpaceID, pr.EntryTime, ps.Lot_ID, ps.SpaceType, NOW() AS ExitTime,
+           (SELECT CustomerID FROM Vehicle WHERE LicensePlate = pr.LicensePlate) AS CustomerID
+    FROM Parking_Record pr
+    JOIN Parking_Space ps ON ps.SpaceID = pr.SpaceID
+    WHERE pr.LicensePlate = %s AND pr.ExitTime IS NULL
+    ORDER BY pr.EntryTime DESC LIMIT 1
+    FOR UPDATE;
+"""
+EXIT_INSERT_PAYMENT = """
+    INSERT INTO Payment (RecordID, Amount, Timestamp, Method)
+    VALUES (%s, %s, %s, %s);
+"""
+EXIT_CLOSE_RECORD = """
+    UPDATE Parking_Record
+    SET ExitTime = %s, Duration = %s, PaymentID = %s
+    WHERE RecordID = %s;
+"""
+EXIT_FREE_SPACE = "UPDATE Parking_Space SET Status = 'Vacant' WHERE SpaceID = %s"
 
 def process_vehicle_exit(license_plate, payment_method):
     """Record a vehicle exit and create a payment record."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
 
-    try:
-        # 1. Find the active record
-        cursor.execute("""
-            SELECT RecordID, SpaceID, EntryTime 
-            FROM Parking_Record
-            WHERE LicensePlate = %s AND ExitTime IS NULL
-            ORDER BY EntryTime DESC LIMIT 1;
-        """, (license_plate,))
+    def close_record():
+        # 1. Lock the active record (with its tariff key and the server clock) so
+        #    two gates cannot both bill the same stay
+        cursor.execute(EXIT_LOCK_RECORD, (license_plate,))
         record = cursor.fetchone()
         if not record:
-            return {'status': 'error', 'message': f'No active record found for {license_plate}.'}
+            db.rollback()
+            return None
 
         record_id = record['RecordID']
         space_id = record['SpaceID']
-        entry_time = record['EntryTime']
+        exit_time = record['ExitTime']
 
-        # 2. Calculate duration (in minutes)
-        cursor.execute("SELECT TIMESTAMPDIFF(MINUTE, %s, NOW()) AS Duration", (entry_time,))
-        duration = cursor.fetchone()['Duration']
-        
-        # Use the fee logic already in your file (₹50/hour)
-        fee = round((duration / 60) * 50, 2) if duration else 0
-        
-        # 3. Start Transaction
-        # db.start_transaction()
+        # 2. Price the stay in-process from the compiled tariff tables
+        duration, fee = get_tariff_engine().quote(record['Lot_ID'], record['SpaceType'], record['EntryTime'], exit_time)
 
-        # 4. Create Payment Record
-        cursor.execute("""
-            INSERT INTO Payment (RecordID, Amount, Timestamp, Method)
-            VALUES (%s, %s, NOW(), %s);
-        """, (record_id, fee, payment_method))
-        
+        # 3. Create Payment Record
+        cursor.execute(EXIT_INSERT_PAYMENT, (record_id, fee, exit_time, payment_method))
         payment_id = cursor.lastrowid
 
-        # 5. Update Parking Record with ExitTime, Duration, and PaymentID
-        cursor.execute("""
-            UPDATE Parking_Record
-            SET ExitTime = NOW(), Duration = %s, PaymentID = %s
-            WHERE RecordID = %s;
-        """, (duration, payment_id, record_id))
+        # 4. Update Parking Record with ExitTime, Duration, and PaymentID
+        cursor.execute(EXIT_CLOSE_RECORD, (exit_time, duration, payment_id, record_id))
 
-        # 6. Free up space
-        cursor.execute("UPDATE Parking_Space SET Status = 'Vacant' WHERE SpaceID = %s", (space_id,))
+        # 5. Free up space
+        cursor.execute(EXIT_FREE_SPACE, (space_id,))
         
         db.commit()
+        return space_id, fee, record['CustomerID']
 
-        # 7. Return a success message with all details
-        return {'status': 'success', 'message': f'Exit & Payment successful for {license_plate}. Fee: ₹{fee:.2f} ({payment_method})'}
-    
+    try:
+        # The tariff reload (if due) runs outside the locked window
+        get_tariff_engine()
+        closed = _with_lock_retry(db, close_record)
     except Error as e:
         db.rollback()
         return {'status': 'error', 'message': str(e)}
 
+    if not closed:
+        return {'status': 'error', 'message': f'No active record found for {license_plate}.'}
+    space_id, fee, customer_id = closed
+    _record_space_status(space_id, 'Vacant')
+    invalidate_customer_history(customer_id)
+
+    # 6. Return a success message with all details
+    return {'status': 'success', 'message': f'Exit & Payment successful for {license_plate}. Fee: ₹{fee:.2f} ({payment_method})'}
+
 
 
 def book_reservation(customer_id, space_id, employee_id, license_plate=None):
     """Reserve a parking space for a customer and optional vehicle."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
 
-    try:
-        # Ensure customer exists
-        cursor.execute("SELECT CustomerID FROM Customer WHERE CustomerID = %s", (customer_id,))
-        if not cursor.fetchone():
-            cursor.execute("""
-                INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
-                VALUES (%s, 'Walk-in Customer', 'N/A', CONCAT('auto_', %s, '@demo.com'), 'N/A', 'N/A', 'N/A', '000000');
-            """, (customer_id, customer_id))
-
-        # If license_plate is given, ensure vehicle exists
+    def reserve():
+        # Claim the space first: a compare-and-set that only succeeds while it is Vacant
+        cursor.execute("""
+            UPDATE Parking_Space SET Status = 'Reserved'
+            WHERE SpaceID = %s AND Status = 'Vacant';
+        """, (space_id,))
+        if cursor.rowcount == 0:
+            cursor.execute("SELECT Status FROM Parking_Space WHERE SpaceID = %s", (space_id,))
+            space = cursor.fetchone()
+            db.rollback()
+            return space['Status'] if space else None
+
+        # Create the customer (and vehicle) only if missing, without a separate read first
+        cursor.execute("""
+            INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
+            SELECT %s, 'Walk-in Customer', 'N/A', CONCAT('auto_', %s, '@demo.com'), 'N/A', 'N/A', 'N/A', '000000'
+            FROM DUAL
+            WHERE NOT EXISTS (SELECT 1 FROM Customer WHERE CustomerID = %s);
+        """, (customer_id, customer_id, customer_id))
         if license_plate:
-            cursor.execute("SELECT LicensePlate FROM Vehicle WHERE LicensePlate = %s", (license_plate,))
-            if not cursor.fetchone():
-                cursor.execute("""
-                    INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
-                    VALUES (%s, %s, 'Unknown', 'Unknown', 'Unknown');
-                """, (license_plate, customer_id))
-
-        # Check space availability
-        cursor.execute("SELECT Status FROM Parking_Space WHERE SpaceID = %s", (space_id,))
-        space = cursor.fetchone()
-        if not space:
-            return {'status': 'error', 'message': 'Invalid Space ID.'}
-        if space['Status'] != 'Vacant':
-            return {'status': 'error', 'message': f"Space {space_id} is not available."}
+            cursor.execute("""
+                INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
+                SELECT %s, %s, 'Unknown', 'Unknown', 'Unknown'
+                FROM DUAL
+                WHERE NOT EXISTS (SELECT 1 FROM Vehicle WHERE LicensePlate = %s);
+            """, (license_plate, customer_id, license_plate))
 
         # Insert reservation (with license plate if given)
         cursor.execute("""
             INSERT INTO Books (CustomerID, SpaceID, EmployeeID, LicensePlate, ReservationTime, Notes)
             VALUES (%s, %s, %s, %s, NOW(), 'Reserved via system');
         """, (customer_id, space_id, employee_id, license_plate))
+        db.commit()
+        return 'Reserved'
+
+    try:
+        status = _with_lock_retry(db, reserve)
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
+
+    if status is None:
+        return {'status': 'error', 'message': 'Invalid Space ID.'}
+    _record_space_status(space_id, status)
+    if status != 'Reserved':
+        _count_lock_event('cas_conflicts')
+        return {'status': 'error', 'message': f"Space {space_id} is not available."}
+    return {'status': 'success', 'message': f'Space {space_id} reserved successfully.'}
+
+
+
+def expire_reservations():
+    """Release reservations older than RESERVATION_HOLD_MINUTES, in small batches.
+
+    Each batch is its own short transaction: lock the spaces (skipping any a
+    gate is holding), delete their expired Books rows and set spaces with no
+    remaining booking back to Vacant, all set-based. Batches stop once
+    RESERVATION_SWEEP_BUDGET_SECONDS is spent; the rest waits for the next run.
+    """
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
 
-        # Update space status
-        cursor.execute("UPDATE Parking_Space SET Status = 'Reserved' WHERE SpaceID = %s", (space_id,))
+    config = current_app.config
+    batch_size = config['RESERVATION_SWEEP_BATCH']
+    deadline = time.monotonic() + config['RESERVATION_SWEEP_BUDGET_SECONDS']
+    expired = freed = 0
+    skipped = set()
+    try:
+        cursor.execute("SELECT NOW() - INTERVAL %s MINUTE AS Cutoff;", (config['RESERVATION_HOLD_MINUTES'],))
+        cutoff = cursor.fetchone()['Cutoff']
         db.commit()
 
-        return {'status': 'success', 'message': f'Space {space_id} reserved successfully.'}
+        while time.monotonic() < deadline:
+            exclude = f"AND SpaceID NOT IN ({_in_list(skipped)})" if skipped else ''
+            cursor.execute(f"""
+                SELECT DISTINCT SpaceID FROM Books
+                WHERE ReservationTime < %s {exclude}
+                ORDER BY SpaceID
+                LIMIT %s;
+            """, [cutoff, *skipped, batch_size])
+            candidates = [row['SpaceID'] for row in cursor.fetchall()]
+            if not candidates:
+                break
+
+            # Spaces first (the same order entries lock in); a gate mid-entry keeps its space
+            cursor.execute(f"""
+                SELECT SpaceID FROM Parking_Space
+                WHERE SpaceID IN ({_in_list(candidates)})
+                FOR UPDATE SKIP LOCKED;
+            """, candidates)
+            locked = [row['SpaceID'] for row in cursor.fetchall()]
+            skipped.update(set(candidates) - set(locked))
+            if not locked:
+                db.rollback()
+                continue
+
+            cursor.execute(f"""
+                DELETE FROM Books
+                WHERE SpaceID IN ({_in_list(locked)}) AND ReservationTime < %s;
+            """, [*locked, cutoff])
+            expired += cursor.rowcount
+            cursor.execute(f"""
+                UPDATE Parking_Space ps SET ps.Status = 'Vacant'
+                WHERE ps.SpaceID IN ({_in_list(locked)}) AND ps.Status = 'Reserved'
+                  AND NOT EXISTS (SELECT 1 FROM Books b WHERE b.SpaceID = ps.SpaceID);
+            """, locked)
+            freed += cursor.rowcount
+            cursor.execute(f"SELECT SpaceID, Status FROM Parking_Space WHERE SpaceID IN ({_in_list(locked)});", locked)
+            statuses = cursor.fetchall()
+            db.commit()
+
+            for row in statuses:
+                _record_space_status(row['SpaceID'], row['Status'])
+            if len(candidates) < batch_size:
+                break
+        return {'status': 'success', 'expired': expired, 'freed': freed, 'skipped': len(skipped)}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
+
+
+# ---------------------------------------------------------------------
+# Batched Gate Events (ANPR feeds)
+# ---------------------------------------------------------------------
+
+GATE_BATCH_MAX_EVENTS = 5000
+GATE_BATCH_CHUNK_SIZE = 500  # events applied per transaction
+PAYMENT_METHODS = ('Cash', 'Credit Card', 'UPI', 'Subscription')
+WALK_IN_CUSTOMER_ID = 9999
+
+def ingest_gate_events(events):
+    """Apply a batch of gate events in order, returning one result per event.
+
+    Each event is ``{'type': 'entry', 'license_plate', 'space_id'}`` or
+    ``{'type': 'exit', 'license_plate', 'payment_method'}``. Runs of
+    consecutive events of the same type are applied together in one
+    transaction with IN-list locks and multi-row statements, following the
+    same rules as ProcessVehicleEntry and process_vehicle_exit.
+    """
+    results = [None] * len(events)
+    valid = []
+    for index, event in enumerate(events):
+        error = _validate_gate_event(event)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'code': 'invalid', 'message': error}
+        else:
+            valid.append((index, event))
+
+    db, cursor = get_db(bind_employee=True) if valid else (None, None)
+    if valid and not db:
+        for index, _ in valid:
+            results[index] = {'index': index, 'status': 'error', 'code': 'db_unavailable',
+                              'message': 'Database connection failed.'}
+        valid = []
+
+    for event_type, run in _gate_event_runs(valid):
+        apply_run = _apply_entry_run if event_type == 'entry' else _apply_exit_run
+        try:
+            for index, result in _with_lock_retry(db, lambda: apply_run(db, cursor, run)):
+                results[index] = dict(result, index=index)
+                if result['status'] == 'success':
+                    invalidate_customer_history(result.get('customer_id'))
+        except Error as e:
+            db.rollback()
+            for index, _ in run:
+                results[index] = {'index': index, 'status': 'error', 'code': 'db_error', 'message': str(e)}
+
+    return {
+        'status': 'success',
+        'data': {
+            'processed': len(results),
+            'succeeded': sum(1 for r in results if r['status'] == 'success'),
+            'failed': sum(1 for r in results if r['status'] != 'success'),
+            'results': results,
+        },
+    }
+
+def _validate_gate_event(event):
+    if not isinstance(event, dict):
+        return 'Event must be an object.'
+    plate = event.get('license_plate')
+    if not isinstance(plate, str) or not plate.strip() or len(plate.strip()) > 15:
+        return 'license_plate must be a non-empty string of at most 15 characters.'
+    event['license_plate'] = plate.strip()
+    if event.get('type') == 'entry':
+        try:
+            event['space_id'] = int(event.get('space_id'))
+        except (ValueError, TypeError):
+            return f"Invalid space ID {event.get('space_id')}."
+    elif event.get('type') == 'exit':
+        if event.get('payment_method') not in PAYMENT_METHODS:
+            return f"payment_method must be one of: {', '.join(PAYMENT_METHODS)}."
+    else:
+        return "type must be 'entry' or 'exit'."
+    return None
+
+def _gate_event_runs(indexed_events):
+    """Split (index, event) pairs into same-type runs of at most GATE_BATCH_CHUNK_SIZE."""
+    run, run_type = [], None
+    for index, event in indexed_events:
+        if run and (event['type'] != run_type or len(run) >= GATE_BATCH_CHUNK_SIZE):
+            yield run_type, run
+            run = []
+        run_type = event['type']
+        run.append((index, event))
+    if run:
+        yield run_type, run
+
+def _in_list(values):
+    return ', '.join(['%s'] * len(values))
+
+def _apply_entry_run(db, cursor, run):
+    """Apply consecutive entry events in one transaction."""
+    plates = sorted({event['license_plate'] for _, event in run})
+    space_ids = sorted({event['space_id'] for _, event in run})
+
+    # Lock the vehicles, then every targeted space, in key order (the same
+    # order as ProcessVehicleEntry). A concurrent entry of one of these plates
+    # waits here, so the active-record read below already sees its record.
+    cursor.execute(f"SELECT LicensePlate, CustomerID FROM Vehicle WHERE LicensePlate IN ({_in_list(plates)}) "
+                   "ORDER BY LicensePlate FOR UPDATE;", plates)
+    owners = {row['LicensePlate']: row['CustomerID'] for row in cursor.fetchall()}
+
+    cursor.execute(f"SELECT SpaceID, Status FROM Parking_Space WHERE SpaceID IN ({_in_list(space_ids)}) "
+                   "ORDER BY SpaceID FOR UPDATE;", space_ids)
+    space_status = {row['SpaceID']: row['Status'] for row in cursor.fetchall()}
+
+    cursor.execute(f"""
+        SELECT LicensePlate, SpaceID FROM Parking_Record
+        WHERE LicensePlate IN ({_in_list(plates)}) AND ExitTime IS NULL
+        ORDER BY EntryTime;
+    """, plates)
+    parked_at = {row['LicensePlate']: row['SpaceID'] for row in cursor.fetchall()}
+
+    reserved_ids = [space_id for space_id, status in space_status.items() if status == 'Reserved']
+    bookings = set()
+    if reserved_ids:
+        cursor.execute(f"SELECT SpaceID, CustomerID FROM Books WHERE SpaceID IN ({_in_list(reserved_ids)});",
+                       reserved_ids)
+        bookings = {(row['SpaceID'], row['CustomerID']) for row in cursor.fetchall()}
+
+    # Decide every event against the locked state, applying earlier events first
+    outcomes = []
+    accepted = []      # (license_plate, space_id, customer_id)
+    new_vehicles = []
+    for index, event in run:
+        plate, space_id = event['license_plate'], event['space_id']
+        customer_id = owners.get(plate)
+        status = space_status.get(space_id)
+        if plate in parked_at:
+            outcomes.append((index, {'status': 'error', 'code': 'already_parked', 'customer_id': customer_id,
+                                     'message': f'Vehicle {plate} is already parked at space {parked_at[plate]}.'}))
+        elif status is None:
+            outcomes.append((index, {'status': 'error', 'code': 'invalid_space',
+                                     'message': f'Invalid space ID {space_id}.'}))
+        elif status == 'Reserved' and (space_id, customer_id) not in bookings:
+            outcomes.append((index, {'status': 'error', 'code': 'reserved',
+                                     'message': f'Space {space_id} is reserved for another customer.'}))
+        elif status not in ('Vacant', 'Reserved'):
+            outcomes.append((index, {'status': 'error', 'code': 'unavailable',
+                                     'message': f'Space {space_id} is not available (currently {status}).'}))
+        else:
+            if customer_id is None:
+                customer_id = WALK_IN_CUSTOMER_ID
+                owners[plate] = customer_id
+                new_vehicles.append((plate, customer_id))
+            space_status[space_id] = 'Occupied'
+            parked_at[plate] = space_id
+            accepted.append((plate, space_id, customer_id))
+            outcomes.append((index, None))
+
+    record_ids = {}
+    if accepted:
+        if new_vehicles:
+            cursor.execute("""
+                INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
+                SELECT %s, 'Walk-in Customer', 'N/A', 'walkin@demo.com', 'N/A', 'N/A', 'N/A', '000000'
+                FROM DUAL
+                WHERE NOT EXISTS (SELECT 1 FROM Customer WHERE CustomerID = %s);
+            """, (WALK_IN_CUSTOMER_ID, WALK_IN_CUSTOMER_ID))
+            cursor.executemany("""
+                INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
+                VALUES (%s, %s, 'Walk-In', 'Unspecified', 'Unknown');
+            """, new_vehicles)
+
+        # The update_parking_space_status trigger marks each space Occupied
+        cursor.executemany("""
+            INSERT INTO Parking_Record (LicensePlate, EntryTime, SpaceID)
+            VALUES (%s, NOW(), %s);
+        """, [(plate, space_id) for plate, space_id, _ in accepted])
+
+        booked = [(space_id, customer_id) for _, space_id, customer_id in accepted
+                  if (space_id, customer_id) in bookings]
+        if booked:
+            pairs = ', '.join(['(%s, %s)'] * len(booked))
+            cursor.execute(f"DELETE FROM Books WHERE (SpaceID, CustomerID) IN ({pairs});",
+                           [value for pair in booked for value in pair])
+
+        accepted_plates = [plate for plate, _, _ in accepted]
+        cursor.execute(f"""
+            SELECT LicensePlate, MAX(RecordID) AS RecordID FROM Parking_Record
+            WHERE LicensePlate IN ({_in_list(accepted_plates)}) AND ExitTime IS NULL
+            GROUP BY LicensePlate;
+        """, accepted_plates)
+        record_ids = {row['LicensePlate']: row['RecordID'] for row in cursor.fetchall()}
+
+    db.commit()
+
+    for space_id, status in space_status.items():
+        _record_space_status(space_id, status)
+
+    accepted = iter(accepted)
+    for position, (index, outcome) in enumerate(outcomes):
+        if outcome is None:
+            plate, space_id, customer_id = next(accepted)
+            outcomes[position] = (index, {'status': 'success', 'code': 'ok', 'record_id': record_ids.get(plate),
+                                          'customer_id': customer_id,
+                                          'message': f'Entry recorded successfully for {plate} at space {space_id}.'})
+    return outcomes
+
+def _apply_exit_run(db, cursor, run):
+    """Apply consecutive exit events in one transaction, priced by the tariff engine."""
+    engine = get_tariff_engine()
+    plates = sorted({event['license_plate'] for _, event in run})
+
+    cursor.execute(f"""
+        SELECT pr.RecordID, pr.LicensePlate, pr.SpaceID, pr.EntryTime, ps.Lot_ID, ps.SpaceType,
+               NOW() AS ExitTime,
+               (SELECT CustomerID FROM Vehicle WHERE LicensePlate = pr.LicensePlate) AS CustomerID
+        FROM Parking_Record pr
+        JOIN Parking_Space ps ON ps.SpaceID = pr.SpaceID
+        WHERE pr.LicensePlate IN ({_in_list(plates)}) AND pr.ExitTime IS NULL
+        ORDER BY pr.EntryTime
+        FOR UPDATE;
+    """, plates)
+    active = {row['LicensePlate']: row for row in cursor.fetchall()}  # latest entry wins
+
+    outcomes = []
+    payments = []
+    durations = []
+    for index, event in run:
+        plate = event['license_plate']
+        record = active.pop(plate, None)
+        if not record:
+            outcomes.append((index, {'status': 'error', 'code': 'no_active_record',
+                                     'message': f'No active record found for {plate}.'}))
+            continue
+        duration, fee = engine.quote(record['Lot_ID'], record['SpaceType'], record['EntryTime'], record['ExitTime'])
+        payments.append((record['RecordID'], fee, record['ExitTime'], event['payment_method']))
+        durations.append((record['RecordID'], duration))
+        outcomes.append((index, {'status': 'success', 'code': 'ok', 'record_id': record['RecordID'],
+                                 'customer_id': record['CustomerID'],
+                                 'space_id': record['SpaceID'], 'duration': duration, 'fee': fee,
+                                 'message': f"Exit & Payment successful for {plate}. "
+                                            f"Fee: ₹{fee:.2f} ({event['payment_method']})"}))
+
+    freed = [outcome['space_id'] for _, outcome in outcomes if outcome['status'] == 'success']
+    if payments:
+        cursor.executemany("""
+            INSERT INTO Payment (RecordID, Amount, Timestamp, Method)
+            VALUES (%s, %s, %s, %s);
+        """, payments)
+
+        # Duration is the one the fee was quoted for, not recomputed in SQL
+        record_ids = [record_id for record_id, _ in durations]
+        cursor.execute(f"""
+            UPDATE Parking_Record pr
+            JOIN Payment p ON p.RecordID = pr.RecordID
+            SET pr.ExitTime = p.Timestamp,
+                pr.Duration = CASE pr.RecordID {' '.join(['WHEN %s THEN %s'] * len(durations))} END,
+                pr.PaymentID = p.PaymentID
+            WHERE pr.RecordID IN ({_in_list(record_ids)});
+        """, [value for pair in durations for value in pair] + record_ids)
+        cursor.execute(f"UPDATE Parking_Space SET Status = 'Vacant' WHERE SpaceID IN ({_in_list(freed)});", freed)
+
+    db.commit()
+
+    for space_id in freed:
+        _record_space_status(space_id, 'Vacant')
+    return outcomes
+
+
+# ---------------------------------------------------------------------
+# Tariffs
+# ---------------------------------------------------------------------
+
+TARIFF_SELECT = """
+    SELECT Lot_ID, SpaceType, StartHour, EndHour, RatePerHour, GraceMinutes, DailyCap
+    FROM Tariff;
+"""
+
+def get_tariff_engine():
+    """Return the compiled tariff engine, reloading the Tariff table when stale."""
+    engine = current_app.extensions['tariff_engine']
+    if engine.needs_reload():
+        db, cursor = get_db()
+        if not db:
+            raise Error(msg='Database connection failed.')
+        cursor.execute(TARIFF_SELECT)
+        engine.load(cursor.fetchall())
+    return engine
+
+def get_all_tariffs():
+    """Fetch every tariff row."""
+    db, cursor = get_db()
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute("""
+            SELECT TariffID, Lot_ID, SpaceType, StartHour, EndHour, RatePerHour, GraceMinutes, DailyCap
+            FROM Tariff
+            ORDER BY Lot_ID, SpaceType, StartHour;
+        """)
+        return {'status': 'success', 'data': cursor.fetchall()}
+    except Error as e:
+        return {'status': 'error', 'message': str(e)}
+
+def add_tariff(lot_id, space_type, start_hour, end_hour, rate_per_hour, grace_minutes=0, daily_cap=None):
+    """Add a tariff band; NULL lot/space type applies to all lots/types."""
+    if not 0 <= start_hour < end_hour <= 24:
+        return {'status': 'error', 'message': 'Tariff hours must satisfy 0 <= start < end <= 24.'}
+    db, cursor = get_db(bind_employee=True)
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute("""
+            INSERT INTO Tariff (Lot_ID, SpaceType, StartHour, EndHour, RatePerHour, GraceMinutes, DailyCap)
+            VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """, (lot_id, space_type, start_hour, end_hour, rate_per_hour, grace_minutes, daily_cap))
+        db.commit()
+        current_app.extensions['tariff_engine'].invalidate()
+        return {'status': 'success', 'message': 'Tariff added successfully.', 'tariff_id': cursor.lastrowid}
     except Error as e:
         db.rollback()
         return {'status': 'error', 'message': str(e)}
 
+def delete_tariff(tariff_id):
+    """Delete a tariff band."""
+    db, cursor = get_db(bind_employee=True)
+    if not db:
+        return {'status': 'error', 'message': 'Database connection failed.'}
+    try:
+        cursor.execute("DELETE FROM Tariff WHERE TariffID = %s", (tariff_id,))
+        db.commit()
+        current_app.extensions['tariff_engine'].invalidate()
+        return {'status': 'success', 'message': 'Tariff deleted successfully.'}
+    except Error as e:
+        db.rollback()
+        return {'status': 'error', 'message': str(e)}
 
 
 # --- Add this new section to app/db_connector.py ---
@@ -526,7 +1802,7 @@ def book_reservation(customer_id, space_id, employee_id, license_plate=None):
 
 def add_customer(customer_id, name, phone, email, street, city, state, zip_code):
     """Call stored procedure to add a new customer."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
 
@@ -549,7 +1825,7 @@ def add_customer(customer_id, name, phone, email, street, city, state, zip_code)
 
 def add_vehicle(license_plate, customer_id, make, model, color):
     """Call stored procedure to add a new vehicle."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
         
@@ -560,6 +1836,7 @@ def add_vehicle(license_plate, customer_id, make, model, color):
 
         cursor.callproc('AddVehicle', (license_plate, customer_id, make, model, color))
         db.commit()
+        invalidate_customer_history(customer_id)
         return {'status': 'success', 'message': f'Vehicle {license_plate} added successfully.'}
     except Error as e:
         db.rollback()
@@ -568,7 +1845,11 @@ def add_vehicle(license_plate, customer_id, make, model, color):
 
 
 def get_all_services():
-    """Fetch a list of all available services."""
+    """Fetch a list of all available services (cached until a service changes)."""
+    cached = _cached_reference('services')
+    if cached is not None:
+        return cached
+
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
@@ -576,13 +1857,13 @@ def get_all_services():
         query = "SELECT ServiceID, Name, Description, Cost FROM Service ORDER BY ServiceID;"
         cursor.execute(query)
         data = cursor.fetchall()
-        return {'status': 'success', 'data': data}
+        return _cache_reference('services', {'status': 'success', 'data': data}, 'services')
     except Error as e:
         return {'status': 'error', 'message': str(e)}
 
 def assign_service_to_customer(customer_id, service_id):
     """Call stored procedure to assign a service to a customer."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
         
@@ -597,19 +1878,25 @@ def assign_service_to_customer(customer_id, service_id):
 
 def add_service(name, description, cost):
     """Call stored procedure to add a new service."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('AddService', (name, description, cost))
         db.commit()
+        invalidate_reference('services')
         return {'status': 'success', 'message': 'Service added successfully.'}
     except Error as e:
         db.rollback()
         return {'status': 'error', 'message': str(e)}
 
 def get_service_by_id(service_id):
-    """Fetch a single service by its ID."""
+    """Fetch a single service by its ID (cached until a service changes)."""
+    key = ('service', int(service_id))
+    cached = _cached_reference(key)
+    if cached is not None:
+        return cached
+
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
@@ -619,7 +1906,7 @@ def get_service_by_id(service_id):
             service = result.fetchone()
         
         if service:
-            return {'status': 'success', 'data': service}
+            return _cache_reference(key, {'status': 'success', 'data': service}, 'services')
         else:
             return {'status': 'error', 'message': 'Service not found.'}
     except Error as e:
@@ -627,12 +1914,13 @@ def get_service_by_id(service_id):
 
 def update_service(service_id, name, description, cost):
     """Call stored procedure to update a service."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('UpdateService', (service_id, name, description, cost))
         db.commit()
+        invalidate_reference('services')
         return {'status': 'success', 'message': 'Service updated successfully.'}
     except Error as e:
         db.rollback()
@@ -640,12 +1928,13 @@ def update_service(service_id, name, description, cost):
 
 def delete_service(service_id):
     """Call stored procedure to delete a service."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('DeleteService', (service_id,))
         db.commit()
+        invalidate_reference('services')
         return {'status': 'success', 'message': 'Service deleted successfully.'}
     except Error as e:
         db.rollback()
@@ -671,12 +1960,13 @@ def get_customer_by_id(customer_id):
 
 def update_customer(customer_id, name, phone, email, street, city, state, zip_code):
     """Call stored procedure to update a customer."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('UpdateCustomer', (customer_id, name, phone, email, street, city, state, zip_code))
         db.commit()
+        invalidate_customer_history(customer_id)  # pages carry the customer's name
         return {'status': 'success', 'message': 'Customer updated successfully.'}
     except Error as e:
         db.rollback()
@@ -684,12 +1974,13 @@ def update_customer(customer_id, name, phone, email, street, city, state, zip_co
 
 def delete_customer(customer_id):
     """Call stored procedure to delete a customer."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('DeleteCustomer', (customer_id,))
         db.commit()
+        invalidate_customer_history(customer_id)
         return {'status': 'success', 'message': 'Customer deleted successfully.'}
     except Error as e:
         db.rollback()
@@ -701,7 +1992,11 @@ def delete_customer(customer_id):
 # ---------------------------------------------------------------------
 
 def get_all_parking_lots():
-    """Fetch all parking lots."""
+    """Fetch all parking lots (cached until a lot changes)."""
+    cached = _cached_reference('lots')
+    if cached is not None:
+        return cached
+
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
@@ -709,12 +2004,17 @@ def get_all_parking_lots():
         cursor.callproc('GetAllParkingLots')
         for result in cursor.stored_results():
             lots = result.fetchall()
-        return {'status': 'success', 'data': lots}
+        return _cache_reference('lots', {'status': 'success', 'data': lots}, 'lots')
     except Error as e:
         return {'status': 'error', 'message': str(e)}
 
 def get_lot_by_id(lot_id):
-    """Fetch a single lot by its ID."""
+    """Fetch a single lot by its ID (cached until a lot changes)."""
+    key = ('lot', int(lot_id))
+    cached = _cached_reference(key)
+    if cached is not None:
+        return cached
+
     db, cursor = get_db()
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
@@ -724,7 +2024,7 @@ def get_lot_by_id(lot_id):
             lot = result.fetchone()
         
         if lot:
-            return {'status': 'success', 'data': lot}
+            return _cache_reference(key, {'status': 'success', 'data': lot}, 'lots')
         else:
             return {'status': 'error', 'message': 'Lot not found.'}
     except Error as e:
@@ -732,12 +2032,13 @@ def get_lot_by_id(lot_id):
 
 def add_parking_lot(lot_id, name, total_spaces, address):
     """Call stored procedure to add a new lot."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('AddParkingLot', (lot_id, name, total_spaces, address))
         db.commit()
+        invalidate_reference('lots')
         return {'status': 'success', 'message': 'Parking lot added successfully.'}
     except Error as e:
         db.rollback()
@@ -745,12 +2046,13 @@ def add_parking_lot(lot_id, name, total_spaces, address):
 
 def update_parking_lot(lot_id, name, total_spaces, address):
     """Call stored procedure to update a lot."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('UpdateParkingLot', (lot_id, name, total_spaces, address))
         db.commit()
+        invalidate_reference('lots')
         return {'status': 'success', 'message': 'Parking lot updated successfully.'}
     except Error as e:
         db.rollback()
@@ -758,12 +2060,13 @@ def update_parking_lot(lot_id, name, total_spaces, address):
 
 def delete_parking_lot(lot_id):
     """Call stored procedure to delete a lot."""
-    db, cursor = get_db()
+    db, cursor = get_db(bind_employee=True)
     if not db:
         return {'status': 'error', 'message': 'Database connection failed.'}
     try:
         cursor.callproc('DeleteParkingLot', (lot_id,))
         db.commit()
+        invalidate_reference('lots')
         return {'status': 'success', 'message': 'Parking lot deleted successfully.'}
     except Error as e:
         db.rollback()
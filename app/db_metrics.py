@@ -0,0 +1,445 @@
+import bisect
+import functools
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, request
+
+# Histogram bucket bounds (seconds / statement counts)
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+DIAGNOSTICS_MODES = ('off', 'prod', 'dev')
+SLOW_LOG_SIZE = 100            # recent slow statements kept for /api/metrics/db
+MAX_REPEATED_FINGERPRINTS = 500
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b|%(?:\(\w+\))?s")
+_VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*')
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalize SQL so statements differing only in literals, placeholders or list lengths match."""
+    sql = _COMMENTS.sub(' ', sql)
+    sql = _LITERALS.sub('?', sql)
+    sql = _VALUE_LISTS.sub('(...)', sql)
+    return ' '.join(sql.split()).rstrip(';').strip()
+
+
+def redact(params):
+    """Describe bind parameters by type and size only, never by value."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_redact_value(value) for value in params]
+    return _redact_value(params)
+
+
+def _redact_value(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (str, bytes)):
+        return f'<{type(value).__name__}:{len(value)}>'
+    if isinstance(value, (list, tuple)):
+        return f'<{len(value)} values>'
+    return f'<{type(value).__name__}>'
+
+
+class _ContextStats:
+    """DB work done inside one app context (a request or a background run)."""
+
+    __slots__ = ('queries', 'seconds', 'rows', 'slowest', 'functions', 'statements', 'slow')
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.slowest = None      # (seconds, function, statement)
+        self.functions = {}      # function -> [queries, seconds, rows, slowest seconds, statement]
+        self.statements = {}     # fingerprint -> [executions, function]
+        self.slow = []           # (seconds, function, fingerprint, sql, params) over the threshold
+
+    def add(self, function, statement, seconds, rows, executed):
+        self.seconds += seconds
+        self.rows += rows
+        entry = self.functions.get(function)
+        if entry is None:
+            entry = self.functions[function] = [0, 0.0, 0, 0.0, None]
+        entry[1] += seconds
+        entry[2] += rows
+        if executed:
+            self.queries += 1
+            entry[0] += 1
+            if self.slowest is None or seconds > self.slowest[0]:
+                self.slowest = (seconds, function, statement)
+            if seconds > entry[3]:
+                entry[3] = seconds
+                entry[4] = statement
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram keyed by one label value."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # label -> [bucket counts..., sum, count]
+
+    def observe(self, label, value):
+        series = self.series.get(label)
+        if series is None:
+            series = self.series[label] = [0] * len(self.buckets) + [0.0, 0]
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.buckets):
+            series[position] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+class DBMetrics:
+    """Process-wide DB timings per endpoint and per db_connector function.
+
+    Cursors handed out by get_db() report every statement here (through
+    ``g``); each app context is folded into the histograms when it ends.
+
+    Unless ``diagnostics`` is 'off', statements are also fingerprinted per
+    context: fingerprints run ``repeat_threshold`` or more times in one
+    request are counted (and printed in 'dev'), and statements slower than
+    ``slow_ms`` go to the slow-query log with redacted parameters and, when
+    ``explain`` is set, the EXPLAIN plan it returns.
+    """
+
+    def __init__(self, diagnostics='off', slow_ms=500.0, repeat_threshold=2, explain=None):
+        self.diagnostics = diagnostics
+        self.slow_seconds = slow_ms / 1000
+        self.repeat_threshold = repeat_threshold
+        self.explain = explain  # callable(sql, params) -> list of plan rows
+        self._lock = threading.Lock()
+        self.request_seconds = Histogram(TIME_BUCKETS)
+        self.request_db_seconds = Histogram(TIME_BUCKETS)
+        self.request_queries = Histogram(QUERY_BUCKETS)
+        self.function_seconds = Histogram(TIME_BUCKETS)
+        self.function_totals = {}  # function -> {'queries', 'rows', 'slowest', 'statement'}
+        self.repeated_totals = {}  # function -> extra executions of repeated statements
+        self.repeated_statements = {}  # (function, fingerprint) -> extra executions
+        self.slow_totals = {}  # function -> slow statements
+        self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+
+    def flush(self, stats, endpoint=None, elapsed=None):
+        """Fold one app context's totals in; ``endpoint`` is None outside requests."""
+        self._count_repeats(stats, endpoint)
+        for entry in stats.slow:
+            self._log_slow(entry, endpoint)
+        with self._lock:
+            if endpoint is not None:
+                self.request_seconds.observe(endpoint, elapsed)
+                self.request_db_seconds.observe(endpoint, stats.seconds)
+                self.request_queries.observe(endpoint, stats.queries)
+            for function, (queries, seconds, rows, slowest, statement) in stats.functions.items():
+                self.function_seconds.observe(function, seconds)
+                totals = self.function_totals.setdefault(
+                    function, {'queries': 0, 'rows': 0, 'slowest': 0.0, 'statement': None})
+                totals['queries'] += queries
+                totals['rows'] += rows
+                if slowest > totals['slowest']:
+                    totals['slowest'] = slowest
+                    totals['statement'] = statement
+
+    def _count_repeats(self, stats, endpoint):
+        repeats = [(count, function, statement) for statement, (count, function) in stats.statements.items()
+                   if count >= self.repeat_threshold]
+        if not repeats:
+            return
+        with self._lock:
+            for count, function, statement in repeats:
+                self.repeated_totals[function] = self.repeated_totals.get(function, 0) + count - 1
+                key = (function, statement)
+                if key in self.repeated_statements or len(self.repeated_statements) < MAX_REPEATED_FINGERPRINTS:
+                    self.repeated_statements[key] = self.repeated_statements.get(key, 0) + count - 1
+        if self.diagnostics == 'dev':
+            for count, function, statement in sorted(repeats, reverse=True):
+                print(f"Repeated SQL in {endpoint or 'background'}: {count}x in {function}: {statement}")
+
+    def _log_slow(self, entry, endpoint):
+        seconds, function, statement, sql, params = entry
+        plan = None
+        if self.explain and not isinstance(params, list) and statement.split(' ', 1)[0].upper() in EXPLAINABLE:
+            plan = self.explain(sql, params)
+        record = {
+            'at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'ms': round(seconds * 1000, 2),
+            'endpoint': endpoint or 'background',
+            'function': function,
+            'statement': statement,
+            'params': redact(params),
+            'explain': plan,
+        }
+        with self._lock:
+            self.slow_totals[function] = self.slow_totals.get(function, 0) + 1
+            self.slow_log.append(record)
+        print(f"Slow query {record['ms']} ms in {function} ({record['endpoint']}): {statement} "
+              f"params={record['params']}")
+        for row in plan or ():
+            print(f"  EXPLAIN {row}")
+
+    def diagnostics_report(self):
+        """Return the recent slow-query log and the most repeated statements."""
+        with self._lock:
+            repeated = sorted(self.repeated_statements.items(), key=lambda item: item[1], reverse=True)[:50]
+            return {
+                'mode': self.diagnostics,
+                'slow_ms': self.slow_seconds * 1000,
+                'slow_queries': list(self.slow_log),
+                'repeated': [{'function': function, 'statement': statement, 'extra_executions': count}
+                             for (function, statement), count in repeated],
+            }
+
+    def function_stats(self):
+        """Return lifetime totals per function, busiest (by DB time) first."""
+        with self._lock:
+            rows = []
+            for function, totals in self.function_totals.items():
+                series = self.function_seconds.series[function]
+                rows.append(dict(totals, function=function, calls=series[-1], seconds=series[-2]))
+        return sorted(rows, key=lambda row: row['seconds'], reverse=True)
+
+    def render(self, pool_stats=None, cache_stats=None):
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _histogram(lines, 'plm_request_duration_seconds', 'Request wall time.',
+                       'endpoint', self.request_seconds)
+            _histogram(lines, 'plm_request_db_seconds', 'Time spent in MySQL per request.',
+                       'endpoint', self.request_db_seconds)
+            _histogram(lines, 'plm_request_db_queries', 'Statements issued per request.',
+                       'endpoint', self.request_queries)
+            _histogram(lines, 'plm_db_function_seconds',
+                       'Time spent in MySQL per db_connector call (per app context).',
+                       'function', self.function_seconds)
+            _counter(lines, 'plm_db_function_queries_total', 'Statements issued per db_connector function.',
+                     'function', {f: t['queries'] for f, t in self.function_totals.items()})
+            _counter(lines, 'plm_db_function_rows_total', 'Rows fetched per db_connector function.',
+                     'function', {f: t['rows'] for f, t in self.function_totals.items()})
+            _counter(lines, 'plm_db_repeated_statements_total',
+                     'Extra executions of statements repeated within one request.', 'function', self.repeated_totals)
+            _counter(lines, 'plm_db_slow_statements_total', 'Statements over the slow-query threshold.',
+                     'function', self.slow_totals)
+            lines.append('# HELP plm_db_function_slowest_seconds Slowest single statement per function.')
+            lines.append('# TYPE plm_db_function_slowest_seconds gauge')
+            for function, totals in sorted(self.function_totals.items()):
+                lines.append(f'plm_db_function_slowest_seconds{{function="{function}"}} {totals["slowest"]:.6f}')
+        for name, value in sorted((pool_stats or {}).items()):
+            kind = 'gauge' if name in ('size', 'max_overflow', 'open', 'idle', 'checked_out') else 'counter'
+            suffix = '_seconds_total' if name == 'wait_time' else ('_total' if kind == 'counter' else '')
+            metric = f'plm_db_pool_{name}{suffix}'
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.append(f'{metric} {value}')
+        for name in ('hits', 'misses', 'evictions', 'expirations', 'invalidations', 'size'):
+            if not cache_stats:
+                break
+            kind = 'gauge' if name == 'size' else 'counter'
+            metric = f"plm_cache_{name}{'_total' if kind == 'counter' else ''}"
+            lines.append(f'# TYPE {metric} {kind}')
+            for cache, stats in sorted(cache_stats.items()):
+                lines.append(f'{metric}{{cache="{cache}"}} {stats[name]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram(lines, name, help_text, label, histogram):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for value, series in sorted(histogram.series.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, series):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {series[-1]}')
+        lines.append(f'{name}_sum{{{label}="{value}"}} {series[-2]:.6f}')
+        lines.append(f'{name}_count{{{label}="{value}"}} {series[-1]}')
+
+
+def _counter(lines, name, help_text, label, values):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} counter')
+    for value, count in sorted(values.items()):
+        lines.append(f'{name}{{{label}="{value}"}} {count}')
+
+
+# ---------------------------------------------------------------------
+# Cursor wrapper
+# ---------------------------------------------------------------------
+
+class InstrumentedCursor:
+    """Cursor proxy that times statements and counts fetched rows.
+
+    Each statement is attributed to the outermost ``owner`` module function
+    on the call stack (so helpers and retry closures roll up into the public
+    db_connector function that was called); fetches are attributed to the
+    function that ran the statement they read from.
+    """
+
+    def __init__(self, cursor, owner):
+        self._cursor = cursor
+        self._owner = owner
+        self._function = None
+        self._statement = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._timed(operation, params, self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        return self._timed(operation, seq_params, self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def callproc(self, procname, args=(), *more, **kwargs):
+        return self._timed(f'CALL {procname}', args, self._cursor.callproc, procname, args, *more, **kwargs)
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def fetchmany(self, size=1):
+        return self._fetch(self._cursor.fetchmany, size)
+
+    def stored_results(self):
+        for result in self._cursor.stored_results():
+            rows = result.fetchall()
+            _record(self._function, self._statement, 0.0, len(rows), executed=False)
+            yield _StoredResult(result, rows)
+
+    def _timed(self, sql, params, method, *args, **kwargs):
+        self._function = _caller(self._owner)
+        self._statement = fingerprint(str(sql))
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            stats = _context_stats()
+            stats.add(self._function, self._statement, seconds, 0, executed=True)
+            metrics = current_app.extensions['db_metrics']
+            if metrics.diagnostics != 'off':
+                stats.statements.setdefault(self._statement, [0, self._function])[0] += 1
+                if seconds >= metrics.slow_seconds:
+                    stats.slow.append((seconds, self._function, self._statement, sql, params))
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        rows = 0 if result is None else (len(result) if isinstance(result, list) else 1)
+        _record(self._function, self._statement, time.perf_counter() - started, rows, executed=False)
+        return result
+
+
+class _StoredResult:
+    """A procedure result set whose rows were already read (and counted)."""
+
+    def __init__(self, result, rows):
+        self._result = result
+        self._rows = rows
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+
+def _caller(owner):
+    """Name of the outermost function of module ``owner`` in the current call chain."""
+    frame = sys._getframe(2)
+    function = None
+    while frame is not None:
+        if frame.f_globals.get('__name__') == owner:
+            function = frame.f_code.co_name
+        elif function is not None:
+            break
+        frame = frame.f_back
+    return function or '<unknown>'
+
+
+def _context_stats():
+    stats = g.get('_db_stats')
+    if stats is None:
+        stats = g._db_stats = _ContextStats()
+    return stats
+
+
+def _record(function, statement, seconds, rows, executed):
+    _context_stats().add(function, statement, seconds, rows, executed)
+
+
+# ---------------------------------------------------------------------
+# Flask wiring
+# ---------------------------------------------------------------------
+
+def instrument_cursor(cursor, owner):
+    """Wrap a MySQL cursor so its statements are timed and attributed."""
+    return InstrumentedCursor(cursor, owner)
+
+
+def server_timing(stats):
+    """Build a Server-Timing header value from a context's DB totals."""
+    parts = [f'db;dur={stats.seconds * 1000:.2f};desc="{stats.queries} queries, {stats.rows} rows"']
+    if stats.slowest:
+        seconds, function, _ = stats.slowest
+        parts.append(f'db-slowest;dur={seconds * 1000:.2f};desc="{function}"')
+    return ', '.join(parts)
+
+
+def init_app(app, explain=None):
+    """Collect per-request DB totals, add Server-Timing and feed the /metrics histograms.
+
+    DB_DIAGNOSTICS picks the statement diagnostics ('dev', 'prod' or 'off');
+    ``explain`` runs EXPLAIN for slow statements when DB_SLOW_QUERY_EXPLAIN is on.
+    """
+    mode = app.config['DB_DIAGNOSTICS']
+    if mode not in DIAGNOSTICS_MODES:
+        raise ValueError(f"DB_DIAGNOSTICS must be one of {', '.join(DIAGNOSTICS_MODES)}, not {mode!r}.")
+    metrics = app.extensions['db_metrics'] = DBMetrics(
+        diagnostics=mode,
+        slow_ms=app.config['DB_SLOW_QUERY_MS'],
+        repeat_threshold=app.config['DB_REPEAT_THRESHOLD'],
+        explain=explain if app.config['DB_SLOW_QUERY_EXPLAIN'] else None,
+    )
+
+    @app.before_request
+    def start_db_metrics():
+        g._metrics_started = time.perf_counter()
+        g._metrics_endpoint = request.endpoint or 'unmatched'
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = g.get('_db_stats')
+        if stats is not None:
+            response.headers.add('Server-Timing', server_timing(stats))
+        return response
+
+    # Registered after db_connector's close_db, so it runs first and ``explain``
+    # can still use the context's connection
+    @app.teardown_appcontext
+    def flush_db_metrics(exc=None):
+        stats = g.pop('_db_stats', None) or _ContextStats()
+        started = g.pop('_metrics_started', None)
+        if started is not None:
+            metrics.flush(stats, g.pop('_metrics_endpoint'), time.perf_counter() - started)
+        elif stats.functions:
+            metrics.flush(stats)  # background worker run
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+
+class PoolTimeout(Error):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections used behind db_connector.get_db().
+
+    Keeps up to ``size`` idle connections open between requests and allows up
+    to ``max_overflow`` extra connections under load; overflow connections are
+    closed when they are returned. When everything is checked out, callers
+    wait up to ``timeout`` seconds for a connection to be returned.
+
+    MySQL user variables survive on a connection between checkouts, so the
+    pool remembers what each connection was last given (see
+    ``set_session_var``) and callers can skip re-sending an unchanged value.
+    """
+
+    def __init__(self, connect_args, size=5, max_overflow=10, timeout=30.0,
+                 ping_interval=30.0):
+        self.connect_args = connect_args
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._idle = deque()  # (connection, last_returned_at)
+        self._open = 0
+        self._session_vars = {}  # id(connection) -> {name: value}
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'connects': 0,
+            'health_check_failures': 0,
+            'discarded': 0,
+        }
+
+    # -----------------------------------------------------------------
+    # Checkout / checkin
+    # -----------------------------------------------------------------
+
+    def checkout(self):
+        """Borrow a healthy connection, opening or waiting for one if needed."""
+        deadline = None
+        waited_from = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    conn, returned_at = None, None
+                    break
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    deadline = waited_from + self.timeout
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += time.monotonic() - waited_from
+                    raise PoolTimeout(msg=f"No database connection available after {self.timeout}s.")
+                self._cond.wait(remaining)
+
+            if waited_from is not None:
+                self._stats['wait_time'] += time.monotonic() - waited_from
+            self._stats['checkouts'] += 1
+
+        if conn is not None and not self._is_healthy(conn, returned_at):
+            self._stats['health_check_failures'] += 1
+            self._session_vars.pop(id(conn), None)
+            self._close_quietly(conn)
+            conn = None
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Error:
+                self._release_slot()
+                raise
+        return conn
+
+    def checkin(self, conn):
+        """Return a connection, rolling back any transaction left open."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    def get_session_var(self, conn, name):
+        """Return the value last bound to a user variable on this connection."""
+        return self._session_vars.get(id(conn), {}).get(name)
+
+    def set_session_var(self, conn, name, value):
+        """Record that a user variable now holds ``value`` on this connection."""
+        self._session_vars.setdefault(id(conn), {})[name] = value
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on return)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._session_vars.pop(id(conn), None)
+            self._close_quietly(conn)
+
+    def stats(self):
+        """Return a snapshot of pool counters and current occupancy."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot['size'] = self.size
+            snapshot['max_overflow'] = self.max_overflow
+            snapshot['open'] = self._open
+            snapshot['idle'] = len(self._idle)
+            snapshot['checked_out'] = self._open - len(self._idle)
+        snapshot['wait_time'] = round(snapshot['wait_time'], 6)
+        return snapshot
+
+    # -----------------------------------------------------------------
+    # Internals
+    # -----------------------------------------------------------------
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.connect_args)
+        with self._cond:
+            self._stats['connects'] += 1
+        return conn
+
+    def _is_healthy(self, conn, returned_at):
+        """Ping connections that sat idle longer than ``ping_interval``."""
+        if time.monotonic() - returned_at < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _discard(self, conn):
+        self._session_vars.pop(id(conn), None)
+        self._close_quietly(conn)
+        with self._cond:
+            self._stats['discarded'] += 1
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Error:
+            pass
@@ -0,0 +1,493 @@
+"""Async gate API: entry, exit, vacant-space lookup and customer history over ASGI.
+
+The Flask app is WSGI, so each of its requests holds a server thread while
+it waits on MySQL. This module serves the gate-critical endpoints from a
+plain ASGI application on mysql.connector.aio instead: one event loop keeps
+many gates in flight on a bounded set of connections. Run it beside the
+Flask app and route ``/api/gate/{entry,exit,spaces/vacant,customer_history}``
+to it; the sync routes are unchanged:
+
+    uvicorn app.gate_asgi:app --port 5001
+
+Requests need ``Authorization: Bearer <GATE_API_TOKEN>``. Settings come from
+the Flask app's config, and the SQL is shared with db_connector.
+"""
+import asyncio
+import hmac
+import json
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from urllib.parse import parse_qs
+
+import mysql.connector.aio
+from mysql.connector import Error
+
+from . import app as flask_app
+from . import db_connector
+from .routes import SPACE_TYPES
+from .space_index import SpaceStatusIndex
+from .tariffs import TariffEngine
+
+# Largest JSON body accepted by the POST endpoints
+GATE_MAX_BODY = 16 * 1024
+
+
+class PoolBusy(Exception):
+    """Raised when no connection is free and the caller cannot wait for one."""
+
+
+class AsyncConnectionPool:
+    """asyncio pool of mysql.connector.aio connections for the gate API.
+
+    Opens up to ``size`` autocommit connections on demand and reuses them
+    most-recently-returned first. At most ``max_pending`` callers wait for a
+    connection, each for up to ``timeout`` seconds; past either limit the
+    caller gets PoolBusy, so load is shed with a 503 instead of queueing
+    without bound. ``init_statements`` run once on every new connection.
+    """
+
+    def __init__(self, connect_args, size=10, max_pending=100, timeout=5.0,
+                 ping_interval=30.0, init_statements=()):
+        self.connect_args = dict(connect_args, autocommit=True)
+        self.size = size
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.init_statements = init_statements
+        self._idle = []  # (connection, last_returned_at)
+        self._slots = asyncio.Semaphore(size)
+        self._pending = 0
+        self._open = 0
+        self._stats = {'checkouts': 0, 'waits': 0, 'shed': 0, 'timeouts': 0, 'connects': 0, 'discarded': 0}
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection; it is closed rather than reused if the block raises."""
+        await self._acquire_slot()
+        try:
+            conn = await self._checkout()
+            try:
+                yield conn
+            except BaseException:
+                await self._discard(conn)
+                raise
+            self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """Close every idle connection (on shutdown)."""
+        while self._idle:
+            conn, _ = self._idle.pop()
+            await self._discard(conn)
+
+    def stats(self):
+        return dict(self._stats, size=self.size, open=self._open, idle=len(self._idle), pending=self._pending)
+
+    async def _acquire_slot(self):
+        if self._slots.locked():
+            if self._pending >= self.max_pending:
+                self._stats['shed'] += 1
+                raise PoolBusy()
+            self._stats['waits'] += 1
+        self._pending += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            raise PoolBusy() from None
+        finally:
+            self._pending -= 1
+        self._stats['checkouts'] += 1
+
+    async def _checkout(self):
+        while self._idle:
+            conn, returned_at = self._idle.pop()
+            if time.monotonic() - returned_at < self.ping_interval:
+                return conn
+            try:
+                await conn.ping()
+                return conn
+            except Error:
+                await self._discard(conn)
+        try:
+            conn = await mysql.connector.aio.connect(**self.connect_args)
+        except OSError as e:
+            # The async driver lets socket errors through unwrapped
+            raise Error(msg=f'Database connection failed: {e}') from e
+        self._open += 1
+        self._stats['connects'] += 1
+        if self.init_statements:
+            cursor = await conn.cursor()
+            try:
+                for statement, params in self.init_statements:
+                    await cursor.execute(statement, params)
+            except BaseException:
+                await self._discard(conn)
+                raise
+            await cursor.close()
+        return conn
+
+    async def _discard(self, conn):
+        self._open -= 1
+        self._stats['discarded'] += 1
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+
+class _BadRequest(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _plate(value):
+    if not isinstance(value, str) or not value.strip() or len(value.strip()) > 15:
+        raise _BadRequest('license_plate must be a non-empty string of at most 15 characters.')
+    return value.strip()
+
+def _optional_int(value, name):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise _BadRequest(f'{name} must be an integer.')
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        raise _BadRequest(f'{name} must be an integer.') from None
+
+def _optional_space_type(value):
+    if value is None or value == '':
+        return None
+    if value not in SPACE_TYPES:
+        raise _BadRequest(f"space_type must be one of: {', '.join(SPACE_TYPES)}.")
+    return value
+
+def _optional_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise _BadRequest(f'{name} must be formatted YYYY-MM-DD.') from None
+
+def _result_response(result):
+    """Map a db_connector-style result to (status, payload, headers)."""
+    if result['status'] == 'success':
+        return 200, result, []
+    if result.get('code') == 'contention':
+        return 503, result, [(b'retry-after', b'1')]
+    return 409, result, []
+
+
+class GateAPI:
+    """ASGI application for the gate endpoints, configured from the Flask app's config.
+
+    Like the Flask worker that handles a request, it keeps its own space
+    index and compiled tariffs, rebuilt from MySQL when stale, so vacant
+    lookups and exit pricing cost no extra queries.
+    """
+
+    def __init__(self, config):
+        self.token = config['GATE_API_TOKEN']
+        employee_id = config['GATE_EMPLOYEE_ID']
+        self.pool = AsyncConnectionPool(
+            connect_args={
+                'host': config['DB_HOST'],
+                'user': config['DB_USER'],
+                'password': config['DB_PASSWORD'],
+                'database': config['DB_NAME'],
+            },
+            size=config['GATE_DB_POOL_SIZE'],
+            max_pending=config['GATE_MAX_PENDING'],
+            timeout=config['GATE_DB_TIMEOUT'],
+            ping_interval=config['DB_POOL_PING_INTERVAL'],
+            init_statements=[("SET @current_user_employee_id = %s", (employee_id,))] if employee_id else (),
+        )
+        self.space_index = SpaceStatusIndex(max_age=config['SPACE_INDEX_MAX_AGE'])
+        self.tariff_engine = TariffEngine(max_age=config['TARIFF_REFRESH_SECONDS'])
+        self._reload_lock = asyncio.Lock()
+        self.routes = [
+            ('POST', re.compile(r'/api/gate/entry'), self.entry),
+            ('POST', re.compile(r'/api/gate/exit'), self.exit),
+            ('GET', re.compile(r'/api/gate/spaces/vacant'), self.vacant_spaces),
+            ('GET', re.compile(r'/api/gate/customer_history/(\d+)'), self.customer_history),
+            ('GET', re.compile(r'/api/gate/stats'), self.stats),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        status, payload, headers = await self._handle(scope, receive)
+        body = json.dumps(payload, default=str).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())] + headers,
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    # -----------------------------------------------------------------
+    # Dispatch
+    # -----------------------------------------------------------------
+
+    async def _handle(self, scope, receive):
+        if not self.token:
+            return 404, {'error': 'Not Found'}, []
+        authorization = dict(scope['headers']).get(b'authorization', b'')
+        if not hmac.compare_digest(authorization, f"Bearer {self.token}".encode()):
+            return 401, {'error': 'Unauthorized'}, [(b'www-authenticate', b'Bearer')]
+
+        for method, pattern, handler in self.routes:
+            match = pattern.fullmatch(scope['path'])
+            if match:
+                break
+        else:
+            return 404, {'error': 'Not Found'}, []
+        if scope['method'] != method:
+            return 405, {'error': 'Method Not Allowed'}, [(b'allow', method.encode())]
+
+        try:
+            if method == 'POST':
+                args = await self._read_json(receive)
+            else:
+                args = {k: v[0] for k, v in parse_qs(scope['query_string'].decode('latin-1')).items()}
+            return await handler(args, *match.groups())
+        except _BadRequest as e:
+            return e.status, {'error': str(e)}, []
+        except PoolBusy:
+            return 503, {'error': 'Gate API is busy; retry shortly.'}, [(b'retry-after', b'1')]
+        except Error as e:
+            return 500, {'status': 'error', 'message': str(e)}, []
+
+    async def _read_json(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise _BadRequest('Client disconnected.')
+            body = message.get('body', b'')
+            size += len(body)
+            if size > GATE_MAX_BODY:
+                raise _BadRequest(f'Request body is larger than {GATE_MAX_BODY} bytes.', status=413)
+            chunks.append(body)
+            if not message.get('more_body'):
+                break
+        try:
+            payload = json.loads(b''.join(chunks))
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            raise _BadRequest('Expected a JSON object.')
+        return payload
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.pool.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # -----------------------------------------------------------------
+    # Endpoints
+    # -----------------------------------------------------------------
+
+    async def entry(self, body):
+        """POST {license_plate, space_id}, or {license_plate, lot_id?, space_type?} for the nearest vacant space."""
+        plate = _plate(body.get('license_plate'))
+        space_id = _optional_int(body.get('space_id'), 'space_id')
+        if space_id is not None:
+            result = await self._enter(plate, space_id)
+        else:
+            result = await self._allocate(plate, _optional_int(body.get('lot_id'), 'lot_id'),
+                                          _optional_space_type(body.get('space_type')))
+        return _result_response(result)
+
+    async def exit(self, body):
+        """POST {license_plate, payment_method}: close the active record and take payment."""
+        plate = _plate(body.get('license_plate'))
+        payment_method = body.get('payment_method')
+        if payment_method not in db_connector.PAYMENT_METHODS:
+            raise _BadRequest(f"payment_method must be one of: {', '.join(db_connector.PAYMENT_METHODS)}.")
+        engine = await self._tariffs()
+
+        async def close_record(cursor):
+            await cursor.execute(db_connector.EXIT_LOCK_RECORD, (plate,))
+            rows = await cursor.fetchall()
+            if not rows:
+                return None
+            record = rows[0]
+            duration, fee = engine.quote(record['Lot_ID'], record['SpaceType'], record['EntryTime'], record['ExitTime'])
+            await cursor.execute(db_connector.EXIT_INSERT_PAYMENT,
+                                 (record['RecordID'], fee, record['ExitTime'], payment_method))
+            await cursor.execute(db_connector.EXIT_CLOSE_RECORD,
+                                 (record['ExitTime'], duration, cursor.lastrowid, record['RecordID']))
+            await cursor.execute(db_connector.EXIT_FREE_SPACE, (record['SpaceID'],))
+            return record['SpaceID'], fee
+
+        closed = await self._transaction(close_record)
+        if not closed:
+            return _result_response({'status': 'error', 'code': 'no_active_record',
+                                     'message': f'No active record found for {plate}.'})
+        space_id, fee = closed
+        self.space_index.set_status(space_id, 'Vacant')
+        return _result_response({'status': 'success', 'space_id': space_id, 'fee': fee,
+                                 'message': f'Exit & Payment successful for {plate}. Fee: ₹{fee:.2f} ({payment_method})'})
+
+    async def vacant_spaces(self, query):
+        """GET ?lot_id=&space_type=: vacant spaces ordered by SpaceNumber."""
+        lot_id = _optional_int(query.get('lot_id'), 'lot_id')
+        space_type = _optional_space_type(query.get('space_type'))
+        index = await self._space_index()
+        return 200, {'data': index.vacant_spaces(lot_id, space_type)}, []
+
+    async def customer_history(self, query, customer_id):
+        """GET ?after=&limit=&start=&end=: one page of a customer's history ({data, next_cursor})."""
+        limit = _optional_int(query.get('limit'), 'limit') or db_connector.HISTORY_PAGE_SIZE
+        where, params = db_connector.history_filters(int(customer_id), _optional_date(query.get('start'), 'start'),
+                                                     _optional_date(query.get('end'), 'end'))
+        plan = db_connector.keyset_query(db_connector.HISTORY_SELECT, db_connector.HISTORY_SORT, 'recent',
+                                         query.get('after') or None, limit, True, where, params)
+        if 'query' not in plan:
+            raise _BadRequest(plan['message'])
+        page = db_connector.keyset_result(plan, await self._fetchall(plan['query'], plan['params']))
+        return 200, {'data': page['data'], 'next_cursor': page['next_cursor']}, []
+
+    async def stats(self, query):
+        """GET: connection pool counters (shed and timed-out requests show up here)."""
+        return 200, self.pool.stats(), []
+
+    # -----------------------------------------------------------------
+    # Entry
+    # -----------------------------------------------------------------
+
+    async def _enter(self, plate, space_id):
+        """Claim ``space_id`` through ProcessVehicleEntry (one round trip, as in process_vehicle_entry)."""
+        async def claim(cursor):
+            await cursor.execute("CALL ProcessVehicleEntry(%s, %s)", (plate, space_id))
+            entry = None
+            while True:
+                if cursor.with_rows:
+                    rows = await cursor.fetchall()
+                    entry = rows[-1] if rows else entry
+                if not await cursor.nextset():
+                    return entry
+
+        # The procedure opens and ends its own transaction
+        entry = await self._transaction(claim, begin=False)
+        if not entry:
+            return {'status': 'error', 'message': 'Entry failed.'}
+        if entry['SpaceStatus']:
+            self.space_index.set_status(space_id, entry['SpaceStatus'])
+        if entry['Status'] != 'success':
+            return {'status': 'error', 'code': entry['Code'], 'message': entry['Message']}
+        return {
+            'status': 'success',
+            'message': entry['Message'],
+            'space_id': space_id,
+            'record_id': entry['RecordID'],
+            'customer_id': entry['CustomerID'],
+        }
+
+    async def _allocate(self, plate, lot_id, space_type):
+        """Nearest-vacant-space entry, with the same rules as db_connector.allocate_vehicle_entry."""
+        index = await self._space_index()
+        kind = f'{space_type} ' if space_type else ''
+        lot = f' in lot {lot_id}' if lot_id is not None else ''
+        tried = set()
+        for _ in range(db_connector.ALLOCATION_MAX_ATTEMPTS):
+            space_id = index.take_vacant(lot_id, space_type, exclude=tried)
+            if space_id is None:
+                return {'status': 'error', 'code': 'no_space', 'message': f'No vacant {kind}space available{lot}.'}
+            tried.add(space_id)
+
+            try:
+                result = await self._enter(plate, space_id)
+            except PoolBusy:
+                index.set_status(space_id, 'Vacant')
+                raise
+            except BaseException:
+                index.mark_stale()
+                raise
+            if result['status'] == 'success':
+                result['message'] = f"{result['message']} (allocated automatically)"
+                return result
+            if result.get('code') == 'invalid_space':
+                index.mark_stale()
+            elif result.get('code') not in db_connector.ALLOCATION_RETRY_CODES:
+                if result.get('code'):
+                    index.set_status(space_id, 'Vacant')
+                else:
+                    index.mark_stale()
+                return result
+
+        return {'status': 'error', 'code': 'contention',
+                'message': f'Other gates took the {db_connector.ALLOCATION_MAX_ATTEMPTS} nearest vacant '
+                           f'{kind}spaces{lot} first. Please retry the entry.'}
+
+    # -----------------------------------------------------------------
+    # MySQL
+    # -----------------------------------------------------------------
+
+    async def _transaction(self, work, begin=True):
+        """Run ``await work(cursor)`` as one transaction, retrying deadlocks and lock wait timeouts.
+
+        Same policy as db_connector._with_lock_retry, but the backoff sleeps
+        on the event loop instead of a worker thread.
+        """
+        async with self.pool.connection() as conn:
+            cursor = await conn.cursor(dictionary=True)
+            attempt = 1
+            while True:
+                try:
+                    if begin:
+                        await conn.start_transaction()
+                    result = await work(cursor)
+                    if begin:
+                        await conn.commit()
+                    await cursor.close()
+                    return result
+                except Error as e:
+                    await conn.rollback()
+                    if e.errno not in db_connector.LOCK_RETRY_ERRNOS or attempt >= db_connector.LOCK_RETRY_ATTEMPTS:
+                        raise
+                    await asyncio.sleep(db_connector.LOCK_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                                        * random.uniform(0.5, 1.5))
+                    attempt += 1
+
+    async def _fetchall(self, query, params=()):
+        async with self.pool.connection() as conn:
+            cursor = await conn.cursor(dictionary=True)
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            await cursor.close()
+            return rows
+
+    async def _space_index(self):
+        if self.space_index.needs_rebuild():
+            async with self._reload_lock:
+                if self.space_index.needs_rebuild():
+                    self.space_index.load(await self._fetchall(db_connector.SPACE_INDEX_SELECT))
+        return self.space_index
+
+    async def _tariffs(self):
+        if self.tariff_engine.needs_reload():
+            async with self._reload_lock:
+                if self.tariff_engine.needs_reload():
+                    self.tariff_engine.load(await self._fetchall(db_connector.TARIFF_SELECT))
+        return self.tariff_engine
+
+
+app = GateAPI(flask_app.config)
@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, make_response
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify, make_response, Response, stream_with_context
 from functools import wraps
 from . import db_connector
+from .session_store import get_session_stats, regenerate_session
+import hmac
 import io
 import csv
+import zlib
+from datetime import datetime, timedelta
 
 bp = Blueprint('bp', __name__)
 
@@ -46,6 +50,7 @@ def login():
 
         auth_result = db_connector.authenticate_user(username, password)
         if auth_result.get('status') == 'success':
+            regenerate_session(session)
             session['employee_id'] = auth_result.get('employee_id')
             session['username'] = username
             session['role'] = auth_result.get('role')
@@ -101,22 +106,69 @@ def signup():
 @login_required
 def dashboard():
     """Display real-time and financial summaries."""
-    occupancy_data = db_connector.get_real_time_occupancy_report()
+    status_data = db_connector.get_space_status_changes()
     financial_data = db_connector.get_financial_report()
-    # vacant_spaces_data = db_connector.get_vacant_space_list()
-    all_spaces_data = db_connector.get_all_parking_spaces()
 
-    occupancy = occupancy_data.get('data') if occupancy_data.get('status') == 'success' else None
+    snapshot = status_data.get('data') if status_data.get('status') == 'success' else None
+    occupancy = snapshot['counts'] if snapshot else None
     financial_report = financial_data.get('data') if financial_data.get('status') == 'success' else None
-    all_spaces = all_spaces_data.get('data') if all_spaces_data.get('status') == 'success' else []
+    all_spaces = snapshot['spaces'] if snapshot else []
 
     return render_template(
         'dashboard.html', 
         occupancy=occupancy, 
         financial_report=financial_report,
-        all_spaces=all_spaces
+        all_spaces=all_spaces,
+        status_epoch=snapshot['epoch'] if snapshot else '',
+        status_version=snapshot['version'] if snapshot else ''
         )
 
+@bp.route('/api/spaces/status', methods=['GET'])
+@login_required
+def space_status_api():
+    """Provide space statuses changed since the client's version (ETag/304 when unchanged)."""
+    epoch = request.args.get('epoch')
+    since = request.args.get('since', type=int)
+
+    result = db_connector.get_space_status_changes(epoch, since)
+    if result.get('status') != 'success':
+        return jsonify({'error': result.get('message')}), 500
+
+    data = result['data']
+    etag = f"{data['epoch']}-{data['version']}"
+    if not data['full'] and request.if_none_match.contains(etag):
+        return '', 304
+
+    response = jsonify(data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@bp.route('/api/occupancy/history', methods=['GET'])
+@login_required
+def occupancy_history_api():
+    """Provide an occupancy time series (default: the last 24 hours)."""
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 timestamps.'}), 400
+    resolution = request.args.get('resolution', type=int)
+    if start >= end or (resolution is not None and resolution not in db_connector.OCCUPANCY_RESOLUTIONS):
+        return jsonify({'error': 'Invalid range or resolution.'}), 400
+
+    result = db_connector.get_occupancy_history(
+        start, end,
+        lot_id=request.args.get('lot_id', type=int),
+        space_type=request.args.get('space_type') or None,
+        resolution=resolution,
+    )
+    if result.get('status') != 'success':
+        return jsonify({'error': result.get('message')}), 500
+    for row in result['data']:
+        row['BucketStart'] = row['BucketStart'].isoformat()
+    return jsonify({'resolution': result['resolution'], 'data': result['data']})
+
 # ---------------------------------------------------------------------
 # Operations Page
 # ---------------------------------------------------------------------
@@ -125,20 +177,58 @@ def dashboard():
 @login_required
 def operations():
     """Render the parking operations page."""
-    return render_template('operations.html')
+    lots_result = db_connector.get_all_parking_lots()
+    lots = lots_result.get('data', []) if lots_result.get('status') == 'success' else []
+    return render_template('operations.html', lots=lots, space_types=SPACE_TYPES)
+
+# ---------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint; needs the METRICS_TOKEN bearer token and is 404 without one."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        return Response('Not Found\n', status=404, mimetype='text/plain')
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(db_connector.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/api/metrics/db', methods=['GET'])
+@admin_required
+def db_metrics_api():
+    """Per-function DB totals, the slow-query log and the most repeated statements."""
+    return jsonify({
+        'functions': db_connector.get_db_function_stats(),
+        'diagnostics': db_connector.get_db_diagnostics(),
+        'pool': db_connector.get_pool_stats(),
+        'sessions': get_session_stats(),
+    })
+
 
 # ---------------------------------------------------------------------
 # Parking Operations
 # ---------------------------------------------------------------------
 
+SPACE_TYPES = ['Standard', 'Handicap', 'EV', 'Reserved']
+SPACE_STATUSES = ['Vacant', 'Occupied', 'Reserved', 'Maintenance']
+
 @bp.route('/process_entry', methods=['POST'])
 @login_required
 def process_entry_route():
-    """Handle vehicle entry."""
+    """Handle vehicle entry (a given space, or the nearest vacant one in a lot/type)."""
     license_plate = request.form.get('license_plate')
     space_id = request.form.get('space_id')
 
-    result = db_connector.process_vehicle_entry(license_plate, space_id)
+    if space_id:
+        result = db_connector.process_vehicle_entry(license_plate, space_id)
+    else:
+        space_type = request.form.get('space_type') or None
+        if space_type and space_type not in SPACE_TYPES:
+            space_type = None
+        result = db_connector.allocate_vehicle_entry(
+            license_plate, request.form.get('lot_id', type=int), space_type)
     flash(result.get('message'), result.get('status'))
     return redirect(url_for('bp.operations'))
 
@@ -155,6 +245,21 @@ def process_exit_route():
     return redirect(url_for('bp.operations'))
 
 
+@bp.route('/api/gate/events', methods=['POST'])
+@login_required
+def gate_events_api():
+    """Apply a JSON batch of entry/exit events (e.g. from ANPR cameras)."""
+    payload = request.get_json(silent=True)
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list) or not events:
+        return jsonify({'error': "Expected a non-empty JSON array of events (or {'events': [...]})."}), 400
+    if len(events) > db_connector.GATE_BATCH_MAX_EVENTS:
+        return jsonify({'error': f'At most {db_connector.GATE_BATCH_MAX_EVENTS} events per batch.'}), 413
+
+    result = db_connector.ingest_gate_events(events)
+    return jsonify(result['data'])
+
+
 # @bp.route('/book_reservation', methods=['POST'])
 # @login_required
 # def book_reservation_route():
@@ -186,18 +291,78 @@ def book_reservation_route():
 @bp.route('/reports/hierarchy')
 @login_required
 def employee_hierarchy():
-    """Displays Employee Hierarchy report."""
+    """Displays Employee Hierarchy report, or one manager's team with ?manager=<id>."""
     report_data = db_connector.get_employee_hierarchy_report()
     hierarchy = report_data.get('data') if report_data.get('status') == 'success' else None
-    return render_template('hierarchy_report.html', employees=hierarchy)
+
+    manager_id = request.args.get('manager', type=int)
+    team, chain = None, []
+    if manager_id is not None:
+        subtree = db_connector.get_employee_subtree(manager_id)
+        if subtree.get('status') == 'success':
+            team = subtree['data']
+            chain = db_connector.get_employee_ancestors(manager_id).get('data') or []
+        else:
+            flash(subtree.get('message'), 'error')
+    return render_template('hierarchy_report.html', employees=hierarchy, team=team, chain=chain)
+
+@bp.route('/reports/hierarchy/manager', methods=['POST'])
+@login_required
+@admin_required
+def change_employee_manager():
+    """Move an employee (with their team) under a different manager."""
+    employee_id = request.form.get('employee_id', type=int)
+    manager_id = request.form.get('manager_id', type=int)  # empty: top of the tree
+    if employee_id is None:
+        flash('Choose an employee to move.', 'error')
+        return redirect(url_for('bp.employee_hierarchy'))
+
+    result = db_connector.set_employee_manager(employee_id, manager_id)
+    flash(result.get('message'), result.get('status'))
+    return redirect(url_for('bp.employee_hierarchy', manager=manager_id or employee_id))
 
 @bp.route('/reports/maintenance')
 @login_required
 def maintenance_audit():
-    """Displays Maintenance Audit report."""
-    report_data = db_connector.get_maintenance_audit_report()
-    maintenance_logs = report_data.get('data') if report_data.get('status') == 'success' else []
-    return render_template('maintenance_report.html', maintenance_logs=maintenance_logs)# Add this in the 'Reports' section of db_connector.py
+    """Displays one page of the Maintenance Audit report (filters: start, end, lot, status)."""
+    filters = {
+        'start': request.args.get('start') or None,
+        'end': request.args.get('end') or None,
+        'lot': request.args.get('lot', type=int),
+        'status': request.args.get('status') if request.args.get('status') in SPACE_STATUSES else None,
+    }
+    try:
+        start_date = filters['start'] and datetime.strptime(filters['start'], '%Y-%m-%d').date()
+        end_date = filters['end'] and datetime.strptime(filters['end'], '%Y-%m-%d').date()
+    except ValueError:
+        flash('Dates must be formatted YYYY-MM-DD.', 'error')
+        return redirect(url_for('bp.maintenance_audit'))
+
+    args = _page_args()
+    del args['descending']  # the audit is always newest first
+    args['limit'] = args['limit'] if request.args.get('limit') else db_connector.MAINTENANCE_PAGE_SIZE
+    report_data = db_connector.get_maintenance_audit_report(
+        start_date=start_date, end_date=end_date, lot_id=filters['lot'], status=filters['status'], **args)
+    if report_data.get('status') != 'success':
+        flash(report_data.get('message'), 'error')
+    summary_data = db_connector.get_maintenance_summary(filters['lot'])
+    lots_data = db_connector.get_all_parking_lots()
+    unlogged = []
+    if not args['after'] and filters['status'] in (None, 'Maintenance'):
+        unlogged_data = db_connector.get_unlogged_maintenance_spaces(filters['lot'])
+        unlogged = unlogged_data.get('data') if unlogged_data.get('status') == 'success' else []
+
+    return render_template(
+        'maintenance_report.html',
+        maintenance_logs=report_data.get('data') or [],
+        unlogged_spaces=unlogged,
+        next_cursor=report_data.get('next_cursor'),
+        paged=bool(args['after']),
+        summary=summary_data.get('data') if summary_data.get('status') == 'success' else None,
+        lots=lots_data.get('data') if lots_data.get('status') == 'success' else [],
+        space_statuses=SPACE_STATUSES,
+        filters=filters,
+    )# Add this in the 'Reports' section of db_connector.py
 
 
 @bp.route('/add_maintenance_log', methods=['POST'])
@@ -240,68 +405,142 @@ def complete_maintenance_route():
 # Manager Reports & Exports
 # ---------------------------------------------------------------------
 
+def _page_args(prefix=''):
+    """Read keyset pagination options (after, limit, sort, order) from the query string."""
+    try:
+        limit = int(request.args.get(f'{prefix}limit', db_connector.REPORT_PAGE_SIZE))
+    except ValueError:
+        limit = db_connector.REPORT_PAGE_SIZE
+    return {
+        'after': request.args.get(f'{prefix}after') or None,
+        'limit': limit,
+        'descending': request.args.get(f'{prefix}order') == 'desc',
+    }
+
 @bp.route('/reports')
 @login_required
 @admin_required  # <-- Use the new decorator
 def reports():
-    """Display the main reports page for managers."""
-    cust_data = db_connector.get_all_customers_report()
-    veh_data = db_connector.get_all_vehicles_report()
+    """Display the first page of customers and vehicles; later pages load via the JSON APIs."""
+    cust_sort = request.args.get('cust_sort', 'name')
+    veh_sort = request.args.get('veh_sort', 'owner')
+    cust_data = db_connector.get_customers_page(sort=cust_sort, **_page_args('cust_'))
+    veh_data = db_connector.get_vehicles_page(sort=veh_sort, **_page_args('veh_'))
     
     customers = cust_data.get('data') if cust_data.get('status') == 'success' else []
     vehicles = veh_data.get('data') if veh_data.get('status') == 'success' else []
 
-    return render_template('reports.html', customers=customers, vehicles=vehicles)
+    return render_template(
+        'reports.html',
+        customers=customers,
+        vehicles=vehicles,
+        customers_next=cust_data.get('next_cursor'),
+        vehicles_next=veh_data.get('next_cursor'),
+        cust_sort=cust_sort,
+        cust_order=request.args.get('cust_order', 'asc'),
+        veh_sort=veh_sort,
+        veh_order=request.args.get('veh_order', 'asc'),
+    )
+
+@bp.route('/api/reports/customers', methods=['GET'])
+@login_required
+@admin_required
+def customers_page_api():
+    """Provide a keyset-paginated page of customers as JSON."""
+    result = db_connector.get_customers_page(sort=request.args.get('sort', 'name'), **_page_args())
+    if result.get('status') == 'success':
+        return jsonify({'data': result['data'], 'next_cursor': result['next_cursor']})
+    return jsonify({'error': result.get('message')}), 400
+
+@bp.route('/api/reports/vehicles', methods=['GET'])
+@login_required
+@admin_required
+def vehicles_page_api():
+    """Provide a keyset-paginated page of vehicles as JSON."""
+    result = db_connector.get_vehicles_page(sort=request.args.get('sort', 'owner'), **_page_args())
+    if result.get('status') == 'success':
+        return jsonify({'data': result['data'], 'next_cursor': result['next_cursor']})
+    return jsonify({'error': result.get('message')}), 400
+
+@bp.route('/api/reports/revenue', methods=['GET'])
+@login_required
+@admin_required
+def revenue_report_api():
+    """Provide revenue by method and by day for an optional date range and lot."""
+    try:
+        start_date = request.args.get('start') and datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+        end_date = request.args.get('end') and datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Dates must be formatted YYYY-MM-DD.'}), 400
+    lot_id = request.args.get('lot_id', type=int)
+
+    summary = db_connector.get_financial_report(start_date, end_date, lot_id)
+    daily = db_connector.get_daily_revenue(start_date, end_date, lot_id)
+    if summary.get('status') != 'success' or daily.get('status') != 'success':
+        return jsonify({'error': summary.get('message') or daily.get('message')}), 500
+    for row in daily['data']:
+        row['Day'] = row['Day'].isoformat()
+    return jsonify({'by_method': summary['data'], 'by_day': daily['data']})
+
+# Rows fetched from MySQL per CSV chunk
+EXPORT_CHUNK_SIZE = 1000
+
+def _csv_export_response(result, filename):
+    """Stream a chunked query result as a CSV download (gzipped with ?gzip=1)."""
+    use_gzip = request.args.get('gzip') == '1'
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        compressor = zlib.compressobj(wbits=31) if use_gzip else None  # wbits=31 -> gzip container
+
+        def drain():
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+            return compressor.compress(data) if compressor else data
+
+        writer.writerow(result['columns'])
+        yield drain()
+        for rows in result['chunks']:
+            writer.writerows(rows)
+            chunk = drain()
+            if chunk:
+                yield chunk
+        if compressor:
+            yield compressor.flush()
+
+    if use_gzip:
+        response = Response(stream_with_context(generate()), mimetype='application/gzip')
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}.gz'
+    else:
+        response = Response(stream_with_context(generate()), mimetype='text/csv')
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
 @bp.route('/export/customers_csv')
 @login_required
 @admin_required
 def export_customers_csv():
     """Export the customer list as a CSV file."""
-    cust_data = db_connector.get_all_customers_report()
+    cust_data = db_connector.stream_customers_report(EXPORT_CHUNK_SIZE)
     if cust_data.get('status') != 'success':
         flash('Could not retrieve data for export.', 'danger')
         return redirect(url_for('bp.reports'))
 
-    data = cust_data.get('data')
-    si = io.StringIO()
-    cw = csv.writer(si)
-    
-    # Write Header
-    if data:
-        cw.writerow(data[0].keys())
-        # Write Data
-        for row in data:
-            cw.writerow(row.values())
-    
-    response = make_response(si.getvalue())
-    response.headers['Content-Disposition'] = 'attachment; filename=customers.csv'
-    response.headers['Content-Type'] = 'text/csv'
-    return response
+    return _csv_export_response(cust_data, 'customers.csv')
 
 @bp.route('/export/vehicles_csv')
 @login_required
 @admin_required
 def export_vehicles_csv():
     """Export the vehicle list as a CSV file."""
-    veh_data = db_connector.get_all_vehicles_report()
+    veh_data = db_connector.stream_vehicles_report(EXPORT_CHUNK_SIZE)
     if veh_data.get('status') != 'success':
         flash('Could not retrieve data for export.', 'danger')
         return redirect(url_for('bp.reports'))
 
-    data = veh_data.get('data')
-    si = io.StringIO()
-    cw = csv.writer(si)
-    
-    if data:
-        cw.writerow(data[0].keys())
-        for row in data:
-            cw.writerow(row.values())
-    
-    response = make_response(si.getvalue())
-    response.headers['Content-Disposition'] = 'attachment; filename=vehicles.csv'
-    response.headers['Content-Type'] = 'text/csv'
-    return response
+    return _csv_export_response(veh_data, 'vehicles.csv')
 
 # --- Add this new section to app/routes.py (near the other reports) ---
 
@@ -391,13 +630,26 @@ def assign_service_route():
 # Customer History API
 # ---------------------------------------------------------------------
 
+def _history_args():
+    """Read history paging (after, limit) and date filters (start, end: YYYY-MM-DD)."""
+    args = _page_args()
+    del args['descending']  # history is always newest first
+    args['limit'] = args['limit'] if request.args.get('limit') else db_connector.HISTORY_PAGE_SIZE
+    args['start_date'] = request.args.get('start') and datetime.strptime(request.args['start'], '%Y-%m-%d').date()
+    args['end_date'] = request.args.get('end') and datetime.strptime(request.args['end'], '%Y-%m-%d').date()
+    return args
+
 @bp.route('/api/customer_history/<int:customer_id>', methods=['GET'])
 @login_required
 def get_customer_history_api(customer_id):
-    """Provide customer history as JSON API."""
-    report_data = db_connector.get_customer_history(customer_id)
+    """Provide one page of customer history as JSON ({data, next_cursor})."""
+    try:
+        args = _history_args()
+    except ValueError:
+        return jsonify({'error': 'Dates must be formatted YYYY-MM-DD.'}), 400
+    report_data = db_connector.get_customer_history(customer_id, **args)
     if report_data.get('status') == 'success':
-        return jsonify(report_data.get('data'))
+        return jsonify({'data': report_data['data'], 'next_cursor': report_data['next_cursor']})
     return jsonify({'error': report_data.get('message')}), 400
 
 
@@ -534,7 +786,9 @@ def parking_lots():
     """Display the parking lot management page."""
     lots_data = db_connector.get_all_parking_lots()
     lots = lots_data.get('data') if lots_data.get('status') == 'success' else []
-    return render_template('parking_lots.html', parking_lots=lots)
+    tariffs_data = db_connector.get_all_tariffs()
+    tariffs = tariffs_data.get('data') if tariffs_data.get('status') == 'success' else []
+    return render_template('parking_lots.html', parking_lots=lots, tariffs=tariffs, space_types=SPACE_TYPES)
 
 @bp.route('/api/lot/<int:lot_id>', methods=['GET'])
 @login_required
@@ -597,4 +851,46 @@ def delete_lot_route():
         
     result = db_connector.delete_parking_lot(lot_id)
     flash(result.get('message'), result.get('status'))
-    return redirect(url_for('bp.parking_lots'))
\ No newline at end of file
+    return redirect(url_for('bp.parking_lots'))
+
+# ---------------------------------------------------------------------
+# Tariff Management
+# ---------------------------------------------------------------------
+
+@bp.route('/add_tariff', methods=['POST'])
+@login_required
+@admin_required
+def add_tariff_route():
+    """Handle the add tariff band form; blank lot or space type means 'any'."""
+    try:
+        lot_id = request.form.get('lot_id', type=int)
+        start_hour = int(request.form.get('start_hour'))
+        end_hour = int(request.form.get('end_hour'))
+        rate_per_hour = float(request.form.get('rate_per_hour'))
+        grace_minutes = int(request.form.get('grace_minutes') or 0)
+        daily_cap = float(request.form['daily_cap']) if request.form.get('daily_cap') else None
+    except (ValueError, TypeError):
+        flash('Tariff hours, rate, grace and cap must be valid numbers.', 'error')
+        return redirect(url_for('bp.parking_lots'))
+
+    space_type = request.form.get('space_type')
+    if space_type not in SPACE_TYPES:
+        space_type = None
+
+    result = db_connector.add_tariff(lot_id, space_type, start_hour, end_hour, rate_per_hour, grace_minutes, daily_cap)
+    flash(result.get('message'), result.get('status'))
+    return redirect(url_for('bp.parking_lots'))
+
+@bp.route('/delete_tariff', methods=['POST'])
+@login_required
+@admin_required
+def delete_tariff_route():
+    """Handle the delete tariff band action."""
+    tariff_id = request.form.get('tariff_id', type=int)
+    if tariff_id is None:
+        flash('Invalid Tariff ID.', 'error')
+        return redirect(url_for('bp.parking_lots'))
+
+    result = db_connector.delete_tariff(tariff_id)
+    flash(result.get('message'), result.get('status'))
+    return redirect(url_for('bp.parking_lots'))
@@ -0,0 +1,253 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Rough per-session bookkeeping cost (dict entry, list, key) added to the payload size
+_ENTRY_OVERHEAD = 200
+
+
+class SessionStore:
+    """Server-side session data kept in process memory or in a local SQLite file.
+
+    Sessions idle for longer than ``idle_timeout`` seconds are dropped. In
+    memory, sessions are held in LRU order and the least recently used are
+    evicted once their JSON size passes ``memory_budget`` bytes. With a
+    ``sqlite_path`` the file is the only copy (nothing is cached in memory),
+    so every worker process on the host sees the same sessions and a
+    logout in one process is seen by all of them.
+    """
+
+    def __init__(self, idle_timeout=1800, memory_budget=8 * 1024 * 1024, sqlite_path=None):
+        self.idle_timeout = idle_timeout
+        self.memory_budget = memory_budget
+        self._sessions = OrderedDict()  # sid -> [data, size, last_access]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'loads': 0, 'saves': 0, 'evictions': 0, 'expirations': 0}
+        self._db = None
+        if sqlite_path:
+            os.makedirs(os.path.dirname(os.path.abspath(sqlite_path)), exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+            )
+
+    def get(self, sid):
+        """Return a copy of the session's data, or None if unknown or idle too long."""
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                return self._load(sid, now)
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if now - entry[2] > self.idle_timeout:
+                self._drop(sid)
+                self._stats['expirations'] += 1
+                return None
+            entry[2] = now
+            self._sessions.move_to_end(sid)
+            return dict(entry[0])
+
+    def set(self, sid, data):
+        """Store the session's data, evicting least recently used sessions past the memory budget."""
+        payload = json.dumps(data, separators=(',', ':'))
+        now = time.time()
+        with self._lock:
+            self._stats['saves'] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (sid, data, last_access) VALUES (?, ?, ?)",
+                    (sid, payload, now),
+                )
+            else:
+                self._put(sid, dict(data), len(payload), now)
+
+    def delete(self, sid):
+        with self._lock:
+            self._drop(sid)
+
+    def sweep(self):
+        """Drop every session idle for longer than the timeout; returns how many went."""
+        cutoff = time.time() - self.idle_timeout
+        expired = 0
+        with self._lock:
+            if self._db is not None:
+                expired = self._db.execute("DELETE FROM sessions WHERE last_access < ?", (cutoff,)).rowcount
+            # LRU order means the idle sessions sit at the front
+            while self._sessions:
+                sid, entry = next(iter(self._sessions.items()))
+                if entry[2] > cutoff:
+                    break
+                self._drop(sid)
+                expired += 1
+            self._stats['expirations'] += expired
+        return expired
+
+    def stats(self):
+        """Return session counts, memory use against the budget and eviction counters."""
+        with self._lock:
+            if self._db is not None:
+                sessions = self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            else:
+                sessions = len(self._sessions)
+            return dict(self._stats, sessions=sessions, bytes=self._bytes,
+                        memory_budget=self.memory_budget, idle_timeout=self.idle_timeout,
+                        persistent=self._db is not None)
+
+    def _load(self, sid, now):
+        row = self._db.execute("SELECT data, last_access FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > self.idle_timeout:
+            self._db.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+            self._stats['expirations'] += 1
+            return None
+        # Keep the idle clock roughly current without a write per request
+        if now - row[1] > self.idle_timeout / 4:
+            self._db.execute("UPDATE sessions SET last_access = ? WHERE sid = ?", (now, sid))
+        self._stats['loads'] += 1
+        return json.loads(row[0])
+
+    def _put(self, sid, data, payload_size, last_access):
+        if sid in self._sessions:
+            self._bytes -= self._sessions.pop(sid)[1]
+        size = payload_size + _ENTRY_OVERHEAD
+        self._sessions[sid] = [data, size, last_access]
+        self._bytes += size
+        evicted = 0
+        while self._bytes > self.memory_budget and len(self._sessions) > 1:
+            _, entry = self._sessions.popitem(last=False)
+            self._bytes -= entry[1]
+            evicted += 1
+        if evicted:
+            self._stats['evictions'] += evicted
+            print(f"Session store over its {self.memory_budget}-byte budget: evicted {evicted} least recently "
+                  f"used session(s), {len(self._sessions)} left ({self._bytes} bytes)")
+
+    def _drop(self, sid):
+        entry = self._sessions.pop(sid, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict whose data lives in a SessionStore; the cookie only carries ``sid``."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.previous_sid = None
+        self.modified = False
+        self.accessed = False
+
+    def regenerate(self):
+        """Move the data to a fresh sid (call on login so a planted cookie is useless)."""
+        if self.previous_sid is None and not self.new:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface that keeps session data server-side in a SessionStore.
+
+    Checking ``employee_id``/``role`` in login_required and admin_required
+    is a dict lookup on the request's session, with no cookie decoding of
+    the data and no database round trip.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                if not session.new:
+                    response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            return
+        self.store.set(session.sid, dict(session))
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def init_app(app):
+    """Install the server-side session interface unless SESSION_TYPE is 'cookie'."""
+    session_type = app.config['SESSION_TYPE']
+    if session_type == 'cookie':
+        return
+    if session_type not in ('memory', 'sqlite'):
+        raise ValueError(f"Unknown SESSION_TYPE '{session_type}' (expected memory, sqlite or cookie).")
+    store = SessionStore(
+        idle_timeout=app.config['SESSION_IDLE_TIMEOUT'],
+        memory_budget=app.config['SESSION_MEMORY_BUDGET'],
+        sqlite_path=app.config['SESSION_SQLITE_PATH'] if session_type == 'sqlite' else None,
+    )
+    app.session_interface = ServerSessionInterface(store)
+    app.extensions['session_store'] = store
+
+
+def regenerate_session(session):
+    """Issue a new session id for the current session (no-op for cookie sessions)."""
+    if isinstance(session, ServerSession):
+        session.regenerate()
+
+
+def sweep_sessions():
+    """Expire idle sessions (run by the session-sweeper background worker)."""
+    store = current_app.extensions.get('session_store')
+    if store is None:
+        return {'status': 'success', 'expired': 0}
+    return {'status': 'success', 'expired': store.sweep()}
+
+
+def get_session_stats():
+    """Report session counts and memory use, or None with cookie sessions."""
+    store = current_app.extensions.get('session_store')
+    return store.stats() if store is not None else None
@@ -0,0 +1,269 @@
+import heapq
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+
+STATUSES = ('Vacant', 'Occupied', 'Reserved', 'Maintenance')
+_STATUS_CODE = {status: code for code, status in enumerate(STATUSES)}
+
+
+def _iter_bits(bitmap):
+    """Yield the positions of set bits, lowest first."""
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+class _SpaceGroup:
+    """All spaces of one (Lot_ID, SpaceType), ordered by SpaceNumber.
+
+    Statuses live in a byte array, and each status also has a bitmap over
+    the group's positions so vacant spaces can be listed without touching
+    occupied ones.
+    """
+
+    __slots__ = ('space_ids', 'space_numbers', 'statuses', 'bitmaps', 'counts')
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: (r['SpaceNumber'], r['SpaceID']))
+        self.space_ids = array('i', (r['SpaceID'] for r in rows))
+        self.space_numbers = array('i', (r['SpaceNumber'] for r in rows))
+        self.statuses = array('b', (_STATUS_CODE[r['Status']] for r in rows))
+        self.bitmaps = [0] * len(STATUSES)
+        self.counts = [0] * len(STATUSES)
+        for position, code in enumerate(self.statuses):
+            self.bitmaps[code] |= 1 << position
+            self.counts[code] += 1
+
+    def set_status(self, position, code):
+        old = self.statuses[position]
+        if old == code:
+            return old
+        bit = 1 << position
+        self.bitmaps[old] &= ~bit
+        self.bitmaps[code] |= bit
+        self.counts[old] -= 1
+        self.counts[code] += 1
+        self.statuses[position] = code
+        return old
+
+    def spaces_with(self, code):
+        for position in _iter_bits(self.bitmaps[code]):
+            yield self.space_numbers[position], self.space_ids[position]
+
+
+class SpaceStatusIndex:
+    """In-process index of every parking space's status.
+
+    Built from one scan of Parking_Space and then kept current by the
+    db_connector write paths, so occupancy counts are O(1) and vacant lists
+    are O(vacant) without a query. The index treats itself as stale after
+    ``max_age`` seconds (to pick up changes made by other processes) or when
+    a caller reports drift, and db_connector rebuilds it on the next read.
+
+    Every status change bumps a monotonically increasing ``version`` and is
+    kept in a bounded change log, so clients can ask for only the spaces that
+    changed since the version they last saw. ``epoch`` identifies this
+    process's index; a client holding another epoch gets a full snapshot.
+    """
+
+    def __init__(self, max_age=30.0, change_log_size=4096):
+        self.max_age = max_age
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = 0
+        self._changes = deque(maxlen=change_log_size)  # (version, SpaceID)
+        self._log_floor = 0  # oldest version the change log can answer from
+        self._lock = threading.RLock()
+        self._groups = {}       # (Lot_ID, SpaceType) -> _SpaceGroup
+        self._positions = {}    # SpaceID -> (group key, position)
+        self._order = []        # SpaceIDs ordered by SpaceNumber
+        self._totals = [0] * len(STATUSES)
+        self._loaded_at = None
+
+    # -----------------------------------------------------------------
+    # Loading
+    # -----------------------------------------------------------------
+
+    def load(self, rows):
+        """Rebuild from Parking_Space rows (SpaceID, Lot_ID, SpaceNumber, SpaceType, Status)."""
+        by_group = {}
+        for row in rows:
+            by_group.setdefault((row['Lot_ID'], row['SpaceType']), []).append(row)
+
+        groups = {key: _SpaceGroup(group_rows) for key, group_rows in by_group.items()}
+        positions = {}
+        totals = [0] * len(STATUSES)
+        for key, group in groups.items():
+            for position, space_id in enumerate(group.space_ids):
+                positions[space_id] = (key, position)
+            for code, count in enumerate(group.counts):
+                totals[code] += count
+        order = [row['SpaceID'] for row in sorted(rows, key=lambda r: (r['SpaceNumber'], r['SpaceID']))]
+
+        with self._lock:
+            if positions.keys() == self._positions.keys():
+                # Same set of spaces: log only the statuses the reload changed
+                for row in rows:
+                    if self.status_of(row['SpaceID']) != row['Status']:
+                        self._log_change(row['SpaceID'])
+            else:
+                self.version += 1
+                self._changes.clear()
+                self._log_floor = self.version
+            self._groups = groups
+            self._positions = positions
+            self._order = order
+            self._totals = totals
+            self._loaded_at = time.monotonic()
+
+    def needs_rebuild(self):
+        """True before the first load, after drift, or once ``max_age`` has passed."""
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.max_age
+
+    def mark_stale(self):
+        """Force a rebuild on the next read (e.g. after detecting drift)."""
+        self._loaded_at = None
+
+    # -----------------------------------------------------------------
+    # Updates
+    # -----------------------------------------------------------------
+
+    def set_status(self, space_id, status):
+        """Record a status change; unknown spaces mark the index stale."""
+        with self._lock:
+            location = self._positions.get(int(space_id))
+            if location is None or status not in _STATUS_CODE:
+                self.mark_stale()
+                return False
+            key, position = location
+            code = _STATUS_CODE[status]
+            old = self._groups[key].set_status(position, code)
+            if old != code:
+                self._totals[old] -= 1
+                self._totals[code] += 1
+                self._log_change(int(space_id))
+            return True
+
+    def status_of(self, space_id):
+        """Return the indexed status of a space, or None if it is unknown."""
+        with self._lock:
+            location = self._positions.get(int(space_id))
+            if location is None:
+                return None
+            key, position = location
+            return STATUSES[self._groups[key].statuses[position]]
+
+    # -----------------------------------------------------------------
+    # Queries
+    # -----------------------------------------------------------------
+
+    def counts(self, lot_id=None, space_type=None):
+        """Return status counts, optionally restricted to a lot and/or space type."""
+        with self._lock:
+            if lot_id is None and space_type is None:
+                totals = list(self._totals)
+            else:
+                totals = [0] * len(STATUSES)
+                for group in self._matching_groups(lot_id, space_type):
+                    for code, count in enumerate(group.counts):
+                        totals[code] += count
+        return {
+            'TotalSpaces': sum(totals),
+            'OccupiedCount': totals[_STATUS_CODE['Occupied']],
+            'ReservedCount': totals[_STATUS_CODE['Reserved']],
+            'VacantCount': totals[_STATUS_CODE['Vacant']],
+            'MaintenanceCount': totals[_STATUS_CODE['Maintenance']],
+        }
+
+    def group_counts(self):
+        """Return ``{(Lot_ID, SpaceType): {status: count}}`` for every group."""
+        with self._lock:
+            return {key: dict(zip(STATUSES, group.counts)) for key, group in self._groups.items()}
+
+    def vacant_spaces(self, lot_id=None, space_type=None):
+        """Return vacant spaces ordered by SpaceNumber, optionally filtered."""
+        code = _STATUS_CODE['Vacant']
+        with self._lock:
+            per_group = [list(group.spaces_with(code))
+                         for group in self._matching_groups(lot_id, space_type)]
+        return [{'SpaceID': space_id, 'SpaceNumber': number}
+                for number, space_id in heapq.merge(*per_group)]
+
+    def take_vacant(self, lot_id=None, space_type=None, exclude=()):
+        """Pick the lowest-numbered vacant space and mark it Occupied in the index.
+
+        Each group's vacant bitmap acts as its free list: the lowest set bit
+        is the vacant space nearest the gate, found without scanning. Marking
+        it Occupied at once stops concurrent requests in this process from
+        picking the same space while the caller claims it in MySQL. Returns
+        None when nothing matches.
+        """
+        code = _STATUS_CODE['Vacant']
+        with self._lock:
+            best = None
+            for group in self._matching_groups(lot_id, space_type):
+                for number, space_id in group.spaces_with(code):
+                    if space_id not in exclude:
+                        if best is None or (number, space_id) < best:
+                            best = (number, space_id)
+                        break
+            if best is None:
+                return None
+            self.set_status(best[1], 'Occupied')
+            return best[1]
+
+    def all_spaces(self):
+        """Return every space ordered by SpaceNumber."""
+        with self._lock:
+            return [self._describe(space_id) for space_id in self._order]
+
+    def changes_since(self, epoch=None, since=None):
+        """Return the spaces changed after version ``since`` of ``epoch``.
+
+        Falls back to a full snapshot (``full=True``) when the client has no
+        version, a different epoch, or a version older than the change log.
+        """
+        with self._lock:
+            full = (epoch != self.epoch or since is None
+                    or since < self._log_floor or since > self.version)
+            if full:
+                spaces = self.all_spaces()
+            else:
+                changed = {space_id for version, space_id in self._changes if version > since}
+                spaces = [self._describe(space_id) for space_id in sorted(changed)]
+            return {
+                'epoch': self.epoch,
+                'version': self.version,
+                'full': bool(full),
+                'spaces': spaces,
+                'counts': self.counts(),
+            }
+
+    def _log_change(self, space_id):
+        if len(self._changes) == self._changes.maxlen:
+            # The oldest entry is about to drop; older clients need a snapshot
+            self._log_floor = self._changes[0][0]
+        self.version += 1
+        self._changes.append((self.version, space_id))
+
+    def _describe(self, space_id):
+        key, position = self._positions[space_id]
+        group = self._groups[key]
+        return {
+            'SpaceID': space_id,
+            'SpaceNumber': group.space_numbers[position],
+            'SpaceType': key[1],
+            'Status': STATUSES[group.statuses[position]],
+        }
+
+    def _matching_groups(self, lot_id, space_type):
+        for (group_lot, group_type), group in self._groups.items():
+            if lot_id is not None and group_lot != lot_id:
+                continue
+            if space_type is not None and group_type != space_type:
+                continue
+            yield group
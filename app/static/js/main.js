@@ -1,9 +1,16 @@
 // Main JavaScript file for Parking Management System
 
 // AJAX functions for API calls
-async function fetchCustomerHistory(customerId) {
+
+// Fetch one page of customer history: { data, next_cursor }
+async function fetchCustomerHistory(customerId, { after, start, end } = {}) {
+    const params = new URLSearchParams();
+    if (after) params.set('after', after);
+    if (start) params.set('start', start);
+    if (end) params.set('end', end);
+
     try {
-        const response = await fetch(`/api/customer_history/${customerId}`);
+        const response = await fetch(`/api/customer_history/${customerId}?${params}`);
         if (!response.ok) {
             throw new Error('Failed to fetch customer history');
         }
@@ -33,6 +40,36 @@ function formatDuration(minutes) {
 // Customer History Modal Functions
 let currentCustomerId = null;
 
+function renderCustomerHistoryRow(record) {
+    return `
+        <tr class="hover:bg-gray-50">
+            <td class="px-4 py-3 text-sm text-gray-900">${escapeHtml(record.CustomerName)}</td>
+            <td class="px-4 py-3 text-sm text-gray-600 font-mono">${escapeHtml(record.LicensePlate)}</td>
+            <td class="px-4 py-3 text-sm text-gray-500">${formatDateTime(record.EntryTime)}</td>
+            <td class="px-4 py-3 text-sm text-gray-500">
+                ${record.ExitTime ? formatDateTime(record.ExitTime) : '<span class="text-green-600 font-semibold">Active</span>'}
+            </td>
+            <td class="px-4 py-3 text-sm text-gray-600">${formatDuration(record.DurationMinutes)}</td>
+            <td class="px-4 py-3 text-sm font-medium text-gray-900">${formatCurrency(record.FeePaid)}</td>
+            <td class="px-4 py-3 text-sm text-gray-600">
+                <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium 
+                    ${record.Method === 'Cash' ? 'bg-green-100 text-green-800' : 
+                      record.Method === 'Card' ? 'bg-blue-100 text-blue-800' : 
+                      'bg-purple-100 text-purple-800'}">
+                    ${escapeHtml(record.Method || '-')}
+                </span>
+            </td>
+        </tr>
+    `;
+}
+
+function customerHistoryFilters() {
+    return {
+        start: document.getElementById('customerHistoryStart')?.value || '',
+        end: document.getElementById('customerHistoryEnd')?.value || ''
+    };
+}
+
 function showCustomerHistory(customerId) {
     currentCustomerId = customerId;
     const modal = document.getElementById('customerHistoryModal');
@@ -42,7 +79,24 @@ function showCustomerHistory(customerId) {
         console.error('Customer history modal elements not found');
         return;
     }
-    
+
+    ['customerHistoryStart', 'customerHistoryEnd'].forEach(id => {
+        const input = document.getElementById(id);
+        if (input) {
+            input.value = '';
+        }
+    });
+    modal.classList.remove('hidden');
+    loadCustomerHistory();
+}
+
+// (Re)load the first page of history for the current customer and date filters
+function loadCustomerHistory() {
+    const content = document.getElementById('customerHistoryContent');
+    if (!content || !currentCustomerId) {
+        return;
+    }
+
     // Show loading state
     content.innerHTML = `
         <div class="text-center py-8">
@@ -51,12 +105,10 @@ function showCustomerHistory(customerId) {
         </div>
     `;
     
-    modal.classList.remove('hidden');
-    
     // Fetch customer history
-    fetchCustomerHistory(customerId)
-        .then(data => {
-            if (data.length > 0) {
+    fetchCustomerHistory(currentCustomerId, customerHistoryFilters())
+        .then(page => {
+            if (page.data.length > 0) {
                 content.innerHTML = `
                     <div class="overflow-x-auto">
                         <table class="min-w-full divide-y divide-gray-200">
@@ -71,30 +123,19 @@ function showCustomerHistory(customerId) {
                                     <th class="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Method</th>
                                 </tr>
                             </thead>
-                            <tbody class="bg-white divide-y divide-gray-200">
-                                ${data.map(record => `
-                                    <tr class="hover:bg-gray-50">
-                                        <td class="px-4 py-3 text-sm text-gray-900">${escapeHtml(record.CustomerName)}</td>
-                                        <td class="px-4 py-3 text-sm text-gray-600 font-mono">${escapeHtml(record.LicensePlate)}</td>
-                                        <td class="px-4 py-3 text-sm text-gray-500">${formatDateTime(record.EntryTime)}</td>
-                                        <td class="px-4 py-3 text-sm text-gray-500">
-                                            ${record.ExitTime ? formatDateTime(record.ExitTime) : '<span class="text-green-600 font-semibold">Active</span>'}
-                                        </td>
-                                        <td class="px-4 py-3 text-sm text-gray-600">${formatDuration(record.DurationMinutes)}</td>
-                                        <td class="px-4 py-3 text-sm font-medium text-gray-900">${formatCurrency(record.FeePaid)}</td>
-                                        <td class="px-4 py-3 text-sm text-gray-600">
-                                            <span class="inline-flex items-center px-2.5 py-0.5 rounded-full text-xs font-medium 
-                                                ${record.Method === 'Cash' ? 'bg-green-100 text-green-800' : 
-                                                  record.Method === 'Card' ? 'bg-blue-100 text-blue-800' : 
-                                                  'bg-purple-100 text-purple-800'}">
-                                                ${escapeHtml(record.Method)}
-                                            </span>
-                                        </td>
-                                    </tr>
-                                `).join('')}
+                            <tbody id="customerHistoryRows" class="bg-white divide-y divide-gray-200">
+                                ${page.data.map(renderCustomerHistoryRow).join('')}
                             </tbody>
                         </table>
                     </div>
+                    <div class="text-center mt-4 ${page.next_cursor ? '' : 'hidden'}">
+                        <button type="button" id="customerHistoryLoadMore"
+                                data-next-cursor="${escapeHtml(page.next_cursor || '')}"
+                                onclick="loadMoreCustomerHistory(this)"
+                                class="px-4 py-2 text-sm font-medium text-blue-600 border border-blue-300 rounded-md hover:bg-blue-50">
+                            <i class="fas fa-chevron-down mr-1"></i>Load more
+                        </button>
+                    </div>
                 `;
             } else {
                 content.innerHTML = `
@@ -116,6 +157,29 @@ function showCustomerHistory(customerId) {
         });
 }
 
+// Append the next page of history rows below the ones already shown
+async function loadMoreCustomerHistory(button) {
+    const cursor = button.dataset.nextCursor;
+    if (!cursor || !currentCustomerId) {
+        return;
+    }
+    button.disabled = true;
+
+    try {
+        const page = await fetchCustomerHistory(currentCustomerId, { after: cursor, ...customerHistoryFilters() });
+        document.getElementById('customerHistoryRows')
+            .insertAdjacentHTML('beforeend', page.data.map(renderCustomerHistoryRow).join(''));
+        button.dataset.nextCursor = page.next_cursor || '';
+        if (!page.next_cursor) {
+            button.parentElement.classList.add('hidden');
+        }
+    } catch (error) {
+        alert('Could not load more history. ' + error.message);
+    } finally {
+        button.disabled = false;
+    }
+}
+
 function closeCustomerHistory() {
     const modal = document.getElementById('customerHistoryModal');
     if (modal) {
@@ -181,6 +245,8 @@ document.addEventListener('DOMContentLoaded', function() {
 window.parkingManagement = {
     fetchCustomerHistory,
     showCustomerHistory,
+    loadCustomerHistory,
+    loadMoreCustomerHistory,
     closeCustomerHistory,
     formatCurrency,
     formatDuration,
@@ -338,4 +404,212 @@ document.addEventListener('keydown', function(event) {
     if (event.key === 'Escape') {
         closeEditLotModal();
     }
-});
\ No newline at end of file
+});
+
+// ----------------------------------------------------
+// Reports Pagination (keyset "Load more")
+// ----------------------------------------------------
+
+// Fetch the next page for a "Load more" button and hand the rows to renderRow
+async function loadNextReportPage(button, tbody, renderRow) {
+    const cursor = button.dataset.nextCursor;
+    if (!cursor) {
+        return;
+    }
+
+    const params = new URLSearchParams({
+        after: cursor,
+        sort: button.dataset.sort,
+        order: button.dataset.order
+    });
+    button.disabled = true;
+
+    try {
+        const response = await fetch(`${button.dataset.endpoint}?${params}`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch the next page');
+        }
+        const page = await response.json();
+
+        tbody.insertAdjacentHTML('beforeend', page.data.map(renderRow).join(''));
+        button.dataset.nextCursor = page.next_cursor || '';
+        if (!page.next_cursor) {
+            button.parentElement.classList.add('hidden');
+        }
+    } catch (error) {
+        console.error('Error loading report page:', error);
+        alert('Could not load more rows. ' + error.message);
+    } finally {
+        button.disabled = false;
+    }
+}
+
+function loadMoreCustomers() {
+    const tbody = document.getElementById('customerRows');
+    const deleteUrl = tbody.dataset.deleteUrl;
+
+    loadNextReportPage(document.getElementById('customersLoadMore'), tbody, customer => `
+        <tr class="hover:bg-gray-50">
+            <td class="px-4 py-3 text-sm font-medium text-gray-900">${escapeHtml(customer.CustomerID)}</td>
+            <td class="px-4 py-3 text-sm text-gray-700">${escapeHtml(customer.Name)}</td>
+            <td class="px-4 py-3 text-sm text-gray-700">${escapeHtml(customer.Phone || 'N/A')}</td>
+            <td class="px-4 py-3 text-sm text-gray-700">${escapeHtml(customer.Email || 'N/A')}</td>
+            <td class="px-4 py-3 text-sm space-x-2">
+                <button type="button"
+                        onclick="openEditCustomerModal(${Number(customer.CustomerID)})"
+                        class="px-3 py-1 text-xs font-medium text-white bg-blue-500 rounded hover:bg-blue-600">
+                    <i class="fas fa-edit mr-1"></i>Edit
+                </button>
+                <form action="${deleteUrl}" method="POST" class="inline">
+                    <input type="hidden" name="customer_id" value="${escapeHtml(customer.CustomerID)}">
+                    <button type="submit"
+                            onclick="return confirm('Are you sure you want to delete this customer? This is permanent.')"
+                            class="px-3 py-1 text-xs font-medium text-white bg-red-500 rounded hover:bg-red-600">
+                        <i class="fas fa-trash mr-1"></i>Delete
+                    </button>
+                </form>
+            </td>
+        </tr>
+    `);
+}
+
+function loadMoreVehicles() {
+    loadNextReportPage(document.getElementById('vehiclesLoadMore'), document.getElementById('vehicleRows'), vehicle => `
+        <tr class="hover:bg-gray-50">
+            <td class="px-4 py-3 text-sm font-medium text-gray-900 font-mono">${escapeHtml(vehicle.LicensePlate)}</td>
+            <td class="px-4 py-3 text-sm text-gray-700">
+                ${escapeHtml(vehicle.Make || 'N/A')} ${escapeHtml(vehicle.Model || '')}
+            </td>
+            <td class="px-4 py-3 text-sm text-gray-700">
+                ${escapeHtml(vehicle.CustomerName)} (ID: ${escapeHtml(vehicle.CustomerID)})
+            </td>
+        </tr>
+    `);
+}
+
+
+// ----------------------------------------------------
+// Dashboard Space Status (incremental refresh)
+// ----------------------------------------------------
+const SPACE_STATUS_POLL_MS = 10000;
+
+const SPACE_STATUS_STYLES = {
+    Vacant: { badge: 'bg-green-100 text-green-800', icon: 'check-circle' },
+    Occupied: { badge: 'bg-red-100 text-red-800', icon: 'car' },
+    Reserved: { badge: 'bg-yellow-100 text-yellow-800', icon: 'clock' },
+    Maintenance: { badge: 'bg-gray-100 text-gray-800', icon: 'tools' }
+};
+
+function renderSpaceStatusCell(status) {
+    const style = SPACE_STATUS_STYLES[status] || { badge: '', icon: 'question' };
+    return `
+        <span class="inline-flex items-center px-3 py-1 rounded-full text-xs font-medium ${style.badge}">
+            <i class="fas fa-${style.icon} mr-2"></i>
+            ${escapeHtml(status)}
+        </span>
+    `;
+}
+
+function renderSpaceActionCell(space, operationsUrl) {
+    if (space.Status === 'Vacant') {
+        return `
+            <a href="${operationsUrl}?space_id=${encodeURIComponent(space.SpaceID)}" class="px-3 py-1 text-xs font-medium text-white bg-blue-500 rounded hover:bg-blue-600">
+                <i class="fas fa-arrow-right mr-1"></i>Use Space
+            </a>
+        `;
+    }
+    if (space.Status === 'Occupied') {
+        return `
+            <a href="${operationsUrl}" class="px-3 py-1 text-xs font-medium text-white bg-red-500 rounded hover:bg-red-600">
+                <i class="fas fa-sign-out-alt mr-1"></i>Process Exit
+            </a>
+        `;
+    }
+    return '<span class="text-gray-400 italic text-xs">—</span>';
+}
+
+function renderSpaceRow(space, operationsUrl) {
+    return `
+        <tr class="hover:bg-gray-50 transition-colors" data-space-id="${escapeHtml(space.SpaceID)}">
+            <td class="px-6 py-4 whitespace-nowrap">
+                <span class="inline-flex items-center px-3 py-1 rounded-full text-sm font-medium bg-blue-100 text-blue-800">
+                    ${escapeHtml(space.SpaceNumber)}
+                </span>
+            </td>
+            <td class="px-6 py-4 whitespace-nowrap text-sm text-gray-900">${escapeHtml(space.SpaceType)}</td>
+            <td class="px-6 py-4 whitespace-nowrap" data-role="status">${renderSpaceStatusCell(space.Status)}</td>
+            <td class="px-6 py-4 whitespace-nowrap text-sm" data-role="action">${renderSpaceActionCell(space, operationsUrl)}</td>
+        </tr>
+    `;
+}
+
+function applyOccupancyCounts(counts) {
+    const cards = {
+        occupancyTotal: counts.TotalSpaces,
+        occupancyOccupied: counts.OccupiedCount,
+        occupancyReserved: counts.ReservedCount,
+        occupancyVacant: counts.VacantCount
+    };
+    Object.entries(cards).forEach(([id, value]) => {
+        const element = document.getElementById(id);
+        if (element) {
+            element.textContent = value || 0;
+        }
+    });
+
+    if (window.occupancyChart) {
+        window.occupancyChart.data.datasets[0].data = [counts.OccupiedCount, counts.ReservedCount, counts.VacantCount];
+        window.occupancyChart.update();
+    }
+}
+
+// Ask the server for spaces changed since our version and patch the grid in place
+async function refreshSpaceStatus(tbody) {
+    const params = new URLSearchParams({
+        epoch: tbody.dataset.epoch,
+        since: tbody.dataset.version
+    });
+    const headers = tbody.dataset.etag ? { 'If-None-Match': tbody.dataset.etag } : {};
+
+    const response = await fetch(`${tbody.dataset.endpoint}?${params}`, { headers });
+    if (response.status === 304) {
+        return;
+    }
+    if (!response.ok) {
+        throw new Error('Failed to fetch space status');
+    }
+
+    const update = await response.json();
+    const operationsUrl = tbody.dataset.operationsUrl;
+
+    if (update.full) {
+        tbody.innerHTML = update.spaces.map(space => renderSpaceRow(space, operationsUrl)).join('');
+    } else {
+        update.spaces.forEach(space => {
+            const row = tbody.querySelector(`tr[data-space-id="${space.SpaceID}"]`);
+            if (row) {
+                row.querySelector('[data-role="status"]').innerHTML = renderSpaceStatusCell(space.Status);
+                row.querySelector('[data-role="action"]').innerHTML = renderSpaceActionCell(space, operationsUrl);
+            }
+        });
+    }
+
+    applyOccupancyCounts(update.counts);
+    tbody.dataset.epoch = update.epoch;
+    tbody.dataset.version = update.version;
+    tbody.dataset.etag = response.headers.get('ETag') || '';
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const tbody = document.getElementById('spaceStatusRows');
+    if (!tbody) {
+        return;
+    }
+
+    setInterval(() => {
+        if (document.hidden) {
+            return;
+        }
+        refreshSpaceStatus(tbody).catch(error => console.error('Error refreshing space status:', error));
+    }, SPACE_STATUS_POLL_MS);
+});
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import timedelta
+
+# Rate used when no Tariff row covers a space (the original flat ₹50/hour)
+DEFAULT_RATE_PER_HOUR = 50.0
+
+_ONE_HOUR = timedelta(hours=1)
+_ONE_DAY = timedelta(days=1)
+
+
+class _Schedule:
+    """Compiled tariff for one (Lot_ID, SpaceType): 24 hourly rates plus grace and cap."""
+
+    __slots__ = ('hourly_rates', 'grace_minutes', 'daily_cap', 'flat_rate')
+
+    def __init__(self, hourly_rates, grace_minutes=0, daily_cap=None):
+        self.hourly_rates = tuple(hourly_rates)
+        self.grace_minutes = grace_minutes
+        self.daily_cap = daily_cap
+        # Uniform rates with no cap can be priced without walking the clock
+        uniform = len(set(self.hourly_rates)) == 1
+        self.flat_rate = self.hourly_rates[0] if uniform and daily_cap is None else None
+
+
+class TariffEngine:
+    """Prices parking stays from the Tariff table.
+
+    Tariff rows are compiled once into per-(Lot_ID, SpaceType) schedules of
+    24 hourly rates. A row with a NULL Lot_ID or SpaceType applies to every
+    lot or type. For each hour the most specific row wins: (lot, type), then
+    (lot, any), then (any, type), then (any, any). Hours no row covers are
+    charged at DEFAULT_RATE_PER_HOUR.
+    Grace minutes come from the most specific level with any row (a 0 there
+    turns grace off), and the daily cap from the most specific level that
+    sets one. The engine reloads after ``max_age`` seconds or when
+    invalidated by a tariff change.
+    """
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._levels = {}     # (Lot_ID|None, SpaceType|None) -> {'rates': [24], 'grace': int|None, 'cap': float|None}
+        self._schedules = {}  # (Lot_ID, SpaceType) -> _Schedule, filled lazily
+        self._loaded_at = None
+
+    # -----------------------------------------------------------------
+    # Loading
+    # -----------------------------------------------------------------
+
+    def load(self, rows):
+        """Compile Tariff rows (Lot_ID, SpaceType, StartHour, EndHour, RatePerHour, GraceMinutes, DailyCap)."""
+        levels = {}
+        for row in rows:
+            key = (row['Lot_ID'], row['SpaceType'])
+            level = levels.setdefault(key, {'rates': [None] * 24, 'grace': None, 'cap': None})
+            for hour in range(row['StartHour'], row['EndHour']):
+                level['rates'][hour] = float(row['RatePerHour'])
+            # GraceMinutes is NOT NULL, so 0 is a real value: it turns off a less specific level's grace
+            level['grace'] = max(level['grace'] or 0, int(row['GraceMinutes']))
+            if row['DailyCap'] is not None:
+                cap = float(row['DailyCap'])
+                level['cap'] = cap if level['cap'] is None else min(level['cap'], cap)
+
+        with self._lock:
+            self._levels = levels
+            self._schedules = {}
+            self._loaded_at = time.monotonic()
+
+    def needs_reload(self):
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.max_age
+
+    def invalidate(self):
+        """Force a reload before the next quote (call after editing tariffs)."""
+        self._loaded_at = None
+
+    # -----------------------------------------------------------------
+    # Pricing
+    # -----------------------------------------------------------------
+
+    def quote(self, lot_id, space_type, entry_time, exit_time):
+        """Return (duration_minutes, fee) for a stay, like TIMESTAMPDIFF(MINUTE, ...)."""
+        minutes = max(0, int((exit_time - entry_time).total_seconds() // 60))
+        schedule = self.schedule_for(lot_id, space_type)
+        if minutes == 0 or minutes <= schedule.grace_minutes:
+            return minutes, 0.0
+
+        if schedule.flat_rate is not None:
+            return minutes, round(minutes / 60 * schedule.flat_rate, 2)
+
+        end = entry_time + timedelta(minutes=minutes)
+        rates = schedule.hourly_rates
+        cap = schedule.daily_cap
+        total = 0.0
+        day_total = 0.0
+        day_end = entry_time + _ONE_DAY
+        t = entry_time
+        while t < end:
+            next_hour = t.replace(minute=0, second=0, microsecond=0) + _ONE_HOUR
+            segment_end = min(next_hour, end, day_end)
+            day_total += (segment_end - t).total_seconds() / 3600 * rates[t.hour]
+            if segment_end == day_end:
+                total += day_total if cap is None else min(day_total, cap)
+                day_total = 0.0
+                day_end += _ONE_DAY
+            t = segment_end
+        total += day_total if cap is None else min(day_total, cap)
+        return minutes, round(total, 2)
+
+    def schedule_for(self, lot_id, space_type):
+        """Return the compiled schedule for a lot and space type."""
+        key = (lot_id, space_type)
+        schedule = self._schedules.get(key)
+        if schedule is None:
+            with self._lock:
+                schedule = self._compile(lot_id, space_type)
+                self._schedules[key] = schedule
+        return schedule
+
+    def _compile(self, lot_id, space_type):
+        chain = [self._levels.get(k) for k in
+                 ((lot_id, space_type), (lot_id, None), (None, space_type), (None, None))]
+        chain = [level for level in chain if level]
+
+        rates = []
+        for hour in range(24):
+            rate = next((level['rates'][hour] for level in chain if level['rates'][hour] is not None),
+                        DEFAULT_RATE_PER_HOUR)
+            rates.append(rate)
+        grace = next((level['grace'] for level in chain if level['grace'] is not None), 0)
+        cap = next((level['cap'] for level in chain if level['cap'] is not None), None)
+        return _Schedule(rates, grace, cap)
@@ -0,0 +1,142 @@
+"""Compare the sync and async customer-history endpoints at equal worker counts.
+
+Serves the Flask app from a Werkzeug server with ``--workers`` request
+threads (like a gunicorn gthread worker) and ``--workers`` pooled MySQL
+connections, and the ASGI gate API (app/gate_asgi.py) from uvicorn: one
+event-loop thread with the same ``--workers`` connections. Both then get
+``--clients`` concurrent clients on ``/api/customer_history/<id>`` and
+``/api/gate/customer_history/<id>``:
+
+    python benchmarks/bench_async.py --workers 8 --clients 64 --seconds 20 --customer-id 1001
+
+The history cache is switched off so every request reaches MySQL on both
+sides. Needs uvicorn, a local MySQL loaded with the project schema and a
+login that works. Prints requests/s, p50/p99 latency and status codes for
+each endpoint, plus the gate API's pool counters (503s are shed requests).
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import secrets
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_login import PooledWSGIServer, percentile  # noqa: E402
+
+
+def login(base_url, username, password):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    body = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    opener.open(f"{base_url}/login", body).read()
+    if not any(cookie.name == 'session' for cookie in jar):
+        sys.exit("Login failed: check --username / --password")
+    return opener
+
+
+def bearer(token):
+    opener = urllib.request.build_opener()
+    opener.addheaders = [('Authorization', f'Bearer {token}')]
+    return opener
+
+
+def run(opener, url, clients, seconds):
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        local_latency, local_status = [], Counter()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with opener.open(url) as response:
+                    response.read()
+                    local_status[response.status] += 1
+            except urllib.error.HTTPError as e:
+                local_status[e.code] += 1
+            except urllib.error.URLError:
+                local_status['conn-error'] += 1
+            local_latency.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local_latency)
+            statuses.update(local_status)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8,
+                        help='WSGI request threads, and MySQL connections for each server')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--customer-id', type=int, default=1001)
+    parser.add_argument('--username', default='alice.j')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--gate-port', type=int, default=5098)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    token = secrets.token_urlsafe(16)
+    os.environ.update({
+        'DB_POOL_SIZE': str(args.workers),
+        'DB_POOL_MAX_OVERFLOW': '0',
+        'GATE_DB_POOL_SIZE': str(args.workers),
+        'GATE_MAX_PENDING': str(args.clients),
+        'GATE_API_TOKEN': token,
+        'HISTORY_CACHE_SIZE': '0',
+    })
+    from app import app
+    from app.gate_asgi import app as gate_app
+
+    server = PooledWSGIServer('127.0.0.1', args.port, app, args.workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    gate_server = uvicorn.Server(uvicorn.Config(gate_app, host='127.0.0.1', port=args.gate_port,
+                                                log_level='warning', access_log=False))
+    threading.Thread(target=gate_server.run, daemon=True).start()
+    while not gate_server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    gate_url = f"http://127.0.0.1:{args.gate_port}"
+    cases = (
+        ('sync', login(base_url, args.username, args.password),
+         f"{base_url}/api/customer_history/{args.customer_id}"),
+        ('async', bearer(token), f"{gate_url}/api/gate/customer_history/{args.customer_id}"),
+    )
+
+    print(f"{args.workers} workers, {args.clients} clients, {args.seconds:.0f}s per endpoint\n")
+    print(f"{'endpoint':<12}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+    for name, opener, url in cases:
+        latencies, statuses, elapsed = run(opener, url, args.clients, args.seconds)
+        median = statistics.median(latencies) if latencies else 0.0
+        print(f"{name:<12}{len(latencies):>10}{len(latencies) / elapsed:>10.0f}{median:>10.2f}"
+              f"{percentile(latencies, 99):>10.2f}  {dict(statuses)}")
+
+    with bearer(token).open(f"{gate_url}/api/gate/stats") as response:
+        print("\ngate pool:", json.loads(response.read()))
+    gate_server.should_exit = True
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
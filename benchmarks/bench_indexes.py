@@ -0,0 +1,306 @@
+"""Before/after EXPLAIN and timing for databases/migrations/001_hot_path_indexes.sql.
+
+Builds a scratch database (``plm_bench`` by default; never the app's own)
+holding the hot tables with only the indexes the original schema had,
+seeds it with ``--records`` parking records and payments, then times each
+hot-path query before and after applying the migration:
+
+    python benchmarks/bench_indexes.py --records 1000000
+
+It then adds the Parking_Record.CustomerID copy and index from migration 011
+and checks that EXPLAIN of the customer-history page query shows no
+filesort, exiting non-zero if it does.
+
+Connection settings come from the same DB_HOST / DB_USER / DB_PASSWORD
+variables (.env) the app uses. Seeding 1M records takes a few minutes;
+pass --skip-seed to re-run against an already-seeded database.
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import time
+
+import mysql.connector
+from dotenv import load_dotenv
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+MIGRATION = os.path.join(ROOT, 'databases', 'migrations', '001_hot_path_indexes.sql')
+HOT_INDEXES = {
+    'Parking_Record': 'idx_record_active',
+    'Parking_Space': 'idx_space_status',
+    'Books': 'idx_books_space',
+    'Payment': 'idx_payment_method',
+    'Customer': 'idx_customer_name',
+}
+
+# The hot tables as originally defined: only primary/unique keys plus the
+# indexes InnoDB creates implicitly for foreign keys.
+BASELINE_TABLES = [
+    """CREATE TABLE Customer (
+        CustomerID INT PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        Email VARCHAR(100) UNIQUE
+    )""",
+    """CREATE TABLE Parking_Space (
+        SpaceID INT PRIMARY KEY,
+        Lot_ID INT NOT NULL,
+        SpaceNumber INT NOT NULL,
+        SpaceType ENUM('Standard', 'Handicap', 'EV', 'Reserved') NOT NULL,
+        Status ENUM('Vacant', 'Occupied', 'Reserved', 'Maintenance') DEFAULT 'Vacant' NOT NULL,
+        UNIQUE KEY (Lot_ID, SpaceNumber)
+    )""",
+    """CREATE TABLE Books (
+        CustomerID INT NOT NULL,
+        SpaceID INT NOT NULL,
+        EmployeeID INT NOT NULL,
+        ReservationTime TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (CustomerID, SpaceID, EmployeeID),
+        KEY SpaceID (SpaceID),
+        KEY EmployeeID (EmployeeID)
+    )""",
+    """CREATE TABLE Payment (
+        PaymentID INT AUTO_INCREMENT PRIMARY KEY,
+        RecordID INT UNIQUE NOT NULL,
+        Amount DECIMAL(10, 2) NOT NULL,
+        Timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        Method ENUM('Credit Card', 'Cash', 'UPI', 'Subscription') NOT NULL
+    )""",
+    """CREATE TABLE Parking_Record (
+        RecordID INT AUTO_INCREMENT PRIMARY KEY,
+        LicensePlate VARCHAR(15) NOT NULL,
+        SpaceID INT NOT NULL,
+        PaymentID INT NULL,
+        EntryTime TIMESTAMP NOT NULL,
+        ExitTime TIMESTAMP NULL,
+        Duration INT NULL,
+        UNIQUE (PaymentID),
+        KEY LicensePlate (LicensePlate),
+        KEY SpaceID (SpaceID)
+    )""",
+]
+
+QUERIES = [
+    ('active session by plate',
+     "SELECT RecordID, SpaceID, EntryTime FROM Parking_Record "
+     "WHERE LicensePlate = %s AND ExitTime IS NULL ORDER BY EntryTime DESC LIMIT 1",
+     lambda rng, n: (f"BN{rng.randrange(n.plates):07d}",)),
+    ('spaces by status',
+     "SELECT SpaceID, SpaceNumber FROM Parking_Space WHERE Status = %s ORDER BY SpaceNumber",
+     lambda rng, n: (rng.choice(['Vacant', 'Reserved', 'Maintenance']),)),
+    ('bookings by space',
+     "SELECT CustomerID FROM Books WHERE SpaceID = %s",
+     lambda rng, n: (rng.randrange(1, n.spaces + 1),)),
+    ('revenue by method',
+     "SELECT Method, COUNT(*) AS TotalTransactions, SUM(Amount) AS TotalRevenue "
+     "FROM Payment GROUP BY Method",
+     lambda rng, n: ()),
+    ('customer page by name',
+     "SELECT CustomerID, Name FROM Customer WHERE (Name, CustomerID) > (%s, %s) "
+     "ORDER BY Name, CustomerID LIMIT 50",
+     lambda rng, n: (f"Customer {rng.randrange(n.customers):07d}", 0)),
+]
+
+# get_customer_history's query, first page and a keyset-seek page
+HISTORY_INDEX = 'idx_record_customer_history'
+HISTORY_SELECT = (
+    "SELECT C.Name AS CustomerName, PR.LicensePlate, PR.RecordID, PR.EntryTime, PR.ExitTime, "
+    "PR.Duration AS DurationMinutes, P.Amount AS FeePaid, P.Method "
+    "FROM Parking_Record PR "
+    "JOIN Customer C ON C.CustomerID = PR.CustomerID "
+    "LEFT JOIN Payment P ON PR.PaymentID = P.PaymentID "
+    "WHERE PR.CustomerID = %s{seek} "
+    "ORDER BY PR.EntryTime DESC, PR.RecordID DESC LIMIT 26"
+)
+HISTORY_QUERIES = [
+    ('customer history page 1', HISTORY_SELECT.format(seek=''),
+     lambda rng, n: (rng.randrange(n.customers),)),
+    ('customer history seek', HISTORY_SELECT.format(
+        seek=" AND ((PR.EntryTime < %s) OR (PR.EntryTime = %s AND PR.RecordID < %s))"),
+     lambda rng, n: (rng.randrange(n.customers), '2030-01-01', '2030-01-01', n.records)),
+]
+
+
+def run_sql_file(cursor, path):
+    """Execute a migration script statement by statement, skipping its USE line."""
+    with open(path, encoding='utf-8') as f:
+        sql = re.sub(r'--[^\n]*', '', f.read())
+    for statement in sql.split(';'):
+        statement = statement.strip()
+        if statement and not statement.upper().startswith('USE '):
+            cursor.execute(statement)
+            if cursor.with_rows:
+                cursor.fetchall()
+
+
+def seed(db, cursor, args):
+    rng = random.Random(7)
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursor.execute("SET UNIQUE_CHECKS = 0")
+    for table in HOT_INDEXES:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    for ddl in BASELINE_TABLES:
+        cursor.execute(ddl)
+
+    def insert(sql, rows):
+        for start in range(0, len(rows), args.batch):
+            cursor.executemany(sql, rows[start:start + args.batch])
+            db.commit()
+
+    statuses = ['Vacant'] * 6 + ['Occupied'] * 3 + ['Reserved', 'Maintenance']
+    insert("INSERT INTO Customer (CustomerID, Name, Email) VALUES (%s, %s, %s)",
+           [(i, f"Customer {i:07d}", f"c{i}@bench.local") for i in range(args.customers)])
+    insert("INSERT INTO Parking_Space (SpaceID, Lot_ID, SpaceNumber, SpaceType, Status) VALUES (%s, %s, %s, %s, %s)",
+           [(i, 1 + i % 10, i, rng.choice(['Standard', 'Handicap', 'EV']), rng.choice(statuses))
+            for i in range(1, args.spaces + 1)])
+    insert("INSERT IGNORE INTO Books (CustomerID, SpaceID, EmployeeID) VALUES (%s, %s, %s)",
+           [(rng.randrange(args.customers), rng.randrange(1, args.spaces + 1), 1)
+            for _ in range(args.spaces * 2)])
+
+    print(f"Seeding {args.records:,} parking records and payments...")
+    methods = ['Credit Card', 'Cash', 'UPI', 'Subscription']
+    base = time.time() - 365 * 86400
+    for start in range(1, args.records + 1, args.batch):
+        end = min(start + args.batch, args.records + 1)
+        records, payments = [], []
+        for record_id in range(start, end):
+            entry = base + rng.randrange(365 * 86400)
+            # Roughly one plate in twenty is parked right now
+            closed = record_id <= args.records - args.plates // 20
+            records.append((record_id, f"BN{rng.randrange(args.plates):07d}", rng.randrange(1, args.spaces + 1),
+                            record_id if closed else None,
+                            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry)),
+                            time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry + 7200)) if closed else None))
+            if closed:
+                payments.append((record_id, record_id, round(rng.uniform(10, 500), 2), rng.choice(methods)))
+        cursor.executemany("INSERT INTO Parking_Record (RecordID, LicensePlate, SpaceID, PaymentID, EntryTime, ExitTime) "
+                           "VALUES (%s, %s, %s, %s, %s, %s)", records)
+        if payments:
+            cursor.executemany("INSERT INTO Payment (PaymentID, RecordID, Amount, Method) VALUES (%s, %s, %s, %s)",
+                               payments)
+        db.commit()
+    cursor.execute("SET UNIQUE_CHECKS = 1")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    for table in HOT_INDEXES:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+
+
+def drop_hot_indexes(cursor):
+    for table, index in HOT_INDEXES.items():
+        cursor.execute("SELECT COUNT(*) AS n FROM information_schema.statistics "
+                       "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s", (table, index))
+        if cursor.fetchone()['n']:
+            cursor.execute(f"DROP INDEX {index} ON {table}")
+    cursor.execute("DROP TABLE IF EXISTS Schema_Version")
+
+
+def measure(cursor, args):
+    results = {}
+    for name, sql, make_params in QUERIES:
+        rng = random.Random(11)
+        cursor.execute("EXPLAIN " + sql, make_params(rng, args))
+        plan = cursor.fetchall()
+        timings = []
+        for _ in range(args.repeat):
+            params = make_params(rng, args)
+            start = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = (plan, timings)
+    return results
+
+
+def add_history_index(db, cursor, args):
+    """Apply migration 011's column and index (its triggers are not needed here)."""
+    cursor.execute("SELECT COUNT(*) AS n FROM information_schema.columns "
+                   "WHERE table_schema = DATABASE() AND table_name = 'Parking_Record' AND column_name = 'CustomerID'")
+    if not cursor.fetchone()['n']:
+        print("Copying owners onto Parking_Record...")
+        cursor.execute("ALTER TABLE Parking_Record ADD COLUMN CustomerID INT NULL AFTER LicensePlate")
+        # Seeded plates BN<n> belong to customer n % customers
+        cursor.execute("UPDATE Parking_Record SET CustomerID = CAST(SUBSTRING(LicensePlate, 3) AS UNSIGNED) %% %s",
+                       (args.customers,))
+        db.commit()
+    cursor.execute("SELECT COUNT(*) AS n FROM information_schema.statistics "
+                   "WHERE table_schema = DATABASE() AND table_name = 'Parking_Record' AND index_name = %s",
+                   (HISTORY_INDEX,))
+    if not cursor.fetchone()['n']:
+        cursor.execute(f"CREATE INDEX {HISTORY_INDEX} ON Parking_Record (CustomerID, EntryTime, RecordID)")
+    cursor.execute("ANALYZE TABLE Parking_Record")
+    cursor.fetchall()
+
+
+def check_history_plans(cursor, args):
+    """EXPLAIN the customer-history queries; return the names of those that filesort."""
+    failures = []
+    for name, sql, make_params in HISTORY_QUERIES:
+        cursor.execute("EXPLAIN " + sql, make_params(random.Random(11), args))
+        plan = cursor.fetchall()
+        sorted_rows = [row for row in plan if 'filesort' in (row['Extra'] or '')]
+        print(f"{name}: {'FILESORT' if sorted_rows else 'ok'}\n  {describe(plan)}")
+        if sorted_rows:
+            failures.append(name)
+    return failures
+
+
+def describe(plan):
+    return '; '.join(f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} "
+                     f"extra={row['Extra'] or '-'}" for row in plan)
+
+
+def main():
+    load_dotenv(os.path.join(ROOT, '.env'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='plm_bench')
+    parser.add_argument('--records', type=int, default=1_000_000)
+    parser.add_argument('--plates', type=int, default=200_000)
+    parser.add_argument('--customers', type=int, default=100_000)
+    parser.add_argument('--spaces', type=int, default=5_000)
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--skip-seed', action='store_true')
+    args = parser.parse_args()
+    if args.database == os.getenv('DB_NAME'):
+        parser.error('refusing to benchmark against the application database')
+
+    db = mysql.connector.connect(host=os.getenv('DB_HOST'), user=os.getenv('DB_USER'),
+                                 password=os.getenv('DB_PASSWORD'))
+    cursor = db.cursor(dictionary=True)
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    cursor.execute(f"USE `{args.database}`")
+
+    if not args.skip_seed:
+        seed(db, cursor, args)
+    drop_hot_indexes(cursor)
+    before = measure(cursor, args)
+
+    start = time.perf_counter()
+    run_sql_file(cursor, MIGRATION)
+    db.commit()
+    print(f"Migration applied in {time.perf_counter() - start:.1f}s")
+    after = measure(cursor, args)
+
+    print(f"\n{'query':<26}{'before p50':>12}{'after p50':>12}{'speedup':>10}")
+    for name, _, _ in QUERIES:
+        b = statistics.median(before[name][1])
+        a = statistics.median(after[name][1])
+        print(f"{name:<26}{b:>10.2f}ms{a:>10.2f}ms{b / a if a else float('inf'):>9.1f}x")
+    print()
+    for name, _, _ in QUERIES:
+        print(f"{name}\n  before: {describe(before[name][0])}\n  after:  {describe(after[name][0])}")
+
+    print()
+    add_history_index(db, cursor, args)
+    failures = check_history_plans(cursor, args)
+
+    cursor.close()
+    db.close()
+    if failures:
+        raise SystemExit(f"Customer history still sorts: {', '.join(failures)}")
+
+
+if __name__ == '__main__':
+    main()
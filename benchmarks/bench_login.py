@@ -0,0 +1,133 @@
+"""Shift-change login burst against POST /login.
+
+Serves the app from a Werkzeug server whose requests are handled by a fixed
+pool of ``--workers`` threads (like a gunicorn gthread worker), then fires
+``--attendants`` simultaneous logins (released together by a barrier)
+``--bursts`` times. The first burst runs with the auth cache
+cleared; later bursts show the warm-cache path:
+
+    python benchmarks/bench_login.py --workers 8 --attendants 48 --bursts 5
+
+Needs a local MySQL loaded with the project schema. ``--users`` takes
+``username:password`` pairs that are cycled across attendants (the defaults
+come from 03_insert_base_data.sql). Prints p50/p99 login latency per burst,
+how many logins succeeded, and the statements authenticate_user issued.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from werkzeug.serving import BaseWSGIServer  # noqa: E402
+
+DEFAULT_USERS = 'alice.j:password123,bob.w:securepass,charlie.d:charliepass'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that hands each connection to a fixed thread pool."""
+
+    def __init__(self, host, port, app, workers):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def burst(base_url, credentials, attendants):
+    """Log ``attendants`` users in at once; return (latencies_ms, successes)."""
+    opener = urllib.request.build_opener(NoRedirect)
+    barrier = threading.Barrier(attendants)
+    latencies = [None] * attendants
+    ok = [False] * attendants
+
+    def attendant(i):
+        username, password = credentials[i % len(credentials)]
+        body = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            opener.open(f"{base_url}/login", body).read()
+        except urllib.error.HTTPError as e:
+            # A successful login redirects to the dashboard; failures redirect back to /login
+            ok[i] = e.code == 302 and not e.headers.get('Location', '').endswith('/login')
+        except urllib.error.URLError:
+            pass
+        latencies[i] = (time.perf_counter() - start) * 1000
+
+    threads = [threading.Thread(target=attendant, args=(i,)) for i in range(attendants)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, sum(ok)
+
+
+def auth_statements(app):
+    for row in app.extensions['db_metrics'].function_stats():
+        if row['function'] == 'authenticate_user':
+            return row['queries']
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help='HTTP worker threads')
+    parser.add_argument('--attendants', type=int, default=48, help='simultaneous logins per burst')
+    parser.add_argument('--bursts', type=int, default=5)
+    parser.add_argument('--users', default=DEFAULT_USERS, help='comma-separated username:password pairs')
+    parser.add_argument('--port', type=int, default=5098)
+    args = parser.parse_args()
+
+    credentials = [tuple(pair.split(':', 1)) for pair in args.users.split(',')]
+    from app import app
+
+    server = PooledWSGIServer('127.0.0.1', args.port, app, args.workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    app.extensions['auth_cache'].clear()
+
+    print(f"{args.workers} HTTP workers, {args.attendants} attendants per burst, {len(credentials)} accounts\n")
+    print(f"{'burst':<8}{'ok':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'statements':>12}")
+    for n in range(1, args.bursts + 1):
+        before = auth_statements(app)
+        latencies, successes = burst(base_url, credentials, args.attendants)
+        label = 'cold' if n == 1 else f"warm{n - 1}"
+        print(f"{label:<8}{successes:>6}{statistics.median(latencies):>10.2f}"
+              f"{percentile(latencies, 99):>10.2f}{max(latencies):>10.2f}"
+              f"{auth_statements(app) - before:>12}")
+
+    print("\nauth cache:", app.extensions['auth_cache'].stats())
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
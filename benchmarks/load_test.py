@@ -0,0 +1,439 @@
+"""Reproducible HTTP load test for the gate and report routes.
+
+Seeds a scratch MySQL database (``plm_load`` by default; never the app's
+own) by piping databases/01-03 through the ``mysql`` client, then scales it
+up with extra lots, spaces, customers, vehicles and paid history. It then
+serves the app in-process (or targets ``--base-url``), logs every virtual
+user in through /login and replays a weighted mix of:
+
+    entry      POST /process_entry   (nearest vacant space, or a reserved one)
+    exit       POST /process_exit    (a vehicle this user parked)
+    reserve    POST /book_reservation
+    dashboard  GET  /dashboard
+    history    GET  /api/customer_history/<id>
+
+    python benchmarks/load_test.py --clients 32 --seconds 60 --output run.json
+    python benchmarks/load_test.py --skip-seed --clients 32 --seconds 60 --compare run.json
+
+Results (throughput, p50/p95/p99/max latency, HTTP statuses and flashed
+outcomes per route) are written as JSON to ``--output``; ``--compare``
+prints the change against an earlier run. Connection settings come from
+the same DB_HOST / DB_USER / DB_PASSWORD variables (.env) the app uses.
+Re-runs with --skip-seed must pass the same scale options as the seed.
+"""
+import argparse
+import base64
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from collections import Counter, defaultdict
+
+from dotenv import load_dotenv
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, ROOT)
+SEED_SCRIPTS = ['01_create_schema.sql', '02_create_logic.sql', '03_insert_base_data.sql']
+ROUTES = ('entry', 'exit', 'reserve', 'dashboard', 'history')
+PAYMENT_METHODS = ['Credit Card', 'Cash', 'UPI', 'Subscription']
+SPACE_TYPES = ['Standard'] * 7 + ['Handicap', 'EV', 'EV']
+
+# Seeded rows live in their own ID ranges, clear of 03_insert_base_data.sql
+FIRST_LOT = 101
+FIRST_SPACE = 100001
+FIRST_CUSTOMER = 200001
+FIRST_RECORD = 100001
+
+
+# ---------------------------------------------------------------------
+# Seeding
+# ---------------------------------------------------------------------
+
+def mysql_client(database=None):
+    command = ['mysql', '--batch', f"--host={os.getenv('DB_HOST', 'localhost')}",
+               f"--user={os.getenv('DB_USER', 'root')}"]
+    if database:
+        command.append(database)
+    env = dict(os.environ, MYSQL_PWD=os.getenv('DB_PASSWORD') or '')
+    return command, env
+
+
+def run_mysql(sql, database=None):
+    command, env = mysql_client(database)
+    result = subprocess.run(command, input=sql, text=True, env=env, capture_output=True)
+    if result.returncode != 0:
+        sys.exit(f"mysql failed: {result.stderr.strip()}")
+
+
+def schema_sql(db_name):
+    """The base scripts with their hard-coded `plm` database swapped for ``db_name``."""
+    parts = []
+    for name in SEED_SCRIPTS:
+        with open(os.path.join(ROOT, 'databases', name), encoding='utf-8') as f:
+            sql = f.read()
+        parts.append(re.sub(r'\b(DATABASE(?:\s+IF\s+EXISTS)?|USE)\s+plm\b', rf'\1 {db_name}', sql,
+                            flags=re.IGNORECASE))
+    return '\n'.join(parts)
+
+
+def values(rows):
+    return ',\n'.join('(' + ', '.join(sql_literal(v) for v in row) + ')' for row in rows)
+
+
+def sql_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace('\\', '\\\\').replace("'", "''") + "'"
+
+
+def insert_statements(table, columns, rows, batch):
+    head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES\n"
+    for start in range(0, len(rows), batch):
+        yield head + values(rows[start:start + batch]) + ';'
+
+
+def scale_sql(args):
+    """Multi-row INSERTs that scale the base data up to the requested size."""
+    rng = random.Random(args.seed)
+    yield "SET FOREIGN_KEY_CHECKS = 0;"
+    yield "SET UNIQUE_CHECKS = 0;"
+
+    lots = [(FIRST_LOT + i, f"Load Test Lot {i + 1}", args.spaces_per_lot, f"{i + 1} Benchmark Way")
+            for i in range(args.lots)]
+    yield from insert_statements('Parking_Lot', ['Lot_ID', 'Name', 'Total_spaces', 'Address'], lots, args.batch)
+
+    spaces = []
+    for lot_index in range(args.lots):
+        for number in range(1, args.spaces_per_lot + 1):
+            spaces.append((FIRST_SPACE + lot_index * args.spaces_per_lot + number - 1,
+                           FIRST_LOT + lot_index, number, rng.choice(SPACE_TYPES), 'Vacant'))
+    yield from insert_statements('Parking_Space', ['SpaceID', 'Lot_ID', 'SpaceNumber', 'SpaceType', 'Status'],
+                                 spaces, args.batch)
+
+    customers = [(FIRST_CUSTOMER + i, f"Load Customer {i:07d}", f"555-{i % 10000:04d}", f"load{i}@bench.local")
+                 for i in range(args.customers)]
+    yield from insert_statements('Customer', ['CustomerID', 'Name', 'Phone', 'Email'], customers, args.batch)
+
+    vehicles = [(plate_for(i), FIRST_CUSTOMER + i, 'Bench', 'Sedan', 'Grey') for i in range(args.customers)]
+    yield from insert_statements('Vehicle', ['LicensePlate', 'CustomerID', 'Make', 'Model', 'Color'],
+                                 vehicles, args.batch)
+
+    # Closed, paid visits spread over the last year. The record and payment
+    # triggers fire as usual, so PaymentCount and Revenue_Rollup stay right.
+    now = int(time.time())
+    records, payments = [], []
+    for i in range(args.history):
+        record_id = FIRST_RECORD + i
+        entry = now - rng.randrange(2 * 3600, 365 * 86400)
+        minutes = rng.randrange(15, 600)
+        records.append((record_id, plate_for(rng.randrange(args.customers)), rng.choice(spaces)[0],
+                        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry)),
+                        time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry + minutes * 60)), minutes))
+        payments.append((record_id, record_id, round(minutes / 60 * 50, 2),
+                         time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry + minutes * 60)),
+                         rng.choice(PAYMENT_METHODS)))
+    yield from insert_statements('Parking_Record',
+                                 ['RecordID', 'LicensePlate', 'SpaceID', 'EntryTime', 'ExitTime', 'Duration'],
+                                 records, args.batch)
+    yield from insert_statements('Payment', ['PaymentID', 'RecordID', 'Amount', 'Timestamp', 'Method'],
+                                 payments, args.batch)
+    yield (f"UPDATE Parking_Record SET PaymentID = RecordID "
+           f"WHERE RecordID BETWEEN {FIRST_RECORD} AND {FIRST_RECORD + args.history - 1};")
+    # The record-insert trigger marked every visited space Occupied
+    yield f"UPDATE Parking_Space SET Status = 'Vacant' WHERE SpaceID >= {FIRST_SPACE};"
+    yield "SET FOREIGN_KEY_CHECKS = 1;"
+    yield "SET UNIQUE_CHECKS = 1;"
+
+
+def seed(args):
+    print(f"Creating {args.db_name} from {', '.join(SEED_SCRIPTS)}...")
+    run_mysql(schema_sql(args.db_name))
+    print(f"Scaling up: {args.lots} lots x {args.spaces_per_lot} spaces, {args.customers:,} customers, "
+          f"{args.history:,} past visits...")
+    run_mysql('\n'.join(scale_sql(args)), args.db_name)
+
+
+def plate_for(index):
+    return f"LT{index:07d}"
+
+
+# ---------------------------------------------------------------------
+# Virtual users
+# ---------------------------------------------------------------------
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Time the route itself, not the page it redirects to."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def session_data(jar):
+    """Decode the (signed, not encrypted) Flask session cookie."""
+    for cookie in jar:
+        if cookie.name == 'session':
+            value = cookie.value
+            compressed = value.startswith('.')
+            payload = value.lstrip('.').split('.')[0]
+            raw = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4))
+            return json.loads(zlib.decompress(raw) if compressed else raw)
+    return {}
+
+
+def last_flash_category(jar):
+    flashes = session_data(jar).get('_flashes') or []
+    if not flashes:
+        return None
+    last = flashes[-1]
+    return (last.get(' t') if isinstance(last, dict) else last)[0]
+
+
+class VirtualUser:
+    """One logged-in operator working its own slice of the seeded vehicles."""
+
+    def __init__(self, user_id, args, base_url):
+        self.args = args
+        self.base_url = base_url
+        self.rng = random.Random(args.seed * 1000 + user_id)
+        self.jar = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar), _NoRedirect)
+        self.idle = list(range(user_id, args.customers, args.clients))
+        self.rng.shuffle(self.idle)
+        self.parked = []
+        self.arrivals = []  # (vehicle index, reserved SpaceID)
+
+    def login(self):
+        status, _ = self.request('POST', '/login', {'username': self.args.username, 'password': self.args.password})
+        if 'employee_id' not in session_data(self.jar):
+            raise RuntimeError(f"login failed (HTTP {status}); check --username / --password")
+
+    def request(self, method, path, form=None):
+        data = urllib.parse.urlencode(form).encode() if form is not None else None
+        try:
+            with self.opener.open(urllib.request.Request(self.base_url + path, data=data, method=method)) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        if method == 'POST' and 300 <= status < 400:
+            return status, last_flash_category(self.jar) or 'redirect'
+        return status, 'ok' if status < 400 else 'error'
+
+    def next_action(self, weights):
+        route = self.rng.choices(ROUTES, weights)[0]
+        if route == 'exit' and not self.parked:
+            route = 'entry'
+        if route in ('entry', 'reserve') and not self.idle and not self.arrivals:
+            route = 'exit' if self.parked else 'dashboard'
+        return route
+
+    def perform(self, route):
+        if route == 'entry':
+            if self.arrivals:
+                vehicle, space_id = self.arrivals.pop()
+                form = {'license_plate': plate_for(vehicle), 'space_id': space_id}
+            else:
+                vehicle = self.idle.pop()
+                form = {'license_plate': plate_for(vehicle),
+                        'lot_id': FIRST_LOT + self.rng.randrange(self.args.lots)}
+            status, outcome = self.request('POST', '/process_entry', form)
+            (self.parked if outcome == 'success' else self.idle).append(vehicle)
+        elif route == 'exit':
+            vehicle = self.parked.pop(self.rng.randrange(len(self.parked)))
+            status, outcome = self.request('POST', '/process_exit', {
+                'license_plate': plate_for(vehicle), 'payment_method': self.rng.choice(PAYMENT_METHODS)})
+            (self.idle if outcome == 'success' else self.parked).append(vehicle)
+        elif route == 'reserve':
+            if not self.idle:
+                return self.perform('entry')
+            vehicle = self.idle.pop()
+            space_id = FIRST_SPACE + self.rng.randrange(self.args.lots * self.args.spaces_per_lot)
+            status, outcome = self.request('POST', '/book_reservation', {
+                'customer_id': FIRST_CUSTOMER + vehicle, 'space_id': space_id})
+            if outcome == 'success':
+                self.arrivals.append((vehicle, space_id))
+            else:
+                self.idle.append(vehicle)
+        elif route == 'dashboard':
+            status, outcome = self.request('GET', '/dashboard')
+        else:
+            customer_id = FIRST_CUSTOMER + self.rng.randrange(self.args.customers)
+            status, outcome = self.request('GET', f"/api/customer_history/{customer_id}")
+        return route, status, outcome
+
+
+def drive(user, weights, warmup_until, deadline, results, lock):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    outcomes = defaultdict(Counter)
+    while time.monotonic() < deadline:
+        route = user.next_action(weights)
+        start = time.perf_counter()
+        try:
+            route, status, outcome = user.perform(route)
+        except urllib.error.URLError as e:
+            status, outcome = 'conn-error', str(e.reason)
+        elapsed = (time.perf_counter() - start) * 1000
+        if time.monotonic() >= warmup_until:
+            latencies[route].append(elapsed)
+            statuses[route][str(status)] += 1
+            outcomes[route][outcome] += 1
+        if user.args.think_ms:
+            time.sleep(user.rng.expovariate(1000 / user.args.think_ms))
+    with lock:
+        for route in latencies:
+            results['latencies'][route].extend(latencies[route])
+            results['statuses'][route].update(statuses[route])
+            results['outcomes'][route].update(outcomes[route])
+
+
+# ---------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(results, elapsed, args, weights):
+    routes = {}
+    for route in ROUTES:
+        samples = results['latencies'].get(route, [])
+        if not samples:
+            continue
+        routes[route] = {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(statistics.median(samples), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'p99_ms': round(percentile(samples, 99), 2),
+            'max_ms': round(max(samples), 2),
+            'statuses': dict(results['statuses'][route]),
+            'outcomes': dict(results['outcomes'][route]),
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': platform.node(),
+        'config': {
+            'clients': args.clients, 'seconds': args.seconds, 'warmup': args.warmup,
+            'think_ms': args.think_ms, 'mix': dict(zip(ROUTES, weights)), 'seed': args.seed,
+            'lots': args.lots, 'spaces_per_lot': args.spaces_per_lot,
+            'customers': args.customers, 'history': args.history,
+            'base_url': args.base_url or 'in-process',
+        },
+        'measured_seconds': round(elapsed, 2),
+        'total_requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'routes': routes,
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"\n{report['total_requests']} requests in {report['measured_seconds']}s "
+          f"({report['throughput_rps']} req/s, {report['config']['clients']} clients)\n")
+    print(f"{'route':<11}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  outcomes")
+    for route, stats in report['routes'].items():
+        print(f"{route:<11}{stats['requests']:>9}{stats['throughput_rps']:>9.1f}{stats['p50_ms']:>9.1f}"
+              f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}  {stats['outcomes']}")
+    if not baseline:
+        return
+    print(f"\nchange vs. baseline ({baseline['started_at']}):")
+    print(f"{'route':<11}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for route, stats in report['routes'].items():
+        before = baseline['routes'].get(route)
+        if before:
+            deltas = [change(before[key], stats[key]) for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')]
+            print(f"{route:<11}" + ''.join(f"{d:>10}" for d in deltas))
+
+
+def change(before, after):
+    return f"{(after - before) / before * 100:+.1f}%" if before else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-name', default='plm_load', help='scratch database to (re)create and serve')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse an already-seeded database')
+    parser.add_argument('--lots', type=int, default=5)
+    parser.add_argument('--spaces-per-lot', type=int, default=400)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--history', type=int, default=200000, help='past paid visits to seed')
+    parser.add_argument('--batch', type=int, default=1000, help='rows per seeding INSERT')
+    parser.add_argument('--base-url', help='target a running server instead of serving in-process')
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--warmup', type=float, default=5, help='seconds excluded from the results')
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between a user\'s requests')
+    parser.add_argument('--mix', default='entry=30,exit=25,reserve=10,dashboard=20,history=15')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--username', default='alice.j')
+    parser.add_argument('--password', default='password123')
+    parser.add_argument('--output', default='load_test_results.json')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    args = parser.parse_args()
+
+    mix = dict(part.split('=') for part in args.mix.split(','))
+    weights = [float(mix.get(route, 0)) for route in ROUTES]
+    load_dotenv(os.path.join(ROOT, '.env'))
+    if args.db_name == os.getenv('DB_NAME'):
+        sys.exit(f"Refusing to seed the app's own database ({args.db_name}); pick another --db-name.")
+    if not args.skip_seed:
+        seed(args)
+
+    base_url = args.base_url
+    if not base_url:
+        from werkzeug.serving import make_server
+        os.environ['DB_NAME'] = args.db_name
+        os.environ.setdefault('DB_POOL_SIZE', str(args.clients))
+        from app import app
+        server = make_server('127.0.0.1', args.port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    users = [VirtualUser(i, args, base_url) for i in range(args.clients)]
+    for user in users:
+        user.login()
+
+    results = {'latencies': defaultdict(list), 'statuses': defaultdict(Counter), 'outcomes': defaultdict(Counter)}
+    lock = threading.Lock()
+    warmup_until = time.monotonic() + args.warmup
+    deadline = warmup_until + args.seconds
+    threads = [threading.Thread(target=drive, args=(user, weights, warmup_until, deadline, results, lock))
+               for user in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    report = summarize(results, args.seconds, args, weights)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nresults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Concurrency stress test for the entry / exit / reservation write paths.
+
+Drives many threads through db_connector against a local MySQL loaded with
+the project schema (01-03 SQL scripts), all aimed at a small pool of hot
+spaces so that compare-and-set claims and row locks really collide:
+
+    python benchmarks/stress_concurrency.py --threads 32 --seconds 30 --hot-spaces 8
+
+Each thread loops over a random hot space: either drive straight in, or
+reserve it first and then arrive; every car that got in then exits. At the
+end it prints outcome counts (successes vs. CAS conflicts), the
+deadlock/lock-timeout retry counters and p50/p95/p99 latency per
+operation, then frees the hot spaces. It writes real records, payments and
+ST-prefixed vehicles: point it at a scratch database, not production.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import session  # noqa: E402
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def worker(app, db_connector, worker_id, args, space_ids, deadline, latencies, outcomes, lock):
+    rng = random.Random(worker_id)
+    local_latency = defaultdict(list)
+    local_outcomes = Counter()
+
+    def timed(op, fn, *fn_args):
+        start = time.perf_counter()
+        result = fn(*fn_args)
+        local_latency[op].append((time.perf_counter() - start) * 1000)
+        local_outcomes[(op, result.get('code') or result['status'])] += 1
+        return result
+
+    with app.test_request_context():
+        session['employee_id'] = args.employee_id
+        n = 0
+        while time.monotonic() < deadline:
+            n += 1
+            space_id = rng.choice(space_ids)
+            plate = f"ST{worker_id:03d}{n % 10000:04d}"
+            if rng.random() < args.reserve_ratio:
+                booking = timed('reserve', db_connector.book_reservation,
+                                args.customer_id, space_id, args.employee_id, plate)
+                if booking['status'] != 'success':
+                    continue
+            entry = timed('entry', db_connector.process_vehicle_entry, plate, space_id)
+            if entry['status'] == 'success':
+                timed('exit', db_connector.process_vehicle_exit, plate, 'Cash')
+        db_connector.close_db()
+
+    with lock:
+        for op, values in local_latency.items():
+            latencies[op].extend(values)
+        outcomes.update(local_outcomes)
+
+
+def cleanup(app, db_connector, space_ids):
+    with app.test_request_context():
+        db, cursor = db_connector.get_db()
+        marks = ', '.join(['%s'] * len(space_ids))
+        cursor.execute(f"DELETE FROM Books WHERE SpaceID IN ({marks})", space_ids)
+        cursor.execute(f"UPDATE Parking_Space SET Status = 'Vacant' WHERE SpaceID IN ({marks})", space_ids)
+        db.commit()
+        db_connector.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--hot-spaces', type=int, default=8, help='vacant spaces all threads compete for')
+    parser.add_argument('--reserve-ratio', type=float, default=0.2)
+    parser.add_argument('--customer-id', type=int, default=1001)
+    parser.add_argument('--employee-id', type=int, default=1)
+    args = parser.parse_args()
+
+    # One pooled connection per thread, so the numbers measure locks, not pool waits
+    os.environ['DB_POOL_SIZE'] = str(args.threads)
+    from app import app, db_connector
+
+    with app.test_request_context():
+        vacant = db_connector.get_vacant_space_list()
+        db_connector.close_db()
+    if vacant.get('status') != 'success' or not vacant['data']:
+        sys.exit(f"No vacant spaces to test with: {vacant.get('message', 'none found')}")
+    space_ids = [row['SpaceID'] for row in vacant['data'][:args.hot_spaces]]
+
+    latencies = defaultdict(list)
+    outcomes = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.seconds
+    threads = [threading.Thread(target=worker, args=(app, db_connector, i, args, space_ids, deadline, latencies, outcomes, lock))
+               for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    cleanup(app, db_connector, space_ids)
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{args.threads} threads x {args.seconds:.0f}s on {len(space_ids)} hot spaces: "
+          f"{total} operations ({total / elapsed:.0f}/s)\n")
+    print(f"{'operation':<10}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for op, values in sorted(latencies.items()):
+        print(f"{op:<10}{len(values):>8}{statistics.median(values):>10.2f}{percentile(values, 95):>10.2f}"
+              f"{percentile(values, 99):>10.2f}{max(values):>10.2f}")
+    print("\noutcomes:")
+    for (op, code), count in sorted(outcomes.items()):
+        print(f"  {op:<10}{code:<18}{count:>8}")
+    print("\nlock/retry counters:", db_connector.get_lock_retry_stats())
+    with app.app_context():
+        print("pool:", db_connector.get_pool_stats())
+
+
+if __name__ == '__main__':
+    main()
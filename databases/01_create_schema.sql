@@ -38,7 +38,8 @@ CREATE TABLE Customer (
     City VARCHAR(100),
     State VARCHAR(50),
     ZIP VARCHAR(10),
-    PaymentCount INT DEFAULT 0 NOT NULL -- Added from our updates
+    PaymentCount INT DEFAULT 0 NOT NULL, -- Added from our updates
+    INDEX idx_customer_name (Name, CustomerID) -- Keyset pagination on the reports page
 );
 
 CREATE TABLE Service (
@@ -67,6 +68,7 @@ CREATE TABLE Parking_Space (
     SpaceType ENUM('Standard', 'Handicap', 'EV', 'Reserved') NOT NULL,
     Status ENUM('Vacant', 'Occupied', 'Reserved', 'Maintenance') DEFAULT 'Vacant' NOT NULL,
     UNIQUE KEY (Lot_ID, SpaceNumber),
+    INDEX idx_space_status (Status, SpaceNumber), -- Vacant-space lists
     FOREIGN KEY (Lot_ID) REFERENCES Parking_Lot(Lot_ID) ON DELETE RESTRICT
 );
 
@@ -82,10 +84,13 @@ CREATE TABLE Vehicle (
 CREATE TABLE Maintenance_Log (
     SpaceID INT NOT NULL,
     LogID INT NOT NULL,
+    Lot_ID INT NULL, -- The space's lot, copied by triggers for the lot-filtered audit
     Cost DECIMAL(10, 2) NOT NULL,
     Description TEXT,
     Maintenance_data DATE NOT NULL,
     PRIMARY KEY (SpaceID, LogID),
+    INDEX idx_maintenance_date (Maintenance_data, SpaceID, LogID), -- Audit log, newest first
+    INDEX idx_maintenance_lot_date (Lot_ID, Maintenance_data, SpaceID, LogID), -- Audit log for one lot
     FOREIGN KEY (SpaceID) REFERENCES Parking_Space(SpaceID) ON DELETE CASCADE
 );
 
@@ -105,11 +110,28 @@ CREATE TABLE Books (
     ReservationTime TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     Notes TEXT,
     PRIMARY KEY (CustomerID, SpaceID, EmployeeID),
+    INDEX idx_books_space (SpaceID, CustomerID), -- Reservation lookups by space
+    INDEX idx_books_reserved_at (ReservationTime), -- Reservation expiry sweeps
     FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE,
     FOREIGN KEY (SpaceID) REFERENCES Parking_Space(SpaceID) ON DELETE RESTRICT,
     FOREIGN KEY (EmployeeID) REFERENCES Employee(EmployeeID) ON DELETE RESTRICT
 );
 
+-- Hourly tariff bands. NULL Lot_ID / SpaceType means "any lot" / "any type";
+-- the most specific band covering an hour wins (see app/tariffs.py).
+CREATE TABLE Tariff (
+    TariffID INT AUTO_INCREMENT PRIMARY KEY,
+    Lot_ID INT NULL,
+    SpaceType ENUM('Standard', 'Handicap', 'EV', 'Reserved') NULL,
+    StartHour TINYINT NOT NULL DEFAULT 0,
+    EndHour TINYINT NOT NULL DEFAULT 24,
+    RatePerHour DECIMAL(10, 2) NOT NULL,
+    GraceMinutes INT NOT NULL DEFAULT 0,
+    DailyCap DECIMAL(10, 2) NULL,
+    CHECK (StartHour >= 0 AND StartHour < EndHour AND EndHour <= 24),
+    FOREIGN KEY (Lot_ID) REFERENCES Parking_Lot(Lot_ID) ON DELETE CASCADE
+);
+
 -- ===================================================================================
 -- 3. TRANSACTIONAL ENTITIES (Inter-dependent)
 -- ===================================================================================
@@ -119,22 +141,74 @@ CREATE TABLE Payment (
     RecordID INT UNIQUE NOT NULL, -- FK added later
     Amount DECIMAL(10, 2) NOT NULL,
     Timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
-    Method ENUM('Credit Card', 'Cash', 'UPI', 'Subscription') NOT NULL
+    Method ENUM('Credit Card', 'Cash', 'UPI', 'Subscription') NOT NULL,
+    INDEX idx_payment_method (Method, Amount) -- Covers revenue GROUP BY Method
 );
 
 CREATE TABLE Parking_Record (
     RecordID INT AUTO_INCREMENT PRIMARY KEY,
     LicensePlate VARCHAR(15) NOT NULL,
+    CustomerID INT NULL, -- Vehicle owner, kept in step with Vehicle.CustomerID by triggers
     SpaceID INT NOT NULL,
     PaymentID INT NULL, -- FK added later
     EntryTime TIMESTAMP NOT NULL,
     ExitTime TIMESTAMP NULL,
     Duration INT NULL,
+    INDEX idx_record_active (LicensePlate, ExitTime, EntryTime, SpaceID), -- Active session per plate
+    INDEX idx_record_customer_history (CustomerID, EntryTime, RecordID), -- Customer history pages
     FOREIGN KEY (LicensePlate) REFERENCES Vehicle(LicensePlate) ON DELETE RESTRICT,
     FOREIGN KEY (SpaceID) REFERENCES Parking_Space(SpaceID) ON DELETE RESTRICT,
     UNIQUE (PaymentID)
 );
 
+-- Revenue per day, lot and payment method. Maintained by the
+-- rollup_payment_revenue trigger; rebuild with `flask rollup-backfill`.
+CREATE TABLE Revenue_Rollup (
+    Day DATE NOT NULL,
+    Lot_ID INT NOT NULL,
+    Method ENUM('Credit Card', 'Cash', 'UPI', 'Subscription') NOT NULL,
+    TotalTransactions INT NOT NULL DEFAULT 0,
+    TotalRevenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Day, Lot_ID, Method)
+);
+
+-- Occupancy per lot and space type in fixed time buckets. The sampler writes
+-- 60-second buckets; the downsampler folds old ones into 900s, then 3600s.
+-- Counts are averages over the bucket, weighted by Samples.
+CREATE TABLE Occupancy_History (
+    Resolution SMALLINT UNSIGNED NOT NULL, -- Bucket width in seconds
+    BucketStart DATETIME NOT NULL,
+    Lot_ID INT NOT NULL,
+    SpaceType ENUM('Standard', 'Handicap', 'EV', 'Reserved') NOT NULL,
+    Occupied SMALLINT UNSIGNED NOT NULL,
+    Reserved SMALLINT UNSIGNED NOT NULL,
+    Vacant SMALLINT UNSIGNED NOT NULL,
+    Maintenance SMALLINT UNSIGNED NOT NULL,
+    Samples INT UNSIGNED NOT NULL DEFAULT 1, -- Raw samples folded into the bucket
+    PRIMARY KEY (Resolution, BucketStart, Lot_ID, SpaceType)
+);
+
+-- Every (ancestor, descendant) pair in the reporting tree, including each
+-- employee paired with themselves at Depth 0. Maintained by the closure_employee_*
+-- triggers; rebuild with `flask hierarchy-rebuild`.
+CREATE TABLE Employee_Closure (
+    AncestorID INT NOT NULL,
+    DescendantID INT NOT NULL,
+    Depth SMALLINT UNSIGNED NOT NULL, -- 0 = self, 1 = direct report, ...
+    PRIMARY KEY (AncestorID, DescendantID),
+    INDEX idx_closure_descendant (DescendantID, Depth)
+);
+
+-- Per-space maintenance totals, maintained by the summarize_maintenance_*
+-- triggers; rebuild with `flask maintenance-summary-rebuild`.
+CREATE TABLE Space_Maintenance_Summary (
+    SpaceID INT PRIMARY KEY,
+    LogCount INT NOT NULL DEFAULT 0,
+    TotalCost DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    LastMaintenance DATE NOT NULL,
+    FOREIGN KEY (SpaceID) REFERENCES Parking_Space(SpaceID) ON DELETE CASCADE
+);
+
 -- ===================================================================================
 -- 4. LATE-BINDING FOREIGN KEYS (For circular dependencies)
 -- ===================================================================================
@@ -151,6 +225,32 @@ ALTER TABLE Parking_Record
 ADD CONSTRAINT fk_record_payment
 FOREIGN KEY (PaymentID) REFERENCES Payment(PaymentID) ON DELETE RESTRICT;
 
+-- ===================================================================================
+-- 5. SCHEMA VERSION (Migrations in databases/migrations/ record themselves here)
+-- ===================================================================================
+
+CREATE TABLE Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- This file already contains every migration up to:
+INSERT INTO Schema_Version (Version, Description) VALUES
+(1, 'Hot-path secondary indexes'),
+(2, 'Revenue rollup'),
+(3, 'Occupancy history'),
+(4, 'Reservation expiry index'),
+(5, 'Customer history index'),
+(6, 'Employee closure table'),
+(7, 'Maintenance summary'),
+(8, 'ProcessVehicleEntry procedure'),
+(9, 'Tariff table'),
+(10, 'Occupancy history sample count widened'),
+(11, 'Customer history by customer'),
+(12, 'Maintenance log lot index'),
+(13, 'Entry locks the vehicle row');
+
 -- Re-enable checks
 SET FOREIGN_KEY_CHECKS = 1;
 
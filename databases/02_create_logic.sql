@@ -28,9 +28,35 @@ CREATE TRIGGER update_parking_space_status
 AFTER INSERT ON Parking_Record
 FOR EACH ROW
 BEGIN
+    -- ProcessVehicleEntry has already claimed the space, so skip the
+    -- redundant write; other inserts (the gate batch path) still need it
     UPDATE Parking_Space
     SET Status = 'Occupied'
-    WHERE SpaceID = NEW.SpaceID;
+    WHERE SpaceID = NEW.SpaceID AND Status <> 'Occupied';
+END //
+DELIMITER ;
+
+-- Copy the vehicle's owner onto each parking record, so a customer's history
+-- is one range of idx_record_customer_history rather than a merge over plates
+DELIMITER //
+CREATE TRIGGER record_customer_on_insert
+BEFORE INSERT ON Parking_Record
+FOR EACH ROW
+BEGIN
+    SET NEW.CustomerID = (SELECT CustomerID FROM Vehicle WHERE LicensePlate = NEW.LicensePlate);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER record_customer_on_vehicle_update
+AFTER UPDATE ON Vehicle
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.CustomerID <=> OLD.CustomerID) THEN
+        UPDATE Parking_Record
+        SET CustomerID = NEW.CustomerID
+        WHERE LicensePlate = NEW.LicensePlate;
+    END IF;
 END //
 DELIMITER ;
 
@@ -52,6 +78,164 @@ BEGIN
 END //
 DELIMITER ;
 
+DELIMITER //
+CREATE TRIGGER rollup_payment_revenue
+AFTER INSERT ON Payment
+FOR EACH ROW FOLLOWS increment_payment_count
+BEGIN
+    DECLARE v_lot_id INT;
+
+    SELECT ps.Lot_ID INTO v_lot_id
+    FROM Parking_Record pr
+    JOIN Parking_Space ps ON pr.SpaceID = ps.SpaceID
+    WHERE pr.RecordID = NEW.RecordID;
+
+    INSERT INTO Revenue_Rollup (Day, Lot_ID, Method, TotalTransactions, TotalRevenue)
+    VALUES (DATE(NEW.Timestamp), IFNULL(v_lot_id, 0), NEW.Method, 1, NEW.Amount)
+    ON DUPLICATE KEY UPDATE
+        TotalTransactions = TotalTransactions + 1,
+        TotalRevenue = TotalRevenue + NEW.Amount;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_insert
+AFTER INSERT ON Employee
+FOR EACH ROW
+BEGIN
+    -- Every employee is their own depth-0 ancestor, plus one level below each of the manager's ancestors
+    INSERT INTO Employee_Closure (AncestorID, DescendantID, Depth)
+    SELECT AncestorID, NEW.EmployeeID, Depth + 1
+    FROM Employee_Closure
+    WHERE DescendantID = NEW.ManagerID
+    UNION ALL
+    SELECT NEW.EmployeeID, NEW.EmployeeID, 0;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_check_manager
+BEFORE UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NEW.ManagerID IS NOT NULL AND NOT (NEW.ManagerID <=> OLD.ManagerID) AND EXISTS (
+        SELECT 1 FROM Employee_Closure
+        WHERE AncestorID = NEW.EmployeeID AND DescendantID = NEW.ManagerID
+    ) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'An employee cannot report to themselves or to someone in their own team.';
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_reparent
+AFTER UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.ManagerID <=> OLD.ManagerID) THEN
+        -- Detach the subtree from its old ancestors (links inside the subtree stay)
+        DELETE link FROM Employee_Closure link
+        JOIN Employee_Closure sub ON sub.DescendantID = link.DescendantID AND sub.AncestorID = NEW.EmployeeID
+        LEFT JOIN Employee_Closure inside ON inside.AncestorID = NEW.EmployeeID AND inside.DescendantID = link.AncestorID
+        WHERE inside.AncestorID IS NULL;
+
+        -- Attach it below the new manager's ancestors
+        INSERT INTO Employee_Closure (AncestorID, DescendantID, Depth)
+        SELECT sup.AncestorID, sub.DescendantID, sup.Depth + sub.Depth + 1
+        FROM Employee_Closure sup
+        JOIN Employee_Closure sub ON sub.AncestorID = NEW.EmployeeID
+        WHERE sup.DescendantID = NEW.ManagerID;
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_delete
+BEFORE DELETE ON Employee
+FOR EACH ROW
+BEGIN
+    -- fk_manager sets the reports' ManagerID to NULL without firing triggers,
+    -- so detach the whole subtree from its ancestors here, then drop the employee
+    DELETE link FROM Employee_Closure link
+    JOIN Employee_Closure sub ON sub.DescendantID = link.DescendantID AND sub.AncestorID = OLD.EmployeeID
+    LEFT JOIN Employee_Closure inside ON inside.AncestorID = OLD.EmployeeID AND inside.DescendantID = link.AncestorID
+    WHERE inside.AncestorID IS NULL;
+
+    DELETE FROM Employee_Closure WHERE AncestorID = OLD.EmployeeID OR DescendantID = OLD.EmployeeID;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE PROCEDURE RefreshSpaceMaintenanceSummary( IN p_space_id INT )
+BEGIN
+    -- Recount one space from its own logs (a short primary-key range on Maintenance_Log)
+    DELETE FROM Space_Maintenance_Summary WHERE SpaceID = p_space_id;
+    INSERT INTO Space_Maintenance_Summary (SpaceID, LogCount, TotalCost, LastMaintenance)
+    SELECT SpaceID, COUNT(*), SUM(Cost), MAX(Maintenance_data)
+    FROM Maintenance_Log
+    WHERE SpaceID = p_space_id
+    GROUP BY SpaceID;
+END //
+DELIMITER ;
+
+-- Copy the space's lot onto each maintenance log for idx_maintenance_lot_date.
+-- Spaces do not change lots through the app; `flask maintenance-summary-rebuild`
+-- re-copies it after a manual move.
+DELIMITER //
+CREATE TRIGGER maintenance_log_lot_insert
+BEFORE INSERT ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    SET NEW.Lot_ID = (SELECT Lot_ID FROM Parking_Space WHERE SpaceID = NEW.SpaceID);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER maintenance_log_lot_update
+BEFORE UPDATE ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    IF NEW.SpaceID <> OLD.SpaceID THEN
+        SET NEW.Lot_ID = (SELECT Lot_ID FROM Parking_Space WHERE SpaceID = NEW.SpaceID);
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER summarize_maintenance_insert
+AFTER INSERT ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    INSERT INTO Space_Maintenance_Summary (SpaceID, LogCount, TotalCost, LastMaintenance)
+    VALUES (NEW.SpaceID, 1, NEW.Cost, NEW.Maintenance_data)
+    ON DUPLICATE KEY UPDATE
+        LogCount = LogCount + 1,
+        TotalCost = TotalCost + NEW.Cost,
+        LastMaintenance = GREATEST(LastMaintenance, NEW.Maintenance_data);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER summarize_maintenance_update
+AFTER UPDATE ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    CALL RefreshSpaceMaintenanceSummary(NEW.SpaceID);
+    IF NEW.SpaceID <> OLD.SpaceID THEN
+        CALL RefreshSpaceMaintenanceSummary(OLD.SpaceID);
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER summarize_maintenance_delete
+AFTER DELETE ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    CALL RefreshSpaceMaintenanceSummary(OLD.SpaceID);
+END //
+DELIMITER ;
+
 -- ===================================================================================
 -- PROCEDURES
 -- ===================================================================================
@@ -236,6 +420,100 @@ main_block: BEGIN
 END //
 DELIMITER ;
 
+DELIMITER //
+CREATE PROCEDURE ProcessVehicleEntry(
+    IN p_license_plate VARCHAR(15), IN p_space_id INT
+)
+main_block: BEGIN
+    -- One round trip per gate entry: locks the vehicle row, claims the space
+    -- with a single conditional UPDATE (the only row lock taken on
+    -- Parking_Space), registers unknown vehicles under the walk-in customer,
+    -- inserts the record and clears the booking. Always returns one row:
+    -- Status, Code, Message, RecordID, CustomerID, SpaceStatus.
+    DECLARE v_customer_id INT;
+    DECLARE v_space_status VARCHAR(20);
+    DECLARE v_active_space INT;
+    DECLARE v_record_id INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Serialise entries of the same plate: a second gate waits here until the
+    -- first commits, then sees its record. An unknown plate has no row, but
+    -- the gap lock makes concurrent walk-in registrations of it collide.
+    SELECT CustomerID INTO v_customer_id FROM Vehicle
+    WHERE LicensePlate = p_license_plate
+    FOR UPDATE;
+
+    SET v_active_space = (
+        SELECT SpaceID FROM Parking_Record
+        WHERE LicensePlate = p_license_plate AND ExitTime IS NULL
+        ORDER BY EntryTime DESC LIMIT 1
+    );
+    IF v_active_space IS NOT NULL THEN
+        ROLLBACK;
+        SELECT 'error' AS Status, 'already_parked' AS Code,
+               CONCAT('Vehicle ', p_license_plate, ' is already parked at space ', v_active_space, '.') AS Message,
+               NULL AS RecordID, v_customer_id AS CustomerID, NULL AS SpaceStatus;
+        LEAVE main_block;
+    END IF;
+
+    UPDATE Parking_Space
+    SET Status = 'Occupied'
+    WHERE SpaceID = p_space_id
+      AND (Status = 'Vacant'
+           OR (Status = 'Reserved' AND EXISTS (
+                   SELECT 1 FROM Books b
+                   WHERE b.SpaceID = p_space_id AND b.CustomerID = v_customer_id)));
+
+    IF ROW_COUNT() = 0 THEN
+        SET v_space_status = (SELECT Status FROM Parking_Space WHERE SpaceID = p_space_id);
+        ROLLBACK;
+        SELECT 'error' AS Status,
+               CASE
+                   WHEN v_space_status IS NULL THEN 'invalid_space'
+                   WHEN v_space_status = 'Reserved' THEN 'reserved'
+                   ELSE 'unavailable'
+               END AS Code,
+               CASE
+                   WHEN v_space_status IS NULL THEN CONCAT('Invalid space ID ', p_space_id, '.')
+                   WHEN v_space_status = 'Reserved' THEN CONCAT('Space ', p_space_id, ' is reserved for another customer.')
+                   ELSE CONCAT('Space ', p_space_id, ' is not available (currently ', v_space_status, ').')
+               END AS Message,
+               NULL AS RecordID, v_customer_id AS CustomerID, v_space_status AS SpaceStatus;
+        LEAVE main_block;
+    END IF;
+
+    IF v_customer_id IS NULL THEN
+        INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
+        SELECT 9999, 'Walk-in Customer', 'N/A', 'walkin@demo.com', 'N/A', 'N/A', 'N/A', '000000'
+        FROM DUAL
+        WHERE NOT EXISTS (SELECT 1 FROM Customer WHERE CustomerID = 9999);
+
+        INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
+        VALUES (p_license_plate, 9999, 'Walk-In', 'Unspecified', 'Unknown');
+        SET v_customer_id = 9999;
+    END IF;
+
+    INSERT INTO Parking_Record (LicensePlate, EntryTime, SpaceID)
+    VALUES (p_license_plate, NOW(), p_space_id);
+    SET v_record_id = LAST_INSERT_ID();
+
+    DELETE FROM Books WHERE SpaceID = p_space_id AND CustomerID = v_customer_id;
+
+    COMMIT;
+
+    SELECT 'success' AS Status, 'ok' AS Code,
+           CONCAT('Entry recorded successfully for ', p_license_plate, ' at space ', p_space_id, '.') AS Message,
+           v_record_id AS RecordID, v_customer_id AS CustomerID, 'Occupied' AS SpaceStatus;
+END //
+DELIMITER ;
+
 DELIMITER //
 CREATE PROCEDURE GetCustomerByID( IN p_customer_id INT )
 BEGIN
@@ -78,6 +78,10 @@ INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color) VALUES
 ('LICENSE-102', 1002, 'Ford', 'F-150', 'Black'),
 ('ABC-789', 9999, 'Walk-In', 'Unspecified', 'N/A');
 
+-- Tariff (Default flat rate of 50.00/hour for every lot and space type)
+INSERT INTO Tariff (Lot_ID, SpaceType, StartHour, EndHour, RatePerHour, GraceMinutes, DailyCap) VALUES
+(NULL, NULL, 0, 24, 50.00, 0, NULL);
+
 -- ===================================================================================
 -- 3. TRANSACTIONAL & RELATIONSHIP DATA (For Testing)
 -- ===================================================================================
@@ -14,15 +14,20 @@ SELECT '--- 1. Deleting all transactional data...' AS Status;
 
 -- Delete data in order of dependency (child tables first)
 TRUNCATE TABLE Payment;
+TRUNCATE TABLE Revenue_Rollup;
+TRUNCATE TABLE Occupancy_History;
 TRUNCATE TABLE Parking_Record;
 TRUNCATE TABLE Books;
 TRUNCATE TABLE Customer_Service;
 TRUNCATE TABLE Maintenance_Log;
+TRUNCATE TABLE Space_Maintenance_Summary;
 
 SELECT '--- 2. Deleting all core data...' AS Status;
 
 -- Now delete data from parent tables
+TRUNCATE TABLE Tariff;
 TRUNCATE TABLE Users;
+TRUNCATE TABLE Employee_Closure;
 TRUNCATE TABLE Vehicle;
 TRUNCATE TABLE Customer;
 TRUNCATE TABLE Employee;
@@ -0,0 +1,62 @@
+-- ===================================================================================
+-- MIGRATION 001_HOT_PATH_INDEXES.SQL
+-- Adds secondary indexes for the lookups the app runs on every request.
+-- Safe to re-run: each index is created only if information_schema lacks it.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- 1. Active session per plate:
+--    WHERE LicensePlate = ? AND ExitTime IS NULL ORDER BY EntryTime DESC LIMIT 1
+--    MySQL has no partial indexes; putting ExitTime second makes "IS NULL" an
+--    equality prefix, so only the plate's open records are read, already in
+--    EntryTime order, and SpaceID is covered.
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Parking_Record'
+                 AND index_name = 'idx_record_active') = 0,
+              'CREATE INDEX idx_record_active ON Parking_Record (LicensePlate, ExitTime, EntryTime, SpaceID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 2. Spaces by status (WHERE Status = ? ORDER BY SpaceNumber); SpaceID rides along as the PK
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Parking_Space'
+                 AND index_name = 'idx_space_status') = 0,
+              'CREATE INDEX idx_space_status ON Parking_Space (Status, SpaceNumber)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 3. Reservations by space (WHERE SpaceID = ? [AND CustomerID = ?]), covered
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Books'
+                 AND index_name = 'idx_books_space') = 0,
+              'CREATE INDEX idx_books_space ON Books (SpaceID, CustomerID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 4. Revenue by method (GROUP BY Method with SUM(Amount)) as an index-only scan
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Payment'
+                 AND index_name = 'idx_payment_method') = 0,
+              'CREATE INDEX idx_payment_method ON Payment (Method, Amount)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+-- 5. Customer report keyset pagination (already in 01_create_schema.sql for new installs)
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Customer'
+                 AND index_name = 'idx_customer_name') = 0,
+              'CREATE INDEX idx_customer_name ON Customer (Name, CustomerID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(1, 'Hot-path secondary indexes');
+
+SELECT 'Migration 001 applied.' AS Status;
@@ -0,0 +1,62 @@
+-- ===================================================================================
+-- MIGRATION 002_REVENUE_ROLLUP.SQL
+-- Adds Revenue_Rollup (revenue per day, lot and method), the trigger that keeps
+-- it current on every Payment insert, and backfills it from existing payments.
+-- Safe to re-run: the table is created if missing, the trigger is replaced and
+-- the backfill rebuilds the rollup from scratch.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Revenue_Rollup (
+    Day DATE NOT NULL,
+    Lot_ID INT NOT NULL,
+    Method ENUM('Credit Card', 'Cash', 'UPI', 'Subscription') NOT NULL,
+    TotalTransactions INT NOT NULL DEFAULT 0,
+    TotalRevenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Day, Lot_ID, Method)
+);
+
+DROP TRIGGER IF EXISTS rollup_payment_revenue;
+
+DELIMITER //
+CREATE TRIGGER rollup_payment_revenue
+AFTER INSERT ON Payment
+FOR EACH ROW FOLLOWS increment_payment_count
+BEGIN
+    DECLARE v_lot_id INT;
+
+    SELECT ps.Lot_ID INTO v_lot_id
+    FROM Parking_Record pr
+    JOIN Parking_Space ps ON pr.SpaceID = ps.SpaceID
+    WHERE pr.RecordID = NEW.RecordID;
+
+    INSERT INTO Revenue_Rollup (Day, Lot_ID, Method, TotalTransactions, TotalRevenue)
+    VALUES (DATE(NEW.Timestamp), IFNULL(v_lot_id, 0), NEW.Method, 1, NEW.Amount)
+    ON DUPLICATE KEY UPDATE
+        TotalTransactions = TotalTransactions + 1,
+        TotalRevenue = TotalRevenue + NEW.Amount;
+END //
+DELIMITER ;
+
+-- Backfill (same statement as `flask rollup-backfill`)
+START TRANSACTION;
+DELETE FROM Revenue_Rollup;
+INSERT INTO Revenue_Rollup (Day, Lot_ID, Method, TotalTransactions, TotalRevenue)
+SELECT DATE(p.Timestamp), IFNULL(ps.Lot_ID, 0), p.Method, COUNT(*), SUM(p.Amount)
+FROM Payment p
+LEFT JOIN Parking_Record pr ON pr.RecordID = p.RecordID
+LEFT JOIN Parking_Space ps ON ps.SpaceID = pr.SpaceID
+GROUP BY DATE(p.Timestamp), IFNULL(ps.Lot_ID, 0), p.Method;
+COMMIT;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(2, 'Revenue rollup');
+
+SELECT 'Migration 002 applied.' AS Status;
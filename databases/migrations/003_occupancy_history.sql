@@ -0,0 +1,34 @@
+-- ===================================================================================
+-- MIGRATION 003_OCCUPANCY_HISTORY.SQL
+-- Adds Occupancy_History, filled by the app's background occupancy sampler.
+-- Safe to re-run.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- Occupancy per lot and space type in fixed time buckets. The sampler writes
+-- 60-second buckets; the downsampler folds old ones into 900s, then 3600s.
+-- Counts are averages over the bucket, weighted by Samples.
+CREATE TABLE IF NOT EXISTS Occupancy_History (
+    Resolution SMALLINT UNSIGNED NOT NULL, -- Bucket width in seconds
+    BucketStart DATETIME NOT NULL,
+    Lot_ID INT NOT NULL,
+    SpaceType ENUM('Standard', 'Handicap', 'EV', 'Reserved') NOT NULL,
+    Occupied SMALLINT UNSIGNED NOT NULL,
+    Reserved SMALLINT UNSIGNED NOT NULL,
+    Vacant SMALLINT UNSIGNED NOT NULL,
+    Maintenance SMALLINT UNSIGNED NOT NULL,
+    Samples INT UNSIGNED NOT NULL DEFAULT 1, -- Raw samples folded into the bucket
+    PRIMARY KEY (Resolution, BucketStart, Lot_ID, SpaceType)
+);
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(3, 'Occupancy history');
+
+SELECT 'Migration 003 applied.' AS Status;
@@ -0,0 +1,25 @@
+-- ===================================================================================
+-- MIGRATION 004_RESERVATION_EXPIRY_INDEX.SQL
+-- Index for the reservation-expiry sweeper (Books WHERE ReservationTime < ?).
+-- Safe to re-run.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Books'
+                 AND index_name = 'idx_books_reserved_at') = 0,
+              'CREATE INDEX idx_books_reserved_at ON Books (ReservationTime)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(4, 'Reservation expiry index');
+
+SELECT 'Migration 004 applied.' AS Status;
@@ -0,0 +1,26 @@
+-- ===================================================================================
+-- MIGRATION 005_CUSTOMER_HISTORY_INDEX.SQL
+-- Index for paginated customer history: a plate's visits in (EntryTime, RecordID)
+-- order, so each page is a short range scan instead of a sort of every visit.
+-- Safe to re-run.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Parking_Record'
+                 AND index_name = 'idx_record_history') = 0,
+              'CREATE INDEX idx_record_history ON Parking_Record (LicensePlate, EntryTime, RecordID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(5, 'Customer history index');
+
+SELECT 'Migration 005 applied.' AS Status;
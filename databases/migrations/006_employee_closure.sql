@@ -0,0 +1,114 @@
+-- ===================================================================================
+-- MIGRATION 006_EMPLOYEE_CLOSURE.SQL
+-- Adds Employee_Closure (every ancestor/descendant pair in the reporting tree with
+-- its depth), the triggers that keep it in sync as employees are added,
+-- re-parented or deleted, and backfills it from Employee with a recursive CTE.
+-- Safe to re-run: the triggers are replaced and the backfill rebuilds the table.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Employee_Closure (
+    AncestorID INT NOT NULL,
+    DescendantID INT NOT NULL,
+    Depth SMALLINT UNSIGNED NOT NULL, -- 0 = self, 1 = direct report, ...
+    PRIMARY KEY (AncestorID, DescendantID),
+    INDEX idx_closure_descendant (DescendantID, Depth)
+);
+
+DROP TRIGGER IF EXISTS closure_employee_insert;
+DROP TRIGGER IF EXISTS closure_employee_check_manager;
+DROP TRIGGER IF EXISTS closure_employee_reparent;
+DROP TRIGGER IF EXISTS closure_employee_delete;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_insert
+AFTER INSERT ON Employee
+FOR EACH ROW
+BEGIN
+    -- Every employee is their own depth-0 ancestor, plus one level below each of the manager's ancestors
+    INSERT INTO Employee_Closure (AncestorID, DescendantID, Depth)
+    SELECT AncestorID, NEW.EmployeeID, Depth + 1
+    FROM Employee_Closure
+    WHERE DescendantID = NEW.ManagerID
+    UNION ALL
+    SELECT NEW.EmployeeID, NEW.EmployeeID, 0;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_check_manager
+BEFORE UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NEW.ManagerID IS NOT NULL AND NOT (NEW.ManagerID <=> OLD.ManagerID) AND EXISTS (
+        SELECT 1 FROM Employee_Closure
+        WHERE AncestorID = NEW.EmployeeID AND DescendantID = NEW.ManagerID
+    ) THEN
+        SIGNAL SQLSTATE '45000' SET MESSAGE_TEXT = 'An employee cannot report to themselves or to someone in their own team.';
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_reparent
+AFTER UPDATE ON Employee
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.ManagerID <=> OLD.ManagerID) THEN
+        -- Detach the subtree from its old ancestors (links inside the subtree stay)
+        DELETE link FROM Employee_Closure link
+        JOIN Employee_Closure sub ON sub.DescendantID = link.DescendantID AND sub.AncestorID = NEW.EmployeeID
+        LEFT JOIN Employee_Closure inside ON inside.AncestorID = NEW.EmployeeID AND inside.DescendantID = link.AncestorID
+        WHERE inside.AncestorID IS NULL;
+
+        -- Attach it below the new manager's ancestors
+        INSERT INTO Employee_Closure (AncestorID, DescendantID, Depth)
+        SELECT sup.AncestorID, sub.DescendantID, sup.Depth + sub.Depth + 1
+        FROM Employee_Closure sup
+        JOIN Employee_Closure sub ON sub.AncestorID = NEW.EmployeeID
+        WHERE sup.DescendantID = NEW.ManagerID;
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER closure_employee_delete
+BEFORE DELETE ON Employee
+FOR EACH ROW
+BEGIN
+    -- fk_manager sets the reports' ManagerID to NULL without firing triggers,
+    -- so detach the whole subtree from its ancestors here, then drop the employee
+    DELETE link FROM Employee_Closure link
+    JOIN Employee_Closure sub ON sub.DescendantID = link.DescendantID AND sub.AncestorID = OLD.EmployeeID
+    LEFT JOIN Employee_Closure inside ON inside.AncestorID = OLD.EmployeeID AND inside.DescendantID = link.AncestorID
+    WHERE inside.AncestorID IS NULL;
+
+    DELETE FROM Employee_Closure WHERE AncestorID = OLD.EmployeeID OR DescendantID = OLD.EmployeeID;
+END //
+DELIMITER ;
+
+-- Backfill (same statements as `flask hierarchy-rebuild`)
+START TRANSACTION;
+DELETE FROM Employee_Closure;
+INSERT INTO Employee_Closure (AncestorID, DescendantID, Depth)
+WITH RECURSIVE tree (AncestorID, DescendantID, Depth) AS (
+    SELECT EmployeeID, EmployeeID, 0 FROM Employee
+    UNION ALL
+    SELECT t.AncestorID, e.EmployeeID, t.Depth + 1
+    FROM tree t
+    JOIN Employee e ON e.ManagerID = t.DescendantID
+)
+SELECT AncestorID, DescendantID, Depth FROM tree;
+COMMIT;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(6, 'Employee closure table');
+
+SELECT 'Migration 006 applied.' AS Status;
@@ -0,0 +1,98 @@
+-- ===================================================================================
+-- MIGRATION 007_MAINTENANCE_SUMMARY.SQL
+-- Adds Space_Maintenance_Summary (log count, total cost and last maintenance date
+-- per space), the triggers that keep it current as logs are written, and the
+-- date index the paginated maintenance audit reads; backfills from Maintenance_Log.
+-- Safe to re-run: the procedure and triggers are replaced and the backfill
+-- rebuilds the table.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Space_Maintenance_Summary (
+    SpaceID INT PRIMARY KEY,
+    LogCount INT NOT NULL DEFAULT 0,
+    TotalCost DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    LastMaintenance DATE NOT NULL,
+    FOREIGN KEY (SpaceID) REFERENCES Parking_Space(SpaceID) ON DELETE CASCADE
+);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Maintenance_Log'
+                 AND index_name = 'idx_maintenance_date') = 0,
+              'CREATE INDEX idx_maintenance_date ON Maintenance_Log (Maintenance_data, SpaceID, LogID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+DROP TRIGGER IF EXISTS summarize_maintenance_insert;
+DROP TRIGGER IF EXISTS summarize_maintenance_update;
+DROP TRIGGER IF EXISTS summarize_maintenance_delete;
+DROP PROCEDURE IF EXISTS RefreshSpaceMaintenanceSummary;
+
+DELIMITER //
+CREATE PROCEDURE RefreshSpaceMaintenanceSummary( IN p_space_id INT )
+BEGIN
+    -- Recount one space from its own logs (a short primary-key range on Maintenance_Log)
+    DELETE FROM Space_Maintenance_Summary WHERE SpaceID = p_space_id;
+    INSERT INTO Space_Maintenance_Summary (SpaceID, LogCount, TotalCost, LastMaintenance)
+    SELECT SpaceID, COUNT(*), SUM(Cost), MAX(Maintenance_data)
+    FROM Maintenance_Log
+    WHERE SpaceID = p_space_id
+    GROUP BY SpaceID;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER summarize_maintenance_insert
+AFTER INSERT ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    INSERT INTO Space_Maintenance_Summary (SpaceID, LogCount, TotalCost, LastMaintenance)
+    VALUES (NEW.SpaceID, 1, NEW.Cost, NEW.Maintenance_data)
+    ON DUPLICATE KEY UPDATE
+        LogCount = LogCount + 1,
+        TotalCost = TotalCost + NEW.Cost,
+        LastMaintenance = GREATEST(LastMaintenance, NEW.Maintenance_data);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER summarize_maintenance_update
+AFTER UPDATE ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    CALL RefreshSpaceMaintenanceSummary(NEW.SpaceID);
+    IF NEW.SpaceID <> OLD.SpaceID THEN
+        CALL RefreshSpaceMaintenanceSummary(OLD.SpaceID);
+    END IF;
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER summarize_maintenance_delete
+AFTER DELETE ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    CALL RefreshSpaceMaintenanceSummary(OLD.SpaceID);
+END //
+DELIMITER ;
+
+-- Backfill (same statements as `flask maintenance-summary-rebuild`)
+START TRANSACTION;
+DELETE FROM Space_Maintenance_Summary;
+INSERT INTO Space_Maintenance_Summary (SpaceID, LogCount, TotalCost, LastMaintenance)
+SELECT SpaceID, COUNT(*), SUM(Cost), MAX(Maintenance_data)
+FROM Maintenance_Log
+GROUP BY SpaceID;
+COMMIT;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(7, 'Maintenance summary');
+
+SELECT 'Migration 007 applied.' AS Status;
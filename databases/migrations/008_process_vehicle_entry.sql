@@ -0,0 +1,110 @@
+-- ===================================================================================
+-- MIGRATION 008_PROCESS_VEHICLE_ENTRY.SQL
+-- Installs ProcessVehicleEntry, the single-round-trip gate entry procedure that
+-- process_vehicle_entry and the gate-event ingestion API CALL.
+-- Safe to re-run: the procedure is dropped and recreated.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+DROP PROCEDURE IF EXISTS ProcessVehicleEntry;
+
+DELIMITER //
+CREATE PROCEDURE ProcessVehicleEntry(
+    IN p_license_plate VARCHAR(15), IN p_space_id INT
+)
+main_block: BEGIN
+    -- One round trip per gate entry: claims the space with a single conditional
+    -- UPDATE (the only row lock taken on Parking_Space), registers unknown
+    -- vehicles under the walk-in customer, inserts the record and clears the
+    -- booking. Always returns one row: Status, Code, Message, RecordID,
+    -- CustomerID, SpaceStatus.
+    DECLARE v_customer_id INT;
+    DECLARE v_space_status VARCHAR(20);
+    DECLARE v_active_space INT;
+    DECLARE v_record_id INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    SET v_customer_id = (SELECT CustomerID FROM Vehicle WHERE LicensePlate = p_license_plate);
+
+    SET v_active_space = (
+        SELECT SpaceID FROM Parking_Record
+        WHERE LicensePlate = p_license_plate AND ExitTime IS NULL
+        ORDER BY EntryTime DESC LIMIT 1
+    );
+    IF v_active_space IS NOT NULL THEN
+        ROLLBACK;
+        SELECT 'error' AS Status, 'already_parked' AS Code,
+               CONCAT('Vehicle ', p_license_plate, ' is already parked at space ', v_active_space, '.') AS Message,
+               NULL AS RecordID, v_customer_id AS CustomerID, NULL AS SpaceStatus;
+        LEAVE main_block;
+    END IF;
+
+    UPDATE Parking_Space
+    SET Status = 'Occupied'
+    WHERE SpaceID = p_space_id
+      AND (Status = 'Vacant'
+           OR (Status = 'Reserved' AND EXISTS (
+                   SELECT 1 FROM Books b
+                   WHERE b.SpaceID = p_space_id AND b.CustomerID = v_customer_id)));
+
+    IF ROW_COUNT() = 0 THEN
+        SET v_space_status = (SELECT Status FROM Parking_Space WHERE SpaceID = p_space_id);
+        ROLLBACK;
+        SELECT 'error' AS Status,
+               CASE
+                   WHEN v_space_status IS NULL THEN 'invalid_space'
+                   WHEN v_space_status = 'Reserved' THEN 'reserved'
+                   ELSE 'unavailable'
+               END AS Code,
+               CASE
+                   WHEN v_space_status IS NULL THEN CONCAT('Invalid space ID ', p_space_id, '.')
+                   WHEN v_space_status = 'Reserved' THEN CONCAT('Space ', p_space_id, ' is reserved for another customer.')
+                   ELSE CONCAT('Space ', p_space_id, ' is not available (currently ', v_space_status, ').')
+               END AS Message,
+               NULL AS RecordID, v_customer_id AS CustomerID, v_space_status AS SpaceStatus;
+        LEAVE main_block;
+    END IF;
+
+    IF v_customer_id IS NULL THEN
+        INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
+        SELECT 9999, 'Walk-in Customer', 'N/A', 'walkin@demo.com', 'N/A', 'N/A', 'N/A', '000000'
+        FROM DUAL
+        WHERE NOT EXISTS (SELECT 1 FROM Customer WHERE CustomerID = 9999);
+
+        INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
+        VALUES (p_license_plate, 9999, 'Walk-In', 'Unspecified', 'Unknown');
+        SET v_customer_id = 9999;
+    END IF;
+
+    INSERT INTO Parking_Record (LicensePlate, EntryTime, SpaceID)
+    VALUES (p_license_plate, NOW(), p_space_id);
+    SET v_record_id = LAST_INSERT_ID();
+
+    DELETE FROM Books WHERE SpaceID = p_space_id AND CustomerID = v_customer_id;
+
+    COMMIT;
+
+    SELECT 'success' AS Status, 'ok' AS Code,
+           CONCAT('Entry recorded successfully for ', p_license_plate, ' at space ', p_space_id, '.') AS Message,
+           v_record_id AS RecordID, v_customer_id AS CustomerID, 'Occupied' AS SpaceStatus;
+END //
+DELIMITER ;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(8, 'ProcessVehicleEntry procedure');
+
+SELECT 'Migration 008 applied.' AS Status;
@@ -0,0 +1,39 @@
+-- ===================================================================================
+-- MIGRATION 009_TARIFF.SQL
+-- Adds the Tariff table the exit paths price stays from (see app/tariffs.py) and
+-- seeds the original flat 50.00/hour band when the table is empty.
+-- Safe to re-run: the table is only created and seeded once.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- Hourly tariff bands. NULL Lot_ID / SpaceType means "any lot" / "any type";
+-- the most specific band covering an hour wins.
+CREATE TABLE IF NOT EXISTS Tariff (
+    TariffID INT AUTO_INCREMENT PRIMARY KEY,
+    Lot_ID INT NULL,
+    SpaceType ENUM('Standard', 'Handicap', 'EV', 'Reserved') NULL,
+    StartHour TINYINT NOT NULL DEFAULT 0,
+    EndHour TINYINT NOT NULL DEFAULT 24,
+    RatePerHour DECIMAL(10, 2) NOT NULL,
+    GraceMinutes INT NOT NULL DEFAULT 0,
+    DailyCap DECIMAL(10, 2) NULL,
+    CHECK (StartHour >= 0 AND StartHour < EndHour AND EndHour <= 24),
+    FOREIGN KEY (Lot_ID) REFERENCES Parking_Lot(Lot_ID) ON DELETE CASCADE
+);
+
+INSERT INTO Tariff (Lot_ID, SpaceType, StartHour, EndHour, RatePerHour, GraceMinutes, DailyCap)
+SELECT NULL, NULL, 0, 24, 50.00, 0, NULL
+FROM DUAL
+WHERE NOT EXISTS (SELECT 1 FROM Tariff);
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(9, 'Tariff table');
+
+SELECT 'Migration 009 applied.' AS Status;
@@ -0,0 +1,22 @@
+-- ===================================================================================
+-- MIGRATION 010_OCCUPANCY_SAMPLES_INT.SQL
+-- Widens Occupancy_History.Samples to INT UNSIGNED. The merge upsert adds sample
+-- counts together as buckets are downsampled, which can pass SMALLINT's 65535.
+-- Safe to re-run.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+ALTER TABLE Occupancy_History
+    MODIFY COLUMN Samples INT UNSIGNED NOT NULL DEFAULT 1;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(10, 'Occupancy history sample count widened');
+
+SELECT 'Migration 010 applied.' AS Status;
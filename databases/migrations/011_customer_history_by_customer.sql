@@ -0,0 +1,74 @@
+-- ===================================================================================
+-- MIGRATION 011_CUSTOMER_HISTORY_BY_CUSTOMER.SQL
+-- Copies the vehicle owner onto Parking_Record (CustomerID, kept current by
+-- triggers) and indexes (CustomerID, EntryTime, RecordID), so a customer-history
+-- page is one backward range scan across all of the customer's plates instead
+-- of a join over every visit followed by a filesort. Replaces idx_record_history
+-- from migration 005, which only ordered one plate at a time.
+-- Safe to re-run: the triggers are replaced and the backfill is idempotent.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.columns
+               WHERE table_schema = DATABASE() AND table_name = 'Parking_Record'
+                 AND column_name = 'CustomerID') = 0,
+              'ALTER TABLE Parking_Record ADD COLUMN CustomerID INT NULL AFTER LicensePlate',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+DROP TRIGGER IF EXISTS record_customer_on_insert;
+DROP TRIGGER IF EXISTS record_customer_on_vehicle_update;
+
+DELIMITER //
+CREATE TRIGGER record_customer_on_insert
+BEFORE INSERT ON Parking_Record
+FOR EACH ROW
+BEGIN
+    SET NEW.CustomerID = (SELECT CustomerID FROM Vehicle WHERE LicensePlate = NEW.LicensePlate);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER record_customer_on_vehicle_update
+AFTER UPDATE ON Vehicle
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.CustomerID <=> OLD.CustomerID) THEN
+        UPDATE Parking_Record
+        SET CustomerID = NEW.CustomerID
+        WHERE LicensePlate = NEW.LicensePlate;
+    END IF;
+END //
+DELIMITER ;
+
+-- Backfill records written before the triggers existed
+UPDATE Parking_Record pr
+JOIN Vehicle v ON v.LicensePlate = pr.LicensePlate
+SET pr.CustomerID = v.CustomerID
+WHERE NOT (pr.CustomerID <=> v.CustomerID);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Parking_Record'
+                 AND index_name = 'idx_record_customer_history') = 0,
+              'CREATE INDEX idx_record_customer_history ON Parking_Record (CustomerID, EntryTime, RecordID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Parking_Record'
+                 AND index_name = 'idx_record_history') > 0,
+              'DROP INDEX idx_record_history ON Parking_Record',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(11, 'Customer history by customer');
+
+SELECT 'Migration 011 applied.' AS Status;
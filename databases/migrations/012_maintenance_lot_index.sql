@@ -0,0 +1,64 @@
+-- ===================================================================================
+-- MIGRATION 012_MAINTENANCE_LOT_INDEX.SQL
+-- Copies each space's Lot_ID onto Maintenance_Log (kept by triggers) and indexes
+-- (Lot_ID, Maintenance_data, SpaceID, LogID), so the lot-filtered maintenance
+-- audit seeks straight to one lot's logs instead of walking every lot's logs
+-- and discarding the rest after the join.
+-- Safe to re-run: the triggers are replaced and the backfill is idempotent.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.columns
+               WHERE table_schema = DATABASE() AND table_name = 'Maintenance_Log'
+                 AND column_name = 'Lot_ID') = 0,
+              'ALTER TABLE Maintenance_Log ADD COLUMN Lot_ID INT NULL AFTER LogID',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+DROP TRIGGER IF EXISTS maintenance_log_lot_insert;
+DROP TRIGGER IF EXISTS maintenance_log_lot_update;
+
+DELIMITER //
+CREATE TRIGGER maintenance_log_lot_insert
+BEFORE INSERT ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    SET NEW.Lot_ID = (SELECT Lot_ID FROM Parking_Space WHERE SpaceID = NEW.SpaceID);
+END //
+DELIMITER ;
+
+DELIMITER //
+CREATE TRIGGER maintenance_log_lot_update
+BEFORE UPDATE ON Maintenance_Log
+FOR EACH ROW
+BEGIN
+    IF NEW.SpaceID <> OLD.SpaceID THEN
+        SET NEW.Lot_ID = (SELECT Lot_ID FROM Parking_Space WHERE SpaceID = NEW.SpaceID);
+    END IF;
+END //
+DELIMITER ;
+
+-- Backfill logs written before the triggers existed
+UPDATE Maintenance_Log ml
+JOIN Parking_Space ps ON ps.SpaceID = ml.SpaceID
+SET ml.Lot_ID = ps.Lot_ID
+WHERE NOT (ml.Lot_ID <=> ps.Lot_ID);
+
+SET @sql = IF((SELECT COUNT(*) FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = 'Maintenance_Log'
+                 AND index_name = 'idx_maintenance_lot_date') = 0,
+              'CREATE INDEX idx_maintenance_lot_date ON Maintenance_Log (Lot_ID, Maintenance_data, SpaceID, LogID)',
+              'DO 0');
+PREPARE stmt FROM @sql; EXECUTE stmt; DEALLOCATE PREPARE stmt;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(12, 'Maintenance log lot index');
+
+SELECT 'Migration 012 applied.' AS Status;
@@ -0,0 +1,133 @@
+-- ===================================================================================
+-- MIGRATION 013_ENTRY_VEHICLE_LOCK.SQL
+-- Reinstalls ProcessVehicleEntry so it locks the vehicle row before checking for
+-- an active record: two gates entering the same plate at different spaces can
+-- no longer both pass the check and leave the car with two active records.
+-- Also makes update_parking_space_status skip its UPDATE when the entry path
+-- has already marked the space Occupied.
+-- Safe to re-run: the trigger and procedure are dropped and recreated.
+-- ===================================================================================
+
+USE plm;
+
+CREATE TABLE IF NOT EXISTS Schema_Version (
+    Version INT PRIMARY KEY,
+    Description VARCHAR(200) NOT NULL,
+    AppliedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+DROP TRIGGER IF EXISTS update_parking_space_status;
+
+DELIMITER //
+CREATE TRIGGER update_parking_space_status
+AFTER INSERT ON Parking_Record
+FOR EACH ROW
+BEGIN
+    -- ProcessVehicleEntry has already claimed the space, so skip the
+    -- redundant write; other inserts (the gate batch path) still need it
+    UPDATE Parking_Space
+    SET Status = 'Occupied'
+    WHERE SpaceID = NEW.SpaceID AND Status <> 'Occupied';
+END //
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS ProcessVehicleEntry;
+
+DELIMITER //
+CREATE PROCEDURE ProcessVehicleEntry(
+    IN p_license_plate VARCHAR(15), IN p_space_id INT
+)
+main_block: BEGIN
+    -- One round trip per gate entry: locks the vehicle row, claims the space
+    -- with a single conditional UPDATE (the only row lock taken on
+    -- Parking_Space), registers unknown vehicles under the walk-in customer,
+    -- inserts the record and clears the booking. Always returns one row:
+    -- Status, Code, Message, RecordID, CustomerID, SpaceStatus.
+    DECLARE v_customer_id INT;
+    DECLARE v_space_status VARCHAR(20);
+    DECLARE v_active_space INT;
+    DECLARE v_record_id INT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- Serialise entries of the same plate: a second gate waits here until the
+    -- first commits, then sees its record. An unknown plate has no row, but
+    -- the gap lock makes concurrent walk-in registrations of it collide.
+    SELECT CustomerID INTO v_customer_id FROM Vehicle
+    WHERE LicensePlate = p_license_plate
+    FOR UPDATE;
+
+    SET v_active_space = (
+        SELECT SpaceID FROM Parking_Record
+        WHERE LicensePlate = p_license_plate AND ExitTime IS NULL
+        ORDER BY EntryTime DESC LIMIT 1
+    );
+    IF v_active_space IS NOT NULL THEN
+        ROLLBACK;
+        SELECT 'error' AS Status, 'already_parked' AS Code,
+               CONCAT('Vehicle ', p_license_plate, ' is already parked at space ', v_active_space, '.') AS Message,
+               NULL AS RecordID, v_customer_id AS CustomerID, NULL AS SpaceStatus;
+        LEAVE main_block;
+    END IF;
+
+    UPDATE Parking_Space
+    SET Status = 'Occupied'
+    WHERE SpaceID = p_space_id
+      AND (Status = 'Vacant'
+           OR (Status = 'Reserved' AND EXISTS (
+                   SELECT 1 FROM Books b
+                   WHERE b.SpaceID = p_space_id AND b.CustomerID = v_customer_id)));
+
+    IF ROW_COUNT() = 0 THEN
+        SET v_space_status = (SELECT Status FROM Parking_Space WHERE SpaceID = p_space_id);
+        ROLLBACK;
+        SELECT 'error' AS Status,
+               CASE
+                   WHEN v_space_status IS NULL THEN 'invalid_space'
+                   WHEN v_space_status = 'Reserved' THEN 'reserved'
+                   ELSE 'unavailable'
+               END AS Code,
+               CASE
+                   WHEN v_space_status IS NULL THEN CONCAT('Invalid space ID ', p_space_id, '.')
+                   WHEN v_space_status = 'Reserved' THEN CONCAT('Space ', p_space_id, ' is reserved for another customer.')
+                   ELSE CONCAT('Space ', p_space_id, ' is not available (currently ', v_space_status, ').')
+               END AS Message,
+               NULL AS RecordID, v_customer_id AS CustomerID, v_space_status AS SpaceStatus;
+        LEAVE main_block;
+    END IF;
+
+    IF v_customer_id IS NULL THEN
+        INSERT INTO Customer (CustomerID, Name, Phone, Email, Street, City, State, ZIP)
+        SELECT 9999, 'Walk-in Customer', 'N/A', 'walkin@demo.com', 'N/A', 'N/A', 'N/A', '000000'
+        FROM DUAL
+        WHERE NOT EXISTS (SELECT 1 FROM Customer WHERE CustomerID = 9999);
+
+        INSERT INTO Vehicle (LicensePlate, CustomerID, Make, Model, Color)
+        VALUES (p_license_plate, 9999, 'Walk-In', 'Unspecified', 'Unknown');
+        SET v_customer_id = 9999;
+    END IF;
+
+    INSERT INTO Parking_Record (LicensePlate, EntryTime, SpaceID)
+    VALUES (p_license_plate, NOW(), p_space_id);
+    SET v_record_id = LAST_INSERT_ID();
+
+    DELETE FROM Books WHERE SpaceID = p_space_id AND CustomerID = v_customer_id;
+
+    COMMIT;
+
+    SELECT 'success' AS Status, 'ok' AS Code,
+           CONCAT('Entry recorded successfully for ', p_license_plate, ' at space ', p_space_id, '.') AS Message,
+           v_record_id AS RecordID, v_customer_id AS CustomerID, 'Occupied' AS SpaceStatus;
+END //
+DELIMITER ;
+
+INSERT IGNORE INTO Schema_Version (Version, Description) VALUES
+(13, 'Entry locks the vehicle row');
+
+SELECT 'Migration 013 applied.' AS Status;